@@ -8,7 +8,7 @@ class Post:
         self.user_id = user_id
         self.image = image
         self.likes = 0
-        self.comments = []
+        self.total_comments = 0
         self.date = datetime.utcnow()
 
     def to_dict(self):
@@ -18,6 +18,6 @@ class Post:
             'user_id': self.user_id,
             'image': self.image,
             'likes': self.likes,
-            'comments': self.comments,
+            'total_comments': self.total_comments,
             'date': self.date
         }
\ No newline at end of file
@@ -2,7 +2,7 @@ def register_blueprints(app):
     # Import blueprints
     from routes.auth_routes import auth_bp
     from routes.dashboard_routes import dashboard_bp
-    from routes.disease_detection_routes import disease_detection_bp
+    from routes.disease_detection_routes import disease_detection_bp, register_detection_jobs, register_live_detection_handlers
     from routes.community_forum_routes import community_forum_bp, register_forum_socketio_handlers
     from routes.consult_officer_routes import consult_officer_bp, register_socketio_handlers
     from routes.cultivation_guide_routes import cultivation_guide_bp
@@ -20,4 +20,6 @@ def register_blueprints(app):
     # Register Socket.IO handlers
     if 'socketio' in app.extensions:
         register_socketio_handlers(app.extensions['socketio'])
-        register_forum_socketio_handlers(app.extensions['socketio'])
\ No newline at end of file
+        register_forum_socketio_handlers(app.extensions['socketio'])
+        register_detection_jobs(app.extensions['socketio'])
+        register_live_detection_handlers(app.extensions['socketio'])
\ No newline at end of file
@@ -1,6 +1,7 @@
 from flask import Blueprint, render_template, request, redirect, url_for, session, flash, jsonify
 from utils.auth import hash_password, verify_password
 from utils.db import users_collection, testimonials_collection
+from utils.authors import author_cache
 from bson.objectid import ObjectId
 from utils import cloudinary_utils as cloud_utils
 
@@ -182,6 +183,9 @@ def update_user_profile():
         {'$set': update_data}
     )
 
+    # Forum and guide pages show the new name and picture right away
+    author_cache.invalidate(user_id)
+
     # Update session
     session['profile_pic'] = update_data.get('profile_pic') or session.get('profile_pic')
 
@@ -2,12 +2,73 @@ from flask import Blueprint, render_template, request, jsonify, session, redirec
 from datetime import datetime, timedelta
 from bson.objectid import ObjectId
 from datetime import datetime
-from utils.db import users_collection, posts_collection, notifications_collection
+import time
+from utils.db import users_collection, posts_collection, comments_collection, notifications_collection
+from utils import forum_comments
+from utils.authors import author_cache, collect_user_ids
+from utils.pagination import InvalidCursor, cursor_values, decode_cursor, encode_cursor, keyset_filter, page_size
+from pymongo import ASCENDING, DESCENDING, ReturnDocument
 from flask_socketio import join_room
 from utils import cloudinary_utils as cloud_utils
 
 community_forum_bp = Blueprint('community_forum', __name__)
 
+# Feed sort orders; _id breaks ties so every post has a unique position for keyset pagination
+FEED_SORTS = {
+    'latest': [('date', DESCENDING), ('_id', DESCENDING)],
+    'oldest': [('date', ASCENDING), ('_id', ASCENDING)],
+    'most-liked': [('likes', DESCENDING), ('_id', DESCENDING)],
+    'most-commented': [('total_comments', DESCENDING), ('_id', DESCENDING)],
+}
+
+# Fields sent for each post in the feed; comments load separately through get_comments()
+POST_SUMMARY_FIELDS = ('title', 'description', 'image', 'user_id', 'likes', 'total_comments', 'date')
+
+_feed_indexes_ready = False
+
+# Posts from before the total_comments counter have no counter until scripts/backfill_comment_counts runs.
+# Keyset filters never match a missing counter, so until then "most commented" falls back to the latest posts.
+COMMENT_COUNTERS_CHECK_SECONDS = 60
+_comment_counters_ready = False
+_comment_counters_checked_at = None
+
+# Projection for feed posts; MongoDB works out whether the user liked each post, so liked_by is never sent
+def post_summary_projection(user_id):
+    projection = {field: 1 for field in POST_SUMMARY_FIELDS}
+    projection['liked'] = {'$in': [user_id, {'$ifNull': ['$liked_by', []]}]}
+    return projection
+
+# Create the indexes the paginated feed and comment threads rely on (once per process)
+def ensure_feed_indexes():
+    global _feed_indexes_ready
+    if _feed_indexes_ready:
+        return
+    try:
+        for sort_spec in (FEED_SORTS['latest'], FEED_SORTS['most-liked'], FEED_SORTS['most-commented']):
+            posts_collection.create_index(sort_spec)
+            # The 'own' scope filters on user_id before sorting
+            posts_collection.create_index([('user_id', ASCENDING)] + sort_spec)
+        forum_comments.ensure_comment_indexes(comments_collection)
+    except Exception as e:
+        print(f"Could not create feed indexes: {e}")
+        return
+    _feed_indexes_ready = True
+
+# Whether every post has a total_comments counter (checked at most once a minute until it does)
+def comment_counters_ready():
+    global _comment_counters_ready, _comment_counters_checked_at
+    if _comment_counters_ready:
+        return True
+    now = time.monotonic()
+    if _comment_counters_checked_at is not None and now - _comment_counters_checked_at < COMMENT_COUNTERS_CHECK_SECONDS:
+        return False
+    _comment_counters_checked_at = now
+    # {'total_comments': None} also matches a missing field and can use the (total_comments, _id) index
+    _comment_counters_ready = posts_collection.find_one({'total_comments': None}, {'_id': 1}) is None
+    if not _comment_counters_ready:
+        print("Some forum posts have no total_comments counter; run scripts.backfill_comment_counts")
+    return _comment_counters_ready
+
 # Get the socketio instance from app
 def get_socketio():
     return current_app.extensions['socketio']
@@ -20,6 +81,19 @@ def normalize_profile_pic(raw_pic):
         return raw_pic
     return url_for('uploaded_file', filename=raw_pic)
 
+# Helper to build the author block of a post or comment from a map returned by author_cache.resolve
+def author_info(authors, user_id, unknown='Unknown'):
+    author = authors.get(str(user_id))
+    if not author:
+        return {
+            'name': unknown,
+            'profile_pic': url_for('static', filename='images/default_profile.png')
+        }
+    return {
+        'name': author.get('name', unknown),
+        'profile_pic': normalize_profile_pic(author.get('profile_pic'))
+    }
+
 # Helper function to calculate the time ago string for a given date
 def time_ago(date):
     now = datetime.utcnow()
@@ -66,15 +140,6 @@ def convert_ids(obj):
         for i in range(len(obj)):
             convert_ids(obj[i])
 
-# Helper function to count the total number of comments in a list of comments
-def count_comments(comments):
-    count = 0
-    for comment in comments:
-        count += 1
-        if 'replies' in comment:
-            count += count_comments(comment['replies'])
-    return count
-
 # Community Forum Route
 @community_forum_bp.route('/community-forum')
 def community_forum():
@@ -86,85 +151,63 @@ def community_forum():
     # normalize current user's profile pic for template
     user['profile_pic'] = normalize_profile_pic(user.get('profile_pic'))
 
-    posts = list(posts_collection.find().sort('date', -1))
-
-    # Add user data to each post (normalize profile pics)
-    for post in posts:
-        try:
-            post_user = users_collection.find_one({'_id': ObjectId(post['user_id'])})
-            post['user'] = {
-                'name': post_user['name'],
-                'profile_pic': normalize_profile_pic(post_user.get('profile_pic'))
-            }
-        except Exception:
-            post['user'] = {
-                'name': 'Unknown',
-                'profile_pic': url_for('static', filename='images/default_profile.png')
-            }
-        post['time_ago'] = time_ago(post['date'])
+    # Posts are loaded page by page by community_forum.js through get_posts()
+    return render_template('community_forum.html', user=user)
 
-    return render_template('community_forum.html', user=user, posts=posts)
-
-# Get Posts Route
+# Get Posts Route (one page of the feed; pass the returned next_cursor back as ?cursor= for the next page)
 @community_forum_bp.route('/community-forum/posts')
 def get_posts():
     # Read the new query parameters for sort and scope.
     sort_option = request.args.get('sort', 'latest')
     scope_option = request.args.get('scope', 'all')
+    cursor = request.args.get('cursor')
+    limit = page_size(request.args.get('limit'))
     
     if 'user_id' not in session:
         return jsonify({'error': 'Unauthorized'}), 401
 
+    ensure_feed_indexes()
+
     # Build the query filter based on the scope option.
     query = {}
     if scope_option == 'own':
         query['user_id'] = session['user_id']
 
-    # Fetch posts based on the sort option using the query filter.
-    if sort_option == 'latest':
-        posts = list(posts_collection.find(query).sort('date', -1))
-    elif sort_option == 'oldest':
-        posts = list(posts_collection.find(query).sort('date', 1))
-    elif sort_option == 'most-liked':
-        posts = list(posts_collection.find(query).sort('likes', -1))
-    elif sort_option == 'most-commented':
-        posts = sorted(
-            posts_collection.find(query),
-            key=lambda p: count_comments(p.get('comments', [])),
-            reverse=True
-        )
-    else:
-        posts = list(posts_collection.find(query).sort('date', -1))
-    
-    # Convert posts to a list if not already one
-    if not isinstance(posts, list):
-        posts = list(posts)
-
-    # Add user data and computed "time ago" to each post
+    sort_name = sort_option if sort_option in FEED_SORTS else 'latest'
+    if sort_name == 'most-commented' and not comment_counters_ready():
+        sort_name = 'latest'
+    sort_spec = FEED_SORTS[sort_name]
+    if cursor:
+        try:
+            query = {'$and': [query, keyset_filter(sort_spec, decode_cursor(cursor, sort_name))]}
+        except InvalidCursor:
+            return jsonify({'error': 'Invalid cursor'}), 400
+
+    # One extra post tells whether another page follows
+    posts = list(posts_collection.aggregate([
+        {'$match': query},
+        {'$sort': dict(sort_spec)},
+        {'$limit': limit + 1},
+        {'$project': post_summary_projection(session['user_id'])},
+    ]))
+    next_cursor = None
+    if len(posts) > limit:
+        posts = posts[:limit]
+        next_cursor = encode_cursor(sort_name, cursor_values(posts[-1], sort_spec))
+
+    # Add user data and computed "time ago" to each post (all authors are fetched in one query)
+    authors = author_cache.resolve(collect_user_ids(posts))
     for post in posts:
-        user_id = ObjectId(post['user_id']) if isinstance(post['user_id'], str) else post['user_id']
-        post_user = users_collection.find_one({'_id': user_id})
-        post['total_comments'] = count_comments(post.get('comments', []))
-        
-        if post_user:
-            post['user'] = {
-                'name': post_user['name'],
-                'profile_pic': normalize_profile_pic(post_user.get('profile_pic'))
-            }
-        else:
-            post['user'] = {
-                'name': 'Unknown User',
-                'profile_pic': url_for('static', filename='images/default_profile.png')
-            }
+        post.setdefault('total_comments', 0)
+        post['user'] = author_info(authors, post['user_id'], 'Unknown User')
 
         post['time_ago'] = time_ago(post['date'])
-        post['liked'] = session['user_id'] in post.get('liked_by', [])
 
     # Recursively convert ObjectIds to strings
     for post in posts:
         convert_ids(post)
 
-    return jsonify(posts), 200
+    return jsonify({'posts': posts, 'next_cursor': next_cursor}), 200
 
 # Create Post Route
 @community_forum_bp.route('/create-post', methods=['POST'])
@@ -186,7 +229,7 @@ def create_post():
         'user_id': user_id,
         'likes': 0,
         'liked_by': [],
-        'comments': [],
+        'total_comments': 0,
         'date': datetime.utcnow()
     }
 
@@ -201,15 +244,12 @@ def create_post():
     # Insert the post into the database
     result = posts_collection.insert_one(post_data)
     post_id = result.inserted_id
-    # Add the post ID to the response
+    # Respond with the same summary fields as the feed, plus the post ID
+    post_data = {field: post_data[field] for field in POST_SUMMARY_FIELDS if field in post_data}
     post_data['_id'] = str(post_id)  
 
     # Fetch the user data for the post
-    post_user = users_collection.find_one({'_id': ObjectId(user_id)})
-    post_data['user'] = {
-        'name': post_user['name'],
-        'profile_pic': normalize_profile_pic(post_user.get('profile_pic'))
-    }
+    post_data['user'] = author_info(author_cache.resolve([user_id]), user_id)
 
     # Add the time_ago value to the response
     post_data['time_ago'] = time_ago(post_data['date'])
@@ -274,15 +314,14 @@ def update_post(post_id):
 
     posts_collection.update_one({'_id': ObjectId(post_id)}, {'$set': update_fields})
     
-    # Get updated post for socket event
-    updated_post = posts_collection.find_one({'_id': ObjectId(post_id)})
+    # Get updated post for socket event (summary fields only)
+    updated_post = posts_collection.find_one(
+        {'_id': ObjectId(post_id)},
+        {field: 1 for field in POST_SUMMARY_FIELDS}
+    )
     
     # Add user data to the updated post
-    post_user = users_collection.find_one({'_id': ObjectId(updated_post['user_id'])})
-    updated_post['user'] = {
-        'name': post_user['name'],
-        'profile_pic': normalize_profile_pic(post_user.get('profile_pic'))
-    }
+    updated_post['user'] = author_info(author_cache.resolve([updated_post['user_id']]), updated_post['user_id'])
     
     # Add time_ago to the updated post
     updated_post['time_ago'] = time_ago(updated_post['date'])
@@ -319,6 +358,7 @@ def delete_post(post_id):
             pass
 
     posts_collection.delete_one({'_id': ObjectId(post_id)})
+    comments_collection.delete_many({'post_id': ObjectId(post_id)})
     
     # Emit socket event for deleted post
     socketio = get_socketio()
@@ -332,26 +372,28 @@ def like_post(post_id):
     if 'user_id' not in session:
         return jsonify({'error': 'Unauthorized'}), 401
 
-    # Toggle like status
-    post = posts_collection.find_one({'_id': ObjectId(post_id)})
     user_id = session['user_id']
-    post_owner_id = post['user_id']
 
-    if user_id in post.get('liked_by', []):
-        # User already liked the post, so unlike it
-        posts_collection.update_one(
-            {'_id': ObjectId(post_id)},
-            {'$inc': {'likes': -1}, '$pull': {'liked_by': user_id}}
-        )
-        liked = False
-    else:
-        # User has not liked the post, so like it
-        posts_collection.update_one(
-            {'_id': ObjectId(post_id)},
-            {'$inc': {'likes': 1}, '$push': {'liked_by': user_id}}
+    # Toggle like status atomically: like if the user is not in liked_by yet, otherwise unlike
+    updated_post = posts_collection.find_one_and_update(
+        {'_id': ObjectId(post_id), 'liked_by': {'$ne': user_id}},
+        {'$inc': {'likes': 1}, '$push': {'liked_by': user_id}},
+        projection={'user_id': 1, 'likes': 1},
+        return_document=ReturnDocument.AFTER
+    )
+    liked = updated_post is not None
+    if not liked:
+        updated_post = posts_collection.find_one_and_update(
+            {'_id': ObjectId(post_id), 'liked_by': user_id},
+            {'$inc': {'likes': -1}, '$pull': {'liked_by': user_id}},
+            projection={'user_id': 1, 'likes': 1},
+            return_document=ReturnDocument.AFTER
         )
-        liked = True
-        
+        if not updated_post:
+            return jsonify({'error': 'Post not found'}), 404
+    post_owner_id = updated_post['user_id']
+
+    if liked:
         # Create notification for post owner if the liker is not the owner
         if user_id != post_owner_id:
             # Get user info for notification
@@ -382,15 +424,13 @@ def like_post(post_id):
                 'post_id': post_id
             }, room=post_owner_id)
 
-    # Fetch the updated like count
-    updated_post = posts_collection.find_one({'_id': ObjectId(post_id)})
-    
-    # Emit socket event for post like update
+    # Emit socket event for post like update (only the user who toggled, not the whole liked_by list)
     socketio = get_socketio()
     socketio.emit('update_post_likes', {
         'post_id': post_id,
         'likes': updated_post['likes'],
-        'liked_by': updated_post.get('liked_by', [])
+        'user_id': user_id,
+        'liked': liked
     })
     
     return jsonify({
@@ -399,6 +439,57 @@ def like_post(post_id):
         'liked': liked
     }), 200
 
+# Helper to bump a post's comment counter; returns the post's owner and new count, or None if the post is gone
+def increment_comment_count(post_id, amount):
+    return posts_collection.find_one_and_update(
+        {'_id': ObjectId(post_id)},
+        {'$inc': {'total_comments': amount}},
+        projection={'user_id': 1, 'total_comments': 1},
+        return_document=ReturnDocument.AFTER
+    )
+
+# Helper to store a new comment or reply and then count it on its post, so a failed insert never inflates
+# the counter; returns the post's owner and new count, or None (and removes the comment) if the post is gone
+def insert_comment(comment):
+    comments_collection.insert_one(comment)
+    updated_post = increment_comment_count(comment['post_id'], 1)
+    if not updated_post:
+        comments_collection.delete_one({'_id': comment['_id']})
+    return updated_post
+
+# Helper to build the response/socket payload for a comment the current user just wrote
+def new_comment_response(comment, user):
+    return {
+        '_id': str(comment['_id']),
+        'text': comment['text'],
+        'date': comment['date'],
+        'likes': 0, # Initialize likes to 0
+        'can_edit': True, # Set can_edit to True for the logged-in user
+        'user': {
+            'name': user['name'],
+            'profile_pic': normalize_profile_pic(user.get('profile_pic'))
+        }
+    }
+
+# Helper to toggle the current user's like on a comment or reply of a post atomically; returns (comment, liked),
+# or (None, None) if there is no such comment on that post
+def toggle_comment_like(post_id, comment_id, user_id):
+    comment = comments_collection.find_one_and_update(
+        {'_id': ObjectId(comment_id), 'post_id': ObjectId(post_id), 'liked_by': {'$ne': user_id}},
+        {'$inc': {'likes': 1}, '$push': {'liked_by': user_id}},
+        projection={'user_id': 1, 'likes': 1},
+        return_document=ReturnDocument.AFTER
+    )
+    if comment:
+        return comment, True
+    comment = comments_collection.find_one_and_update(
+        {'_id': ObjectId(comment_id), 'post_id': ObjectId(post_id), 'liked_by': user_id},
+        {'$inc': {'likes': -1}, '$pull': {'liked_by': user_id}},
+        projection={'user_id': 1, 'likes': 1},
+        return_document=ReturnDocument.AFTER
+    )
+    return (comment, False) if comment else (None, None)
+
 # Add Comment Route
 @community_forum_bp.route('/add-comment/<post_id>', methods=['POST'])
 def add_comment(post_id):
@@ -412,43 +503,22 @@ def add_comment(post_id):
     if not comment_text:
         return jsonify({'error': 'Comment text is required'}), 400
 
-    # Prepare the comment data
-    new_comment = {
-        '_id': ObjectId(),
-        'post_id': ObjectId(post_id),
-        'user_id': session['user_id'],
-        'text': comment_text,
-        'date': datetime.utcnow(),
-        'replies': [], # Ensure top-level comments also have a 'replies' field
-        'likes': 0, # # Initialize like count
-        'liked_by': [] # Initialize list of users who liked it
-    }
-
-    # Insert the comment into the database
-    posts_collection.update_one(
-        {'_id': ObjectId(post_id)},
-        {'$push': {'comments': new_comment}}
-    )
+    if not posts_collection.find_one({'_id': ObjectId(post_id)}, {'_id': 1}):
+        return jsonify({'error': 'Post not found'}), 404
 
-    # Fetch the updated post
-    updated_post = posts_collection.find_one({'_id': ObjectId(post_id)})
+    # Insert the comment into its own collection, then bump the post's counter (only once the comment is stored)
+    new_comment = forum_comments.new_comment(post_id, session['user_id'], comment_text)
+    updated_post = insert_comment(new_comment)
+    if not updated_post:
+        return jsonify({'error': 'Post not found'}), 404
     post_owner_id = updated_post['user_id']
+    total_comments = updated_post['total_comments']
 
     # Fetch the user data for the comment
     user = users_collection.find_one({'_id': ObjectId(session['user_id'])})
 
     # Prepare comment data for response
-    comment_response = {
-        '_id': str(new_comment['_id']),
-        'text': new_comment['text'],
-        'date': new_comment['date'],
-        'likes': 0, # Initialize likes to 0
-        'can_edit': True, # Set can_edit to True for the logged-in user
-        'user': {
-            'name': user['name'],
-            'profile_pic': normalize_profile_pic(user.get('profile_pic'))
-        }
-    }
+    comment_response = new_comment_response(new_comment, user)
     
     # Create notification for post owner if commenter is not the owner
     if session['user_id'] != post_owner_id:
@@ -481,8 +551,6 @@ def add_comment(post_id):
     
     # Emit socket event for new comment
     socketio = get_socketio()
-    updated_post = posts_collection.find_one({'_id': ObjectId(post_id)})
-    total_comments = count_comments(updated_post.get('comments', []))
     data = {
         'post_id': post_id,
         'comment': comment_response,
@@ -494,7 +562,7 @@ def add_comment(post_id):
     return jsonify({
         'message': 'Comment added successfully',
         'new_comment': comment_response,
-        'comments_count': len(updated_post.get('comments', []))
+        'comments_count': total_comments
     }), 201
 
 # Add Reply Route
@@ -509,49 +577,29 @@ def add_reply(comment_id):
     if not reply_text:
         return jsonify({'error': 'Reply text is required'}), 400
 
-    # Prepare the reply data
-    reply = {
-        '_id': ObjectId(),  # Generate a unique ID for the reply
-        'comment_id': ObjectId(comment_id),
-        'user_id': session['user_id'],
-        'text': reply_text,
-        'date': datetime.utcnow(),
-        'replies': [],  # Nested replies
-        'likes': 0,  # Initialize like count
-        'liked_by': []  # Initialize list of users who liked it
-    }
-
-    # Insert the reply into the database under the correct comment
-    posts_collection.update_one(
-        {'comments._id': ObjectId(comment_id)},
-        {'$push': {'comments.$.replies': reply}}
+    # Find the comment being replied to
+    comment = comments_collection.find_one(
+        {'_id': ObjectId(comment_id)},
+        {'post_id': 1, 'path': 1, 'depth': 1, 'user_id': 1}
     )
-
-    # Fetch the updated comment and user data
-    post = posts_collection.find_one({'comments._id': ObjectId(comment_id)})
-    post_id = str(post['_id'])
-    comment = next((c for c in post['comments'] if c['_id'] == ObjectId(comment_id)), None)
+    if not comment:
+        return jsonify({'error': 'Comment not found'}), 404
+    post_id = str(comment['post_id'])
     comment_owner_id = comment['user_id']
+
+    # Insert the reply beneath the comment
+    reply = forum_comments.new_comment(post_id, session['user_id'], reply_text, parent=comment)
+    updated_post = insert_comment(reply)
+    if not updated_post:
+        return jsonify({'error': 'Post not found'}), 404
+    total_comments = updated_post['total_comments']
     user = users_collection.find_one({'_id': ObjectId(session['user_id'])})
 
     # Prepare reply data for response
-    reply_response = {
-        '_id': str(reply['_id']),
-        'text': reply['text'],
-        'date': reply['date'],
-        'likes': 0, # Initialize likes to 0
-        'can_edit': True, # Set can_edit to True for the logged-in user
-        'user': {
-            'name': user['name'],
-            'profile_pic': normalize_profile_pic(user.get('profile_pic'))
-        }
-    }
+    reply_response = new_comment_response(reply, user)
     
     # Create notification for comment owner if replier is not the owner
     if session['user_id'] != comment_owner_id:
-        # Get comment owner info
-        comment_owner = users_collection.find_one({'_id': ObjectId(comment_owner_id)})
-        
         # Create notification
         notification = {
             'type': 'comment_reply',
@@ -583,8 +631,6 @@ def add_reply(comment_id):
     
     # Emit socket event for new reply
     socketio = get_socketio()
-    updated_post = posts_collection.find_one({'_id': ObjectId(post_id)})
-    total_comments = count_comments(updated_post.get('comments', []))
     data = {
         'post_id': post_id,
         'comment_id': comment_id,
@@ -611,97 +657,36 @@ def add_nested_reply(post_id, reply_id):
     if not reply_text:
         return jsonify({'error': 'Reply text is required'}), 400
 
-    # Find the post by its ID
-    post = posts_collection.find_one({'_id': ObjectId(post_id)})
-    if not post:
-        return jsonify({'error': 'Post not found'}), 404
-
-    # Build the new nested reply
-    nested_reply = {
-        '_id': ObjectId(),
-        'reply_id': ObjectId(reply_id),
-        'user_id': session['user_id'],
-        'text': reply_text,
-        'date': datetime.utcnow(),
-        'replies': [], # so we can nest further
-        'likes': 0, # Initialize like count
-        'liked_by': [] # Initialize list of users who liked it
-    }
-
-    # Find the parent reply and its owner
-    parent_reply_owner_id = None
-    
-    # Recursive helper to find parent reply
-    def find_parent_reply(replies_list, target_id):
-        for r in replies_list:
-            if str(r['_id']) == str(target_id):
-                return r
-            if 'replies' in r:
-                found = find_parent_reply(r['replies'], target_id)
-                if found:
-                    return found
-        return None
-
-    # Search through all comments/replies in the post to find parent reply
-    for c in post.get('comments', []):
-        parent_reply = find_parent_reply(c.get('replies', []), reply_id)
-        if parent_reply:
-            parent_reply_owner_id = parent_reply['user_id']
-            break
-
-    # Recursive helper to insert nested reply
-    def insert_nested_reply(replies_list, target_id, new_reply):
-        for r in replies_list:
-            if str(r['_id']) == str(target_id):
-                # Found the target
-                r.setdefault('replies', [])
-                r['replies'].append(new_reply)
-                return True
-            if 'replies' in r:
-                if insert_nested_reply(r['replies'], target_id, new_reply):
-                    return True
-        return False
-
-    # Search through all comments/replies in the post
-    inserted = False
-    for c in post.get('comments', []):
-        if insert_nested_reply(c.get('replies', []), reply_id, nested_reply):
-            inserted = True
-            break
-
-    if not inserted:
+    # Find the parent reply (at any depth) and its owner
+    parent_reply = comments_collection.find_one(
+        {'_id': ObjectId(reply_id), 'post_id': ObjectId(post_id)},
+        {'post_id': 1, 'path': 1, 'depth': 1, 'user_id': 1}
+    )
+    if not parent_reply:
         return jsonify({'error': 'Reply not found at any depth'}), 404
+    parent_reply_owner_id = parent_reply['user_id']
 
-    # Replace entire post doc with updated structure
-    posts_collection.replace_one({'_id': post['_id']}, post)
+    # Insert the nested reply beneath its parent
+    nested_reply = forum_comments.new_comment(post_id, session['user_id'], reply_text, parent=parent_reply)
+    updated_post = insert_comment(nested_reply)
+    if not updated_post:
+        return jsonify({'error': 'Post not found'}), 404
+    total_comments = updated_post['total_comments']
 
     # Get user info for response
     user = users_collection.find_one({'_id': ObjectId(session['user_id'])})
     
     # Prepare nested reply data for response
-    nested_reply_response = {
-        '_id': str(nested_reply['_id']),
-        'text': nested_reply['text'],
-        'date': nested_reply['date'],
-        'likes': 0, # Initialize likes to 0
-        'can_edit': True, # Set can_edit to True for the logged-in user
-        'user': {
-            'name': user['name'],
-            'profile_pic': normalize_profile_pic(user.get('profile_pic'))
-        }
-    }
+    nested_reply_response = new_comment_response(nested_reply, user)
     
     # Create notification for parent reply owner if replier is not the owner
     if parent_reply_owner_id and session['user_id'] != parent_reply_owner_id:
-        # Get parent reply owner info
-        parent_reply_owner = users_collection.find_one({'_id': ObjectId(parent_reply_owner_id)})
-        
         # Create notification
         notification = {
             'type': 'nested_reply',
             'sender_id': session['user_id'],
             'receiver_id': parent_reply_owner_id,
-            'post_id': str(post['_id']),
+            'post_id': post_id,
             'reply_id': reply_id,
             'nested_reply_id': str(nested_reply['_id']),
             'content': f"{user['name']} replied to your comment",
@@ -720,17 +705,15 @@ def add_nested_reply(post_id, reply_id):
             'sender_name': user['name'],
             'content': f"{user['name']} replied to your comment",
             'timestamp': datetime.utcnow().isoformat(),
-            'post_id': str(post['_id']),
+            'post_id': post_id,
             'reply_id': reply_id,
             'nested_reply_id': str(nested_reply['_id'])
         }, room=parent_reply_owner_id)
     
     # Emit socket event for new nested reply
     socketio = get_socketio()
-    updated_post = posts_collection.find_one({'_id': ObjectId(post_id)})
-    total_comments = count_comments(updated_post.get('comments', []))
     data = {
-        'post_id': str(post['_id']),
+        'post_id': post_id,
         'reply_id': reply_id,
         'nested_reply': nested_reply_response,
         'total_comments': total_comments
@@ -754,12 +737,7 @@ def update_comment(post_id, comment_id):
     if not new_text:
         return jsonify({'error': 'New text is required'}), 400
 
-    post = posts_collection.find_one({'_id': ObjectId(post_id)})
-    if not post:
-        return jsonify({'error': 'Post not found'}), 404
-
-    # Locate the comment within the post's comments array
-    comment = next((c for c in post.get('comments', []) if str(c['_id']) == comment_id), None)
+    comment = comments_collection.find_one({'_id': ObjectId(comment_id), 'post_id': ObjectId(post_id)}, {'user_id': 1})
     if not comment:
         return jsonify({'error': 'Comment not found'}), 404
 
@@ -767,9 +745,9 @@ def update_comment(post_id, comment_id):
         return jsonify({'error': "You don't have access to update this comment"}), 403
 
     # Update the comment text and refresh its date
-    posts_collection.update_one(
-        {'_id': ObjectId(post_id), 'comments._id': ObjectId(comment_id)},
-        {'$set': {'comments.$.text': new_text, 'comments.$.date': datetime.utcnow()}}
+    comments_collection.update_one(
+        {'_id': ObjectId(comment_id)},
+        {'$set': {'text': new_text, 'date': datetime.utcnow()}}
     )
     
     # Emit socket event for updated comment
@@ -796,37 +774,18 @@ def update_reply(post_id, reply_id):
     if not new_text:
         return jsonify({'error': 'New text is required'}), 400
 
-    post = posts_collection.find_one({'_id': ObjectId(post_id)})
-    if not post:
-        return jsonify({'error': 'Post not found'}), 404
+    reply = comments_collection.find_one({'_id': ObjectId(reply_id), 'post_id': ObjectId(post_id)}, {'user_id': 1})
+    if not reply:
+        return jsonify({'error': 'Reply not found'}), 404
 
-    # Recursive helper to update a reply within a list of replies
-    def update_reply_recursive(replies):
-        for reply in replies:
-            if str(reply['_id']) == str(reply_id):
-                if reply['user_id'] != session['user_id']:
-                    return False, "You don't have access to update this reply"
-                reply['text'] = new_text
-                reply['date'] = datetime.utcnow()
-                return True, None
-            if 'replies' in reply:
-                found, err = update_reply_recursive(reply['replies'])
-                if found:
-                    return True, None
-        return False, None
-
-    updated = False
-    for comment in post.get('comments', []):
-        if 'replies' in comment:
-            found, err = update_reply_recursive(comment['replies'])
-            if found:
-                updated = True
-                break
-
-    if not updated:
-        return jsonify({'error': err or 'Reply not found'}), 404
-
-    posts_collection.replace_one({'_id': post['_id']}, post)
+    if reply['user_id'] != session['user_id']:
+        return jsonify({'error': "You don't have access to update this reply"}), 404
+
+    # Update the reply text and refresh its date
+    comments_collection.update_one(
+        {'_id': ObjectId(reply_id)},
+        {'$set': {'text': new_text, 'date': datetime.utcnow()}}
+    )
     
     # Emit socket event for updated reply
     socketio = get_socketio()
@@ -847,25 +806,20 @@ def delete_comment(post_id, comment_id):
     if 'user_id' not in session:
         return jsonify({'error': 'Unauthorized'}), 401
 
-    post = posts_collection.find_one({'_id': ObjectId(post_id)})
-    if not post:
-        return jsonify({'error': 'Post not found'}), 404
-
-    comment = next((c for c in post.get('comments', []) if str(c['_id']) == comment_id), None)
+    comment = comments_collection.find_one(
+        {'_id': ObjectId(comment_id), 'post_id': ObjectId(post_id)},
+        {'post_id': 1, 'path': 1, 'user_id': 1}
+    )
     if not comment:
         return jsonify({'error': 'Comment not found'}), 404
 
     if comment['user_id'] != session['user_id']:
         return jsonify({'error': "You don't have access to delete this comment"}), 403
 
-    posts_collection.update_one(
-        {'_id': ObjectId(post_id)},
-        {'$pull': {'comments': {'_id': ObjectId(comment_id)}}}
-    )
-    
-    # Get updated comment count
-    updated_post = posts_collection.find_one({'_id': ObjectId(post_id)})
-    total_comments = count_comments(updated_post.get('comments', []))
+    # The comment's replies go with it, so the counter drops by the whole subtree
+    removed = comments_collection.delete_many(forum_comments.subtree_query(comment)).deleted_count
+    updated_post = increment_comment_count(post_id, -removed)
+    total_comments = updated_post['total_comments'] if updated_post else 0
     
     # Emit socket event for deleted comment
     socketio = get_socketio()
@@ -883,38 +837,20 @@ def delete_reply(post_id, reply_id):
     if 'user_id' not in session:
         return jsonify({'error': 'Unauthorized'}), 401
 
-    post = posts_collection.find_one({'_id': ObjectId(post_id)})
-    if not post:
-        return jsonify({'error': 'Post not found'}), 404
+    reply = comments_collection.find_one(
+        {'_id': ObjectId(reply_id), 'post_id': ObjectId(post_id)},
+        {'post_id': 1, 'path': 1, 'user_id': 1}
+    )
+    if not reply:
+        return jsonify({'error': 'Reply not found'}), 404
+
+    if reply['user_id'] != session['user_id']:
+        return jsonify({'error': "You don't have access to delete this reply"}), 404
 
-    # Recursive helper to remove a reply from a list of replies
-    def remove_reply(replies):
-        for i, reply in enumerate(replies):
-            if str(reply['_id']) == reply_id:
-                if reply['user_id'] != session['user_id']:
-                    return False, "You don't have access to delete this reply"
-                replies.pop(i)
-                return True, None
-            if 'replies' in reply:
-                found, err = remove_reply(reply['replies'])
-                if found:
-                    return True, None
-        return False, None
-
-    deleted = False
-    for comment in post.get('comments', []):
-        if 'replies' in comment:
-            found, err = remove_reply(comment['replies'])
-            if found:
-                deleted = True
-                break
-
-    if not deleted:
-        return jsonify({'error': err or 'Reply not found'}), 404
-
-    posts_collection.replace_one({'_id': post['_id']}, post)
-    updated_post = posts_collection.find_one({'_id': ObjectId(post_id)})
-    total_comments = count_comments(updated_post.get('comments', []))  
+    # Remove the reply and its nested replies
+    removed = comments_collection.delete_many(forum_comments.subtree_query(reply)).deleted_count
+    updated_post = increment_comment_count(post_id, -removed)
+    total_comments = updated_post['total_comments'] if updated_post else 0
     
     # Emit socket event for deleted reply
     socketio = get_socketio()
@@ -932,63 +868,43 @@ def like_comment(post_id, comment_id):
     if 'user_id' not in session:
         return jsonify({'error': 'Unauthorized'}), 401
     user_id = session['user_id']
-    post = posts_collection.find_one({'_id': ObjectId(post_id)})
-    if not post:
-        return jsonify({'error': 'Post not found'}), 404
-    # Find the comment
-    comment = next((c for c in post.get('comments', []) if str(c['_id']) == comment_id), None)
+
+    # Toggle like
+    comment, liked = toggle_comment_like(post_id, comment_id, user_id)
     if not comment:
         return jsonify({'error': 'Comment not found'}), 404
 
-    # Initialize like fields if missing
-    if 'likes' not in comment:
-        comment['likes'] = 0
-    if 'liked_by' not in comment:
-        comment['liked_by'] = []
-
-    # Toggle like
-    if user_id in comment['liked_by']:
-        comment['liked_by'].remove(user_id)
-        comment['likes'] -= 1
-        liked = False
-    else:
-        comment['liked_by'].append(user_id)
-        comment['likes'] += 1
-        liked = True
+    # Create notification for comment owner if liker is not the owner
+    if liked and user_id != comment['user_id']:
+        # Get user info for notification
+        liker = users_collection.find_one({'_id': ObjectId(user_id)})
         
-        # Create notification for comment owner if liker is not the owner
-        if user_id != comment['user_id']:
-            # Get user info for notification
-            liker = users_collection.find_one({'_id': ObjectId(user_id)})
-            
-            # Create notification
-            notification = {
-                'type': 'comment_like',
-                'sender_id': user_id,
-                'receiver_id': comment['user_id'],
-                'post_id': post_id,
-                'comment_id': comment_id,
-                'content': f"{liker['name']} liked your comment",
-                'timestamp': datetime.utcnow(),
-                'read': False
-            }
-            
-            # Save notification to database
-            notifications_collection.insert_one(notification)
-            
-            # Emit notification to comment owner
-            socketio = get_socketio()
-            socketio.emit('notification', {
-                'type': 'comment_like',
-                'sender_id': user_id,
-                'sender_name': liker['name'],
-                'content': f"{liker['name']} liked your comment",
-                'timestamp': datetime.utcnow().isoformat(),
-                'post_id': post_id,
-                'comment_id': comment_id
-            }, room=comment['user_id'])
-
-    posts_collection.replace_one({'_id': post['_id']}, post)
+        # Create notification
+        notification = {
+            'type': 'comment_like',
+            'sender_id': user_id,
+            'receiver_id': comment['user_id'],
+            'post_id': post_id,
+            'comment_id': comment_id,
+            'content': f"{liker['name']} liked your comment",
+            'timestamp': datetime.utcnow(),
+            'read': False
+        }
+        
+        # Save notification to database
+        notifications_collection.insert_one(notification)
+        
+        # Emit notification to comment owner
+        socketio = get_socketio()
+        socketio.emit('notification', {
+            'type': 'comment_like',
+            'sender_id': user_id,
+            'sender_name': liker['name'],
+            'content': f"{liker['name']} liked your comment",
+            'timestamp': datetime.utcnow().isoformat(),
+            'post_id': post_id,
+            'comment_id': comment_id
+        }, room=comment['user_id'])
     
     # Emit socket event for comment like update
     socketio = get_socketio()
@@ -996,7 +912,8 @@ def like_comment(post_id, comment_id):
         'post_id': post_id,
         'comment_id': comment_id,
         'likes': comment['likes'],
-        'liked_by': comment['liked_by']
+        'user_id': user_id,
+        'liked': liked
     })
     
     return jsonify({
@@ -1011,47 +928,13 @@ def like_reply(post_id, reply_id):
     if 'user_id' not in session:
         return jsonify({'error': 'Unauthorized'}), 401
     user_id = session['user_id']
-    post = posts_collection.find_one({'_id': ObjectId(post_id)})
-    if not post:
-        return jsonify({'error': 'Post not found'}), 404
-
-    # Recursive helper to toggle like in a list of replies
-    def toggle_like_in_replies(replies):
-        for reply in replies:
-            if str(reply['_id']) == reply_id:
-                if 'likes' not in reply:
-                    reply['likes'] = 0
-                if 'liked_by' not in reply:
-                    reply['liked_by'] = []
-                if user_id in reply['liked_by']:
-                    reply['liked_by'].remove(user_id)
-                    reply['likes'] -= 1
-                    return True, reply['likes'], False, reply['user_id'], reply['liked_by']
-                else:
-                    reply['liked_by'].append(user_id)
-                    reply['likes'] += 1
-                    return True, reply['likes'], True, reply['user_id'], reply['liked_by']
-            if 'replies' in reply:
-                found, like_count, liked, reply_owner_id, liked_by = toggle_like_in_replies(reply['replies'])
-                if found:
-                    return True, like_count, liked, reply_owner_id, liked_by
-        return False, None, None, None, None
 
     # Find the reply and toggle like
-    found = False
-    like_count = None
-    liked = None
-    reply_owner_id = None
-    liked_by = None
-    
-    for comment in post.get('comments', []):
-        if 'replies' in comment:
-            found, like_count, liked, reply_owner_id, liked_by = toggle_like_in_replies(comment['replies'])
-            if found:
-                break
-
-    if not found:
+    reply, liked = toggle_comment_like(post_id, reply_id, user_id)
+    if not reply:
         return jsonify({'error': 'Reply not found'}), 404
+    reply_owner_id = reply['user_id']
+    like_count = reply['likes']
 
     # Create notification for reply owner if liker is not the owner and it's a like (not unlike)
     if liked and user_id != reply_owner_id:
@@ -1084,9 +967,6 @@ def like_reply(post_id, reply_id):
             'post_id': post_id,
             'reply_id': reply_id
         }, room=reply_owner_id)
-
-    # Update the post with the new like count and return success
-    posts_collection.replace_one({'_id': post['_id']}, post)
     
     # Emit socket event for reply like update
     socketio = get_socketio()
@@ -1094,7 +974,8 @@ def like_reply(post_id, reply_id):
         'post_id': post_id,
         'reply_id': reply_id,
         'likes': like_count,
-        'liked_by': liked_by
+        'user_id': user_id,
+        'liked': liked
     })
     
     return jsonify({
@@ -1109,49 +990,40 @@ def get_comments(post_id):
     if 'user_id' not in session:
         return jsonify({'error': 'Unauthorized'}), 401
 
-    # Fetch the post and its comments
-    post = posts_collection.find_one({'_id': ObjectId(post_id)})
-    if not post:
+    ensure_feed_indexes()
+
+    # Make sure the post exists
+    if not posts_collection.find_one({'_id': ObjectId(post_id)}, {'_id': 1}):
         return jsonify({'error': 'Post not found'}), 404
 
-    # Recursive function to fetch nested replies
-    def fetch_replies(replies):
-        nested_replies = []
-        for reply in replies:
-            reply_user = users_collection.find_one({'_id': ObjectId(reply['user_id'])})
-            nested_replies.append({
-                '_id': str(reply['_id']),
-                'text': reply['text'],
-                'date': reply['date'],
-                'likes': reply.get('likes', 0),
-                'liked': (session['user_id'] in reply.get('liked_by', [])),
-                'can_edit': (reply['user_id'] == session['user_id']),
-                'user': {
-                    'name': reply_user['name'],
-                    'profile_pic': normalize_profile_pic(reply_user.get('profile_pic'))
-                },
-                'replies': fetch_replies(reply.get('replies', []))
-            })
-        return nested_replies
-
-    # Add user data to each comment and its replies
-    comments = []
-    for comment in post.get('comments', []):
-        comment_user = users_collection.find_one({'_id': ObjectId(comment['user_id'])})
-        comments.append({
-        '_id': str(comment['_id']),
-        'text': comment['text'],
-        'date': comment['date'],
-        'likes': comment.get('likes', 0),
-        'liked': (session['user_id'] in comment.get('liked_by', [])),
-        'can_edit': (comment['user_id'] == session['user_id']),
-        'user': {
-            'name': comment_user['name'],
-            'profile_pic': normalize_profile_pic(comment_user.get('profile_pic'))
-        },
-        'replies': fetch_replies(comment.get('replies', []))
-    })
+    # Every comment and reply of the post in thread order; MongoDB works out the per-user liked flag
+    user_id = session['user_id']
+    docs = list(comments_collection.aggregate([
+        {'$match': {'post_id': ObjectId(post_id)}},
+        {'$sort': {'path': 1}},
+        {'$project': {
+            'parent_id': 1, 'user_id': 1, 'text': 1, 'date': 1, 'likes': 1,
+            'liked': {'$in': [user_id, {'$ifNull': ['$liked_by', []]}]}
+        }},
+    ]))
+
+    # Authors of every comment and nested reply, fetched in one query
+    authors = author_cache.resolve(collect_user_ids(docs))
+
+    # Recursive function to shape a comment and its nested replies for the response
+    def format_comment(comment):
+        return {
+            '_id': str(comment['_id']),
+            'text': comment['text'],
+            'date': comment['date'],
+            'likes': comment.get('likes', 0),
+            'liked': comment['liked'],
+            'can_edit': (comment['user_id'] == user_id),
+            'user': author_info(authors, comment['user_id']),
+            'replies': [format_comment(reply) for reply in comment['replies']]
+        }
 
+    comments = [format_comment(comment) for comment in forum_comments.build_tree(docs)]
     return jsonify(comments), 200
 
 # Mark all notifications as read
@@ -1184,10 +1056,11 @@ def get_notifications():
     # Fetch all notifications for the current user
     notifications = list(notifications_collection.find({'receiver_id': session['user_id']}))
     
-    # Prepare notifications for JSON response
+    # Prepare notifications for JSON response (all senders are fetched in one query)
+    senders = author_cache.resolve(collect_user_ids(notifications, key='sender_id'))
     notification_list = []
     for notification in notifications:
-        sender = users_collection.find_one({'_id': ObjectId(notification['sender_id'])})
+        sender = senders.get(str(notification['sender_id']))
         notification_data = {
             'message_id': str(notification['_id']),
             'sender_id': notification['sender_id'],
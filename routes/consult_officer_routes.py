@@ -2,6 +2,7 @@ from flask import Blueprint, render_template, request, jsonify, session, redirec
 from bson.objectid import ObjectId
 from datetime import datetime
 from utils.db import users_collection, messages_collection, notifications_collection
+from utils.authors import author_cache, collect_user_ids
 from flask_socketio import join_room
 from collections import defaultdict
 from flask import request as flask_request
@@ -174,11 +175,12 @@ def get_notifications():
         'read': False
     }).sort('timestamp', -1))
     
-    # Format notifications for response
+    # Format notifications for response (all senders are fetched in one query)
+    senders = author_cache.resolve(collect_user_ids(unread_messages, key='sender_id'))
     notifications = []
     for notification  in unread_messages:
         sender_id = notification['sender_id']
-        sender = users_collection.find_one({'_id': ObjectId(sender_id)})
+        sender = senders.get(str(sender_id))
         
         if sender:
             notifications.append({
@@ -1,6 +1,7 @@
 from flask import Blueprint, render_template, request, session, redirect, url_for, jsonify
 from bson.objectid import ObjectId
 from utils.db import users_collection, cultivation_guides_collection
+from utils.authors import author_cache, collect_user_ids
 from datetime import datetime
 from bs4 import BeautifulSoup
 from utils import cloudinary_utils as cloud_utils
@@ -76,19 +77,14 @@ def cultivation_guide():
     
     # Get all cultivation guides
     guides = list(cultivation_guides_collection.find().sort('created_at', -1))
+    admins = author_cache.resolve(collect_user_ids(guides, key='created_by'))
     
     # Get admin names for each guide
     for guide in guides:
         guide['_id'] = str(guide['_id'])
         # Get admin name who created the guide
-        if 'created_by' in guide:
-            admin = users_collection.find_one({'_id': ObjectId(guide['created_by'])})
-            if admin:
-                guide['admin_name'] = admin.get('name', 'Unknown Admin')
-            else:
-                guide['admin_name'] = 'Unknown Admin'
-        else:
-            guide['admin_name'] = 'Unknown Admin'
+        admin = admins.get(str(guide.get('created_by')))
+        guide['admin_name'] = admin.get('name', 'Unknown Admin') if admin else 'Unknown Admin'
         
         # Check if current user has reacted to this guide
         if 'reactions' in guide and str(user['_id']) in guide['reactions']:
@@ -111,6 +107,7 @@ def list_guides():
     
     # Get all cultivation guides
     guides = list(cultivation_guides_collection.find().sort('created_at', -1))
+    admins = author_cache.resolve(collect_user_ids(guides, key='created_by'))
     
     # Get admin names for each guide and check if current user can edit/delete
     for guide in guides:
@@ -120,14 +117,8 @@ def list_guides():
         guide['can_edit'] = guide.get('created_by') == user_id
         
         # Get admin name who created the guide
-        if 'created_by' in guide:
-            admin = users_collection.find_one({'_id': ObjectId(guide['created_by'])})
-            if admin:
-                guide['admin_name'] = admin.get('name', 'Unknown Admin')
-            else:
-                guide['admin_name'] = 'Unknown Admin'
-        else:
-            guide['admin_name'] = 'Unknown Admin'
+        admin = admins.get(str(guide.get('created_by')))
+        guide['admin_name'] = admin.get('name', 'Unknown Admin') if admin else 'Unknown Admin'
         
         # Check if current user has reacted to this guide
         if 'reactions' in guide and user_id in guide['reactions']:
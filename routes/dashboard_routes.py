@@ -1,6 +1,7 @@
 from flask import Blueprint, render_template, session, redirect, url_for, request, jsonify
 from bson.objectid import ObjectId
-from utils.db import users_collection, testimonials_collection
+from utils.db import users_collection, testimonials_collection, prediction_rollups_collection
+from utils.prediction_rollups import PERIODS, rollup_series
 import datetime
 
 dashboard_bp = Blueprint('dashboard', __name__)
@@ -12,6 +13,24 @@ def dashboard():
     user = users_collection.find_one({'_id': ObjectId(session['user_id'])})
     return render_template('dashboard.html', user=user)
 
+# Disease prevalence for officers: per-class detection counts by day or week (served from the rollups)
+@dashboard_bp.route('/dashboard/disease-prevalence')
+def disease_prevalence():
+    if 'user_id' not in session:
+        return jsonify({'error': 'Unauthorized'}), 401
+    user = users_collection.find_one({'_id': ObjectId(session['user_id'])})
+
+    if not user or user.get('role') != 'admin':
+        return jsonify({'error': 'Unauthorized'}), 401
+
+    period = request.args.get('period', 'day')
+    if period not in PERIODS:
+        return jsonify({'error': 'period must be day or week'}), 400
+
+    default_buckets = 12 if period == 'week' else 30
+    buckets = min(max(request.args.get('buckets', default_buckets, type=int), 1), 366)
+    return jsonify(rollup_series(prediction_rollups_collection, period, buckets))
+
 @dashboard_bp.route('/get-testimonials')
 def get_testimonials():
     testimonials = list(testimonials_collection.find())
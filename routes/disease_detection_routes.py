@@ -1,21 +1,153 @@
-from flask import Blueprint, render_template, request, session, redirect, url_for, flash, jsonify
-from tensorflow.keras.models import load_model # type: ignore
-from tensorflow.keras.preprocessing.image import load_img, img_to_array # type: ignore
+from flask import Blueprint, render_template, request, session, redirect, url_for, flash, jsonify, Response, stream_with_context
+from flask import request as flask_request
+from flask_socketio import emit
 from bson.objectid import ObjectId
 from utils.db import users_collection, solutions_collection
+from utils.solutions_cache import solutions_cache
+from utils import model_loader
+from utils.model_loader import ACTIVE_MODEL_PATH, class_labels
+from utils.batching import MicroBatcher
+from utils.preprocessing import preprocess_upload, read_upload, InvalidImageError, ImageTooLargeError
+from utils.prediction_cache import PredictionCache, image_key
+from utils.batch_detection import collect_sources, detect_in_batches, decode_in_pool, predict_in_pool, submit_decode
+from utils.tiling import load_full_image, detect_tiled
+from utils.detection_jobs import DetectionJobQueue
+from utils.live_detection import LiveDetector, LIVE_NAMESPACE, LIVE_MAX_FRAME_BYTES
+from utils.embedding_index import add_case_async, search_similar, EMBEDDING_MIN_CONFIDENCE
+from utils.prediction_history import prediction_history
 import numpy as np
-import os
+import json
+import queue
+from functools import partial
+import time
+import zipfile
 from datetime import datetime
 
 # Blueprint for disease detection (for normal users and admin view)
 disease_detection_bp = Blueprint('disease_detection', __name__)
 
-# Load the model
-MODEL_PATH = os.path.join('model', 'betel_leaf_model.keras')
-model = load_model(MODEL_PATH)
+# Load the model in the background so the app can serve pages while TensorFlow starts up
+disease_detection_bp.record_once(lambda state: model_loader.start_warmup())
 
-# Define the disease categories (class labels)
-class_labels = ['Bacterial Leaf Spot Disease', 'Dried Leaf', 'Fungal Brown Spot Disease', 'Healthy Leaf']
+# Batch concurrent uploads into shared forward passes in front of the model.
+# Rows come back with the model version and, when the model exposes it, the embedding after the class probabilities.
+batcher = MicroBatcher(
+    partial(model_loader.predict_versioned, with_embeddings=True),
+    max_in_flight=model_loader.max_in_flight(),
+    tagged=True
+)
+
+# Cache results for repeated uploads of the same image (cleared when the model file changes or a new version is swapped in)
+prediction_cache = PredictionCache(ACTIVE_MODEL_PATH)
+model_loader.add_swap_listener(lambda version: prediction_cache.clear())
+
+# Asynchronous detection jobs and live camera detection (created once Socket.IO is available)
+job_queue = None
+live_detector = None
+
+# Map one row of model output to {class label: probability}
+def class_probabilities(preds):
+    return {label: float(p) for label, p in zip(class_labels, preds)}
+
+# Most similar earlier cases for an embedding (empty when the model does not expose embeddings)
+def find_similar_cases(embedding, model_version):
+    if embedding is None or not embedding.size:
+        return []
+    return [
+        {
+            'case_id': case['case_id'],
+            'prediction': class_labels[case['label']],
+            'confidence': case['confidence'],
+            'similarity': case['similarity'],
+            'date': datetime.utcfromtimestamp(case['created_at']).strftime('%Y-%m-%d')
+        }
+        for case in search_similar(model_version, embedding)
+    ]
+
+# Classify one preprocessed image and record it in the prediction history;
+# returns (prediction, confidence, similar past cases)
+def classify_image(img_array, user_id, source, decode_ms=None):
+    started = time.perf_counter()
+    cache_key = image_key(img_array)
+    cached = prediction_cache.get(cache_key)
+    if cached:
+        prediction, confidence, probabilities, model_version, embedding = cached
+    else:
+        row, model_version = batcher.predict(img_array)
+        preds = row[:len(class_labels)]
+        embedding = row[len(class_labels):].astype(np.float16)
+        prediction = class_labels[int(np.argmax(preds))]
+        confidence = float(np.max(preds))
+        probabilities = class_probabilities(preds)
+        prediction_cache.put(cache_key, (prediction, confidence, probabilities, model_version, embedding))
+
+    # Search before adding this case so it does not match itself
+    similar_cases = find_similar_cases(embedding, model_version)
+
+    # Buffered and written in the background, so the request never waits on Mongo
+    timings = {
+        'decode_ms': decode_ms,
+        'inference_ms': (time.perf_counter() - started) * 1000.0,
+        'cached': cached is not None
+    }
+    case_id = prediction_history.record(
+        user_id, prediction, confidence, probabilities, cache_key, timings, source, model_version
+    )
+
+    # Only confident, first-time results become reference cases for later searches
+    if embedding.size and not cached and confidence >= EMBEDDING_MIN_CONFIDENCE:
+        add_case_async(model_version, embedding, case_id, class_labels.index(prediction), confidence)
+    return prediction, confidence, similar_cases
+
+# Run one queued detection job on raw upload bytes
+def run_detection_job(user_id, data):
+    started = time.perf_counter()
+    try:
+        img_array = decode_in_pool(data)
+    except ImageTooLargeError:
+        return {'error': 'The uploaded image is too large. Please upload a smaller photo.'}
+    except InvalidImageError:
+        return {'error': 'The uploaded file is not a valid image'}
+    decode_ms = (time.perf_counter() - started) * 1000.0
+
+    prediction, confidence, similar_cases = classify_image(img_array, user_id, 'job', decode_ms)
+    return {
+        'prediction': prediction,
+        'confidence': confidence,
+        'similar_cases': similar_cases,
+        'solution': solutions_cache.get(prediction) or 'No solution available.'
+    }
+
+# Set up the job queue so results can be pushed to each user's Socket.IO room
+def register_detection_jobs(socketio):
+    global job_queue
+    job_queue = DetectionJobQueue(socketio, run_detection_job)
+
+# Live camera detection: clients stream binary JPEG frames on their own namespace
+def register_live_detection_handlers(socketio):
+    global live_detector
+    live_detector = LiveDetector(socketio, submit_decode, predict_in_pool, class_labels)
+
+    @socketio.on('connect', namespace=LIVE_NAMESPACE)
+    def handle_live_connect(auth=None):
+        # Only logged-in users may stream frames
+        if 'user_id' not in session:
+            return False
+        live_detector.add_client(flask_request.sid)
+
+    @socketio.on('disconnect', namespace=LIVE_NAMESPACE)
+    def handle_live_disconnect(*args):
+        live_detector.remove_client(flask_request.sid)
+
+    @socketio.on('frame', namespace=LIVE_NAMESPACE)
+    def handle_live_frame(data):
+        if not isinstance(data, (bytes, bytearray)) or len(data) > LIVE_MAX_FRAME_BYTES:
+            emit('frame_error', {'error': 'Frames must be JPEG images under the size limit'})
+            return
+        if not model_loader.is_model_ready():
+            emit('model_status', {'status': model_loader.model_status()})
+            return
+        live_detector.push(flask_request.sid, bytes(data))
 
 # Disease detection route
 @disease_detection_bp.route('/disease-detection', methods=['GET', 'POST'])
@@ -27,28 +159,32 @@ def disease_detection():
     prediction = None
     confidence = None
     solution = None
+    similar_cases = []
 
     if request.method == 'POST':
         file = request.files.get('file')
-        if file and file.filename != '':
-            filepath = os.path.join('uploads', file.filename)
-            file.save(filepath)
-
-            # Process the image and make a prediction
-            img = load_img(filepath, target_size=(150, 150))
-            img_array = img_to_array(img) / 255.0
-            img_array = np.expand_dims(img_array, axis=0) 
-            preds = model.predict(img_array)
-            predicted_index = np.argmax(preds)
-            prediction = class_labels[predicted_index]
-            confidence = np.max(preds)
-
-            # Fetch solution from the database for the predicted disease
-            solution_data = solutions_collection.find_one({'disease': prediction})
-            solution = solution_data['solution'] if solution_data else 'No solution available.'
-
-            # Remove the uploaded file after prediction
-            os.remove(filepath)
+        if not model_loader.is_model_ready():
+            # Don't hold the worker while the model is still loading
+            flash('The detection model is warming up. Please try again in a moment.', 'error')
+        elif file and file.filename != '':
+            # Decode the upload in memory (no temp file on disk)
+            started = time.perf_counter()
+            try:
+                img_array = preprocess_upload(file)
+            except ImageTooLargeError:
+                img_array = None
+                flash('The uploaded image is too large. Please upload a smaller photo.', 'error')
+            except InvalidImageError:
+                img_array = None
+                flash('The uploaded file is not a valid image', 'error')
+
+            if img_array is not None:
+                # Make a prediction
+                decode_ms = (time.perf_counter() - started) * 1000.0
+                prediction, confidence, similar_cases = classify_image(img_array, session['user_id'], 'page', decode_ms)
+
+                # Fetch solution for the predicted disease (served from the in-process cache)
+                solution = solutions_cache.get(prediction) or 'No solution available.'
         else:
             flash('Please upload a betel leaf image', 'error')
 
@@ -58,9 +194,138 @@ def disease_detection():
         prediction=prediction,
         confidence=confidence,
         solution=solution,
-        class_labels=class_labels
+        similar_cases=similar_cases,
+        class_labels=class_labels,
+        model_status=model_loader.model_status()
+    )
+
+# Batch detection route: many files or a zip archive, streamed back as NDJSON (one line per image)
+@disease_detection_bp.route('/disease-detection/batch', methods=['POST'])
+def disease_detection_batch():
+    if 'user_id' not in session:
+        return jsonify({'error': 'Unauthorized'}), 401
+
+    if not model_loader.is_model_ready():
+        return jsonify({'error': 'The detection model is warming up. Please try again in a moment.'}), 503
+
+    try:
+        sources = collect_sources(request.files.getlist('files'))
+    except zipfile.BadZipFile:
+        return jsonify({'error': 'The uploaded archive is not a valid zip file'}), 400
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    if not sources:
+        return jsonify({'error': 'Please upload betel leaf images or a zip archive'}), 400
+
+    solutions = solutions_cache.all()
+    user_id = session['user_id']
+
+    # Record every classified image in the prediction history
+    def record(img_array, preds, inference_ms, model_version):
+        timings = {'decode_ms': None, 'inference_ms': inference_ms, 'cached': False}
+        prediction_history.record(
+            user_id, class_labels[int(np.argmax(preds))], float(np.max(preds)),
+            class_probabilities(preds), image_key(img_array), timings, 'batch', model_version
+        )
+
+    def generate():
+        count = 0
+        for result in detect_in_batches(sources, solutions, on_prediction=record):
+            count += 1
+            yield json.dumps(result) + '\n'
+        yield json.dumps({'done': True, 'count': count}) + '\n'
+
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+
+# Async detection: queue the upload and return a job id straight away
+@disease_detection_bp.route('/disease-detection/jobs', methods=['POST'])
+def create_detection_job():
+    if 'user_id' not in session:
+        return jsonify({'error': 'Unauthorized'}), 401
+
+    if job_queue is None:
+        return jsonify({'error': 'Asynchronous detection is not available'}), 503
+
+    if not model_loader.is_model_ready():
+        response = jsonify({'error': 'The detection model is warming up. Please try again in a moment.'})
+        response.headers['Retry-After'] = '5'
+        return response, 503
+
+    file = request.files.get('file')
+    if not file or file.filename == '':
+        return jsonify({'error': 'Please upload a betel leaf image'}), 400
+
+    try:
+        job_id = job_queue.submit(session['user_id'], read_upload(file))
+    except queue.Full:
+        response = jsonify({'error': 'The detection queue is full. Please try again shortly.'})
+        response.headers['Retry-After'] = str(job_queue.retry_after())
+        return response, 429
+
+    return jsonify({
+        'job_id': job_id,
+        'status': 'queued',
+        'status_url': url_for('disease_detection.get_detection_job', job_id=job_id)
+    }), 202
+
+# Async detection: polling fallback for clients without a Socket.IO connection
+@disease_detection_bp.route('/disease-detection/jobs/<job_id>', methods=['GET'])
+def get_detection_job(job_id):
+    if 'user_id' not in session:
+        return jsonify({'error': 'Unauthorized'}), 401
+
+    job = job_queue.get(job_id, session['user_id']) if job_queue else None
+    if job is None:
+        return jsonify({'error': 'Job not found'}), 404
+    return jsonify(job)
+
+# Tiled detection: classify overlapping full-resolution tiles and return a per-tile grid and heatmap
+@disease_detection_bp.route('/disease-detection/tiled', methods=['POST'])
+def disease_detection_tiled():
+    if 'user_id' not in session:
+        return jsonify({'error': 'Unauthorized'}), 401
+
+    if not model_loader.is_model_ready():
+        return jsonify({'error': 'The detection model is warming up. Please try again in a moment.'}), 503
+
+    file = request.files.get('file')
+    if not file or file.filename == '':
+        return jsonify({'error': 'Please upload a betel leaf image'}), 400
+
+    started = time.perf_counter()
+    try:
+        image = decode_in_pool(read_upload(file), load_full_image)
+    except ImageTooLargeError:
+        return jsonify({'error': 'The uploaded image is too large. Please upload a smaller photo.'}), 400
+    except InvalidImageError:
+        return jsonify({'error': 'The uploaded file is not a valid image'}), 400
+    decoded = time.perf_counter()
+
+    # Remember which model versions served the tiles (more than one only if a swap lands mid-request)
+    versions = []
+
+    def predict_tiles(batch):
+        preds, version = predict_in_pool(batch, versioned=True)
+        if version not in versions:
+            versions.append(version)
+        return preds
+
+    result = detect_tiled(image, predict_tiles, class_labels, class_labels.index('Healthy Leaf'))
+    timings = {
+        'decode_ms': (decoded - started) * 1000.0,
+        'inference_ms': (time.perf_counter() - decoded) * 1000.0,
+        'cached': False,
+        'tiles': result['grid']['rows'] * result['grid']['cols']
+    }
+    prediction_history.record(
+        session['user_id'], result['prediction'], result['confidence'], result['probabilities'],
+        image_key(image), timings, 'tiled', ','.join(versions)
     )
 
+    result['solution'] = solutions_cache.get(result['prediction']) or 'No solution available.'
+    return jsonify(result)
+
 # Admin: Update or add solution route
 @disease_detection_bp.route('/admin/update-solution', methods=['POST'])
 def update_solution():
@@ -87,6 +352,9 @@ def update_solution():
         upsert=True
     )
 
+    # Write-through so this worker serves the new solution immediately
+    solutions_cache.refresh()
+
     flash('Solution updated successfully.', 'success')
     return redirect(url_for('disease_detection.disease_detection'))
 
@@ -100,6 +368,67 @@ def get_solution(disease):
     
     if not user or user.get('role') != 'admin':
         return jsonify({'solution': ''})
-    solution_data = solutions_collection.find_one({'disease': disease})
-    
-    return jsonify({'solution': solution_data['solution'] if solution_data else ''})
\ No newline at end of file
+    solution = solutions_cache.get(disease)
+
+    return jsonify({'solution': solution or ''})
+
+# Admin: Inference stats (batching queue/latency and prediction cache counters)
+@disease_detection_bp.route('/admin/inference-stats', methods=['GET'])
+def inference_stats():
+    if 'user_id' not in session:
+        return jsonify({'error': 'Unauthorized'}), 401
+    user = users_collection.find_one({'_id': ObjectId(session['user_id'])})
+
+    if not user or user.get('role') != 'admin':
+        return jsonify({'error': 'Unauthorized'}), 401
+
+    return jsonify({
+        'batching': batcher.stats(),
+        'prediction_cache': prediction_cache.stats(),
+        'model': model_loader.model_stats(),
+        'history': prediction_history.stats(),
+        'jobs': job_queue.stats() if job_queue else None,
+        'live': live_detector.stats() if live_detector else None
+    })
+
+# Admin: Served model version, reload state and load history
+@disease_detection_bp.route('/admin/model', methods=['GET'])
+def model_info():
+    if 'user_id' not in session:
+        return jsonify({'error': 'Unauthorized'}), 401
+    user = users_collection.find_one({'_id': ObjectId(session['user_id'])})
+
+    if not user or user.get('role') != 'admin':
+        return jsonify({'error': 'Unauthorized'}), 401
+
+    return jsonify(model_loader.model_info())
+
+# Admin: Load a model version in the background and swap it in once it is warm
+@disease_detection_bp.route('/admin/model/reload', methods=['POST'])
+def reload_model():
+    if 'user_id' not in session:
+        return jsonify({'error': 'Unauthorized'}), 401
+    user = users_collection.find_one({'_id': ObjectId(session['user_id'])})
+
+    if not user or user.get('role') != 'admin':
+        return jsonify({'error': 'Unauthorized'}), 401
+
+    # Optional file name inside the model directory; defaults to the configured model file
+    data = request.get_json(silent=True) or request.form
+    try:
+        started = model_loader.reload_model(data.get('path'))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    if not started:
+        return jsonify({'error': 'A model reload is already in progress'}), 409
+    return jsonify({'status': 'reloading', 'current': model_loader.model_version()}), 202
+
+# Model readiness (used by the detection page while the model is warming up)
+@disease_detection_bp.route('/disease-detection/status', methods=['GET'])
+def detection_status():
+    return jsonify({
+        'status': model_loader.model_status(),
+        'ready': model_loader.is_model_ready(),
+        'version': model_loader.model_version()
+    })
\ No newline at end of file
@@ -0,0 +1,59 @@
+# Add the denormalized total_comments counter to forum posts created before it existed.
+#
+# Usage (from the repository root):
+#   python -m scripts.backfill_comment_counts             # posts without a counter
+#   python -m scripts.backfill_comment_counts --recount   # recount every post and fix any drift
+#
+# Comments are counted per post in one aggregation over the comments collection, then posts are
+# streamed with only their counter projected and updated with batched $set writes.
+# Without --recount a post is only written while it still has no counter, so a comment added during
+# the backfill is never overwritten. If that comment created the counter first (starting it at 1),
+# run --recount during a quiet period to correct it.
+import argparse
+from pymongo import UpdateOne
+from utils.db import posts_collection, comments_collection
+
+
+def backfill(recount, batch_size, dry_run):
+    # Comments plus replies at every depth, keyed by post; posts without comments are missing (0)
+    counts = {row['_id']: row['count'] for row in comments_collection.aggregate([
+        {'$group': {'_id': '$post_id', 'count': {'$sum': 1}}},
+    ])}
+
+    query = {} if recount else {'total_comments': {'$exists': False}}
+    updates = []
+    scanned = written = 0
+    cursor = posts_collection.find(query, {'total_comments': 1}, batch_size=batch_size)
+    for post in cursor:
+        scanned += 1
+        total = counts.get(post['_id'], 0)
+        if post.get('total_comments') == total:
+            continue
+        match = {'_id': post['_id']}
+        if not recount:
+            match['total_comments'] = {'$exists': False}
+        updates.append(UpdateOne(match, {'$set': {'total_comments': total}}))
+        if len(updates) >= batch_size:
+            if not dry_run:
+                posts_collection.bulk_write(updates, ordered=False)
+            written += len(updates)
+            updates = []
+
+    if updates and not dry_run:
+        posts_collection.bulk_write(updates, ordered=False)
+    return scanned, written + len(updates)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Backfill the total_comments counter on forum posts.')
+    parser.add_argument('--recount', action='store_true', help='Recount every post, not only those without a counter')
+    parser.add_argument('--batch-size', type=int, default=500, help='Posts per bulk write')
+    parser.add_argument('--dry-run', action='store_true', help='Count without writing')
+    args = parser.parse_args()
+
+    scanned, changed = backfill(args.recount, args.batch_size, args.dry_run)
+    print(f"Scanned {scanned} posts, {changed} counters {'to update' if args.dry_run else 'updated'}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,80 @@
+# Rebuild the disease-prevalence rollups from the raw prediction history.
+#
+# Usage (from the repository root):
+#   python -m scripts.backfill_rollups                      # rebuild every day and week bucket
+#   python -m scripts.backfill_rollups --since 2026-01-01   # only buckets from this date onwards
+#
+# Counts are grouped inside MongoDB ($dateTrunc, MongoDB 5.0+) and written with $set, so the job
+# is idempotent and can be re-run at any time. Detections flushed while a bucket is being
+# rewritten may be overwritten; run it again or during a quiet period if exact counts matter.
+import argparse
+from datetime import datetime
+from pymongo import UpdateOne
+from utils.db import predictions_collection, prediction_rollups_collection
+from utils.prediction_rollups import PERIODS, ensure_rollup_indexes, period_start
+
+
+# Grouped counts for one period: yields (start, prediction, count, confidence_sum)
+def aggregate_period(period, since):
+    pipeline = []
+    if since:
+        # Start from the beginning of the bucket so the first one is not written as a partial count
+        pipeline.append({'$match': {'created_at': {'$gte': period_start(period, since)}}})
+
+    unit = {'unit': 'week', 'startOfWeek': 'monday'} if period == 'week' else {'unit': 'day'}
+    pipeline += [
+        {'$group': {
+            '_id': {
+                'start': {'$dateTrunc': dict(date='$created_at', **unit)},
+                'prediction': '$prediction'
+            },
+            'count': {'$sum': 1},
+            'confidence_sum': {'$sum': '$confidence'}
+        }},
+    ]
+    for doc in predictions_collection.aggregate(pipeline, allowDiskUse=True):
+        yield doc['_id']['start'], doc['_id']['prediction'], doc['count'], doc['confidence_sum']
+
+
+def backfill_period(period, since, batch_size, dry_run):
+    updates = []
+    written = 0
+    for start, prediction, count, confidence_sum in aggregate_period(period, since):
+        updates.append(UpdateOne(
+            {'period': period, 'start': start, 'prediction': prediction},
+            {'$set': {'count': count, 'confidence_sum': confidence_sum}},
+            upsert=True
+        ))
+        if len(updates) >= batch_size:
+            if not dry_run:
+                prediction_rollups_collection.bulk_write(updates, ordered=False)
+            written += len(updates)
+            updates = []
+
+    if updates and not dry_run:
+        prediction_rollups_collection.bulk_write(updates, ordered=False)
+    return written + len(updates)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Rebuild disease-prevalence rollups from the prediction history.')
+    parser.add_argument('--since', type=lambda value: datetime.strptime(value, '%Y-%m-%d'),
+                        help='Only rebuild buckets from this date (YYYY-MM-DD) onwards')
+    parser.add_argument('--period', choices=PERIODS, help='Only rebuild one period (default: all)')
+    parser.add_argument('--batch-size', type=int, default=1000, help='Rollup upserts per bulk write')
+    parser.add_argument('--dry-run', action='store_true', help='Compute the rollups without writing them')
+    args = parser.parse_args()
+
+    if not args.dry_run:
+        ensure_rollup_indexes(prediction_rollups_collection)
+
+    for period in ([args.period] if args.period else PERIODS):
+        if not args.since and not args.dry_run:
+            # A full rebuild also removes buckets whose history has been deleted
+            prediction_rollups_collection.delete_many({'period': period})
+        count = backfill_period(period, args.since, args.batch_size, args.dry_run)
+        print(f"{period}: {count} rollup documents {'computed' if args.dry_run else 'written'}")
+
+
+if __name__ == '__main__':
+    main()
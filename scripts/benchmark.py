@@ -0,0 +1,283 @@
+# Speed and accuracy benchmark for the detection pipeline on the bundled labeled test images.
+#
+# Usage (from the repository root):
+#   python -m scripts.benchmark --save-baseline benchmark_baseline.json
+#   python -m scripts.benchmark --baseline benchmark_baseline.json      # exits 1 on regressions
+#   python -m scripts.benchmark --with-db                               # also time solution lookups
+import argparse
+import json
+import platform
+import resource
+import sys
+import time
+from datetime import datetime
+import numpy as np
+from dotenv import load_dotenv
+
+# Read .env before importing utils.* so INFERENCE_BACKEND and the other settings match the app
+load_dotenv()
+
+from utils.inference_backends import BACKEND_PATHS, INFERENCE_BACKEND, load_backend
+from utils.cascade import CASCADE_THRESHOLD, CascadeModel
+from utils.model_loader import class_labels
+from utils.preprocessing import IMAGE_SIZE, open_rgb, resize_image, normalize_image
+from scripts.common import TEST_IMAGES_DIR, iter_labeled_images
+
+STAGES = ['decode', 'resize', 'normalize', 'predict', 'solution_lookup']
+BATCH_SIZES = [1, 8, 32]
+
+
+# p50/p95/p99/mean of a list of durations in seconds, reported in milliseconds
+def summarize(seconds):
+    values = np.asarray(seconds) * 1000.0
+    if values.size == 0:
+        return None
+    return {
+        'p50': float(np.percentile(values, 50)),
+        'p95': float(np.percentile(values, 95)),
+        'p99': float(np.percentile(values, 99)),
+        'mean': float(values.mean()),
+    }
+
+
+# Peak resident set size of this process in MB
+def peak_rss_mb():
+    usage = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and kilobytes on Linux
+    return usage / (1024 * 1024) if sys.platform == 'darwin' else usage / 1024
+
+
+# Run each image through the single-image path and time every stage
+def time_stages(backend, samples, lookup_solution):
+    timings = {stage: [] for stage in STAGES}
+    arrays = []
+    for path, _ in samples:
+        with open(path, 'rb') as f:
+            data = f.read()
+
+        started = time.perf_counter()
+        img = open_rgb(data)
+        decoded = time.perf_counter()
+        img = resize_image(img)
+        resized = time.perf_counter()
+        img_array = normalize_image(img)
+        normalized = time.perf_counter()
+        preds = backend.predict(np.expand_dims(img_array, axis=0))
+        predicted = time.perf_counter()
+
+        timings['decode'].append(decoded - started)
+        timings['resize'].append(resized - decoded)
+        timings['normalize'].append(normalized - resized)
+        timings['predict'].append(predicted - normalized)
+
+        if lookup_solution:
+            prediction = class_labels[int(np.argmax(preds[0]))]
+            lookup_started = time.perf_counter()
+            lookup_solution(prediction)
+            timings['solution_lookup'].append(time.perf_counter() - lookup_started)
+
+        arrays.append(img_array)
+    return {stage: summarize(values) for stage, values in timings.items()}, np.stack(arrays)
+
+
+# Images per second and per-batch latency at each batch size
+def measure_throughput(backend, arrays, batch_sizes):
+    results = {}
+    for batch_size in batch_sizes:
+        # Warm up this batch shape first so tracing is not counted
+        backend.predict(arrays[:batch_size])
+        latencies = []
+        started = time.perf_counter()
+        for start in range(0, len(arrays), batch_size):
+            batch_started = time.perf_counter()
+            backend.predict(arrays[start:start + batch_size])
+            latencies.append(time.perf_counter() - batch_started)
+        elapsed = time.perf_counter() - started
+        results[str(batch_size)] = {
+            'images_per_sec': len(arrays) / elapsed,
+            'batch_latency_ms': summarize(latencies),
+        }
+    return results
+
+
+# Per-class accuracy and confusion matrix (rows = true class, columns = predicted class)
+def measure_accuracy(backend, arrays, labels, batch_size=32):
+    preds = np.concatenate([backend.predict(arrays[i:i + batch_size]) for i in range(0, len(arrays), batch_size)])
+    predicted = np.argmax(preds, axis=1)
+    actual = np.array([class_labels.index(label) for label in labels])
+
+    matrix = np.zeros((len(class_labels), len(class_labels)), dtype=int)
+    np.add.at(matrix, (actual, predicted), 1)
+    per_class = {
+        label: float(matrix[i, i] / matrix[i].sum()) if matrix[i].sum() else None
+        for i, label in enumerate(class_labels)
+    }
+    return {
+        'overall': float((predicted == actual).mean()),
+        'per_class': per_class,
+        'confusion_matrix': {'labels': class_labels, 'matrix': matrix.tolist()},
+    }
+
+
+# Per-image latency and accuracy of the full model alone versus a fast-model-first cascade
+def measure_cascade(heavy, fast_backend, threshold, arrays, labels):
+    fast = load_backend(fast_backend)
+    fast.predict(arrays[:1])
+    cascade = CascadeModel(fast, heavy, threshold)
+    actual = np.array([class_labels.index(label) for label in labels])
+
+    heavy_latencies, cascade_latencies = [], []
+    heavy_preds, cascade_preds = [], []
+    for i in range(len(arrays)):
+        batch = arrays[i:i + 1]
+        started = time.perf_counter()
+        heavy_preds.append(heavy.predict(batch)[0])
+        heavy_latencies.append(time.perf_counter() - started)
+
+        started = time.perf_counter()
+        cascade_preds.append(cascade.predict(batch)[0])
+        cascade_latencies.append(time.perf_counter() - started)
+
+    heavy_total = sum(heavy_latencies)
+    cascade_total = sum(cascade_latencies)
+    return {
+        'fast_backend': fast_backend,
+        'threshold': threshold,
+        'escalation_rate': cascade.stats()['escalation_rate'],
+        'latency_ms': {'full_model': summarize(heavy_latencies), 'cascade': summarize(cascade_latencies)},
+        'latency_saved_pct': float((heavy_total - cascade_total) / heavy_total * 100.0),
+        'accuracy': {
+            'full_model': float((np.argmax(heavy_preds, axis=1) == actual).mean()),
+            'cascade': float((np.argmax(cascade_preds, axis=1) == actual).mean()),
+        },
+    }
+
+
+# Compare against a saved baseline and return a list of regression messages
+def find_regressions(current, baseline, latency_tolerance, accuracy_tolerance):
+    regressions = []
+    for stage, stats in current['stages_ms'].items():
+        base = baseline.get('stages_ms', {}).get(stage)
+        if stats and base and stats['p95'] > base['p95'] * (1 + latency_tolerance):
+            regressions.append(f"{stage} p95 {stats['p95']:.2f} ms vs baseline {base['p95']:.2f} ms")
+
+    for batch_size, stats in current['throughput'].items():
+        base = baseline.get('throughput', {}).get(batch_size)
+        if base and stats['images_per_sec'] < base['images_per_sec'] * (1 - latency_tolerance):
+            regressions.append(
+                f"batch {batch_size} throughput {stats['images_per_sec']:.1f} img/s "
+                f"vs baseline {base['images_per_sec']:.1f} img/s"
+            )
+
+    base_rss = baseline.get('peak_rss_mb')
+    if base_rss and current['peak_rss_mb'] > base_rss * (1 + latency_tolerance):
+        regressions.append(f"peak RSS {current['peak_rss_mb']:.0f} MB vs baseline {base_rss:.0f} MB")
+
+    base_accuracy = baseline.get('accuracy', {})
+    if current['accuracy']['overall'] < base_accuracy.get('overall', 0) - accuracy_tolerance:
+        regressions.append(
+            f"overall accuracy {current['accuracy']['overall']:.3f} vs baseline {base_accuracy['overall']:.3f}"
+        )
+    for label, accuracy in current['accuracy']['per_class'].items():
+        base = base_accuracy.get('per_class', {}).get(label)
+        if accuracy is not None and base is not None and accuracy < base - accuracy_tolerance:
+            regressions.append(f"{label} accuracy {accuracy:.3f} vs baseline {base:.3f}")
+    return regressions
+
+
+def print_report(report):
+    print(f"Backend: {report['meta']['backend']}  Images: {report['meta']['images']}")
+    print('\nPer-stage latency (ms)')
+    for stage, stats in report['stages_ms'].items():
+        if stats:
+            print(f"  {stage:<16} p50 {stats['p50']:8.2f}  p95 {stats['p95']:8.2f}  p99 {stats['p99']:8.2f}")
+        else:
+            print(f"  {stage:<16} skipped")
+    print('\nThroughput')
+    for batch_size, stats in report['throughput'].items():
+        print(f"  batch {batch_size:>3}: {stats['images_per_sec']:8.1f} img/s")
+    print(f"\nPeak RSS: {report['peak_rss_mb']:.0f} MB")
+    print(f"\nOverall accuracy: {report['accuracy']['overall']:.3f}")
+    for label, accuracy in report['accuracy']['per_class'].items():
+        print(f"  {label:<30} {accuracy:.3f}" if accuracy is not None else f"  {label:<30} n/a")
+    print('\nConfusion matrix (rows = true, columns = predicted)')
+    for label, row in zip(class_labels, report['accuracy']['confusion_matrix']['matrix']):
+        print(f"  {label:<30} " + ' '.join(f"{count:4d}" for count in row))
+
+    cascade = report.get('cascade')
+    if cascade:
+        print(f"\nCascade ({cascade['fast_backend']} first, threshold {cascade['threshold']})")
+        print(f"  Escalation rate: {cascade['escalation_rate']:.1%}")
+        print(f"  p50 latency: full model {cascade['latency_ms']['full_model']['p50']:.2f} ms, "
+              f"cascade {cascade['latency_ms']['cascade']['p50']:.2f} ms")
+        print(f"  Latency saved: {cascade['latency_saved_pct']:.1f}%")
+        print(f"  Accuracy: full model {cascade['accuracy']['full_model']:.3f}, "
+              f"cascade {cascade['accuracy']['cascade']:.3f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark detection speed and accuracy on the bundled test images.')
+    parser.add_argument('--images', default=TEST_IMAGES_DIR, help='Root folder of the labeled test images')
+    parser.add_argument('--backend', default=INFERENCE_BACKEND, choices=sorted(BACKEND_PATHS))
+    parser.add_argument('--with-db', action='store_true', help='Also time the solution lookup')
+    parser.add_argument('--cascade', choices=sorted(BACKEND_PATHS), help='Also measure a cascade with this fast backend')
+    parser.add_argument('--cascade-threshold', type=float, default=CASCADE_THRESHOLD)
+    parser.add_argument('--save-baseline', help='Write the results to this JSON file')
+    parser.add_argument('--baseline', help='Compare against this JSON baseline and exit 1 on regressions')
+    parser.add_argument('--latency-tolerance', type=float, default=0.10, help='Allowed relative slowdown')
+    parser.add_argument('--accuracy-tolerance', type=float, default=0.01, help='Allowed absolute accuracy drop')
+    args = parser.parse_args()
+
+    samples = list(iter_labeled_images(args.images))
+    if not samples:
+        parser.error(f"No labeled images found under {args.images}")
+
+    lookup_solution = None
+    if args.with_db:
+        # Imported lazily so the benchmark runs without a database by default
+        from utils.solutions_cache import solutions_cache
+        lookup_solution = solutions_cache.get
+
+    backend = load_backend(args.backend)
+    # Warm-up pass so graph tracing does not skew the first timing
+    backend.predict(np.zeros((1, IMAGE_SIZE[0], IMAGE_SIZE[1], 3), dtype=np.float32))
+
+    stages, arrays = time_stages(backend, samples, lookup_solution)
+    report = {
+        'meta': {
+            'backend': args.backend,
+            'images': len(samples),
+            'timestamp': datetime.utcnow().isoformat(),
+            'python': platform.python_version(),
+            'machine': platform.machine(),
+        },
+        'stages_ms': stages,
+        'throughput': measure_throughput(backend, arrays, BATCH_SIZES),
+        'accuracy': measure_accuracy(backend, arrays, [label for _, label in samples]),
+    }
+    report['peak_rss_mb'] = peak_rss_mb()
+    if args.cascade:
+        report['cascade'] = measure_cascade(
+            backend, args.cascade, args.cascade_threshold, arrays, [label for _, label in samples]
+        )
+    print_report(report)
+
+    if args.save_baseline:
+        with open(args.save_baseline, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"\nBaseline saved to {args.save_baseline}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = find_regressions(report, baseline, args.latency_tolerance, args.accuracy_tolerance)
+        if regressions:
+            print('\nRegressions against baseline:')
+            for message in regressions:
+                print(f"  - {message}")
+            sys.exit(1)
+        print('\nNo regressions against baseline.')
+
+
+if __name__ == '__main__':
+    main()
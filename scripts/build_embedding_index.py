@@ -0,0 +1,120 @@
+# Seed and maintain the similar-case embedding index.
+#
+# Usage (from the repository root):
+#   python -m scripts.build_embedding_index --seed      # add the labeled test images as reference cases
+#   python -m scripts.build_embedding_index --build-ivf # partition the index for faster searches
+#   python -m scripts.build_embedding_index --benchmark-search 300000   # time search on random vectors
+#
+# The index is kept per model version, so run --seed again after swapping in a new model. By default the
+# served backend (INFERENCE_BACKEND) and its model file are used, so the cases land in the index it searches.
+import argparse
+import shutil
+import tempfile
+import time
+import numpy as np
+from bson.objectid import ObjectId
+from dotenv import load_dotenv
+
+# Read .env before importing utils.* so INFERENCE_BACKEND and the other settings match the app
+load_dotenv()
+
+from utils.embedding_index import EMBEDDING_DIR, EMBEDDING_IVF_NPROBE, EmbeddingIndex, get_index
+from utils.inference_backends import BACKEND_PATHS, INFERENCE_BACKEND, load_backend
+from utils.model_loader import class_labels, version_id
+from utils.preprocessing import decode_image
+from scripts.common import TEST_IMAGES_DIR, iter_labeled_images
+
+
+# Embed labeled images and append them to the index as reference cases
+def seed_index(index, backend_name, model_path, images, batch_size):
+    backend = load_backend(backend_name, model_path)
+    if not hasattr(backend, 'predict_with_embeddings'):
+        raise ValueError(f"The {backend_name} backend does not expose embeddings")
+    samples = list(iter_labeled_images(images))
+    for start in range(0, len(samples), batch_size):
+        chunk = samples[start:start + batch_size]
+        arrays = []
+        for path, _ in chunk:
+            with open(path, 'rb') as f:
+                arrays.append(decode_image(f.read()))
+        probs, embeddings = backend.predict_with_embeddings(np.stack(arrays))
+        index.add_many(
+            embeddings,
+            [str(ObjectId()) for _ in chunk],
+            [class_labels.index(label) for _, label in chunk],
+            np.max(probs, axis=1)
+        )
+    return len(samples)
+
+
+# Time brute-force and IVF search on a throwaway index filled with random vectors
+def benchmark_search(count, dim, queries, nprobe):
+    directory = tempfile.mkdtemp(prefix='embedding-bench-')
+    try:
+        index = EmbeddingIndex(directory)
+        rng = np.random.default_rng(0)
+        for start in range(0, count, 100000):
+            size = min(100000, count - start)
+            index.add_many(
+                rng.standard_normal((size, dim), dtype=np.float32),
+                ['0' * 24] * size,
+                rng.integers(0, len(class_labels), size),
+                np.ones(size)
+            )
+        query_vectors = rng.standard_normal((queries, dim), dtype=np.float32)
+
+        started = time.perf_counter()
+        for query in query_vectors:
+            index.search(query, nprobe=0)
+        brute_ms = (time.perf_counter() - started) / queries * 1000.0
+        print(f"Brute force over {count} x {dim}: {brute_ms:.2f} ms/query")
+
+        started = time.perf_counter()
+        nlist = index.build_ivf()
+        print(f"IVF build ({nlist} lists): {time.perf_counter() - started:.1f} s")
+
+        started = time.perf_counter()
+        for query in query_vectors:
+            index.search(query, nprobe=nprobe)
+        ivf_ms = (time.perf_counter() - started) / queries * 1000.0
+        print(f"IVF search (nprobe {nprobe}): {ivf_ms:.2f} ms/query")
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Seed, partition or benchmark the similar-case embedding index.')
+    parser.add_argument('--backend', choices=list(BACKEND_PATHS), default=INFERENCE_BACKEND,
+                        help='Backend that computes the embeddings (default: the served one)')
+    parser.add_argument('--model', help='Model file whose embeddings are indexed (default: the served one)')
+    parser.add_argument('--seed', action='store_true', help='Add the labeled images as reference cases')
+    parser.add_argument('--images', default=TEST_IMAGES_DIR, help='Root folder of the labeled images to seed')
+    parser.add_argument('--batch-size', type=int, default=32)
+    parser.add_argument('--build-ivf', action='store_true', help='Partition the index into IVF lists')
+    parser.add_argument('--nlist', type=int, help='Number of IVF lists (default: sqrt of the case count)')
+    parser.add_argument('--benchmark-search', type=int, metavar='N', help='Time searches over N random vectors')
+    parser.add_argument('--dim', type=int, default=128, help='Embedding size for --benchmark-search')
+    parser.add_argument('--queries', type=int, default=100)
+    parser.add_argument('--nprobe', type=int, default=EMBEDDING_IVF_NPROBE)
+    args = parser.parse_args()
+
+    if args.benchmark_search:
+        benchmark_search(args.benchmark_search, args.dim, args.queries, args.nprobe)
+        return
+    if not (args.seed or args.build_ivf):
+        parser.error('Nothing to do: pass --seed, --build-ivf or --benchmark-search')
+
+    model_path = args.model or BACKEND_PATHS[args.backend]
+    # Same version id the app stores with each prediction, so the index is the one it serves from
+    version = version_id(model_path)
+    index = get_index(version, EMBEDDING_DIR)
+    if args.seed:
+        added = seed_index(index, args.backend, model_path, args.images, args.batch_size)
+        print(f"Added {added} reference cases to the index for {version}")
+    if args.build_ivf:
+        nlist = index.build_ivf(args.nlist)
+        print(f"Built {nlist} IVF lists over {len(index)} cases for {version}")
+
+
+if __name__ == '__main__':
+    main()
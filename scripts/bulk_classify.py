@@ -0,0 +1,209 @@
+# Classify every image under a directory tree and write the predictions to CSV or Parquet.
+#
+# Usage (from the repository root):
+#   python -m scripts.bulk_classify "static/images/betel leaf images/test images" predictions.csv
+#   python -m scripts.bulk_classify /data/field_photos predictions.parquet --batch-size 256
+#
+# The output doubles as the checkpoint: rows are flushed after every batch (CSV) or every
+# few batches (Parquet part files), and re-running the same command skips images that
+# already have a row, so an interrupted run picks up where it stopped.
+import argparse
+import csv
+import glob
+import os
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+from dotenv import load_dotenv
+
+# Read .env before importing utils.* so INFERENCE_BACKEND and the other settings match the app
+load_dotenv()
+
+from utils.inference_backends import BACKEND_PATHS, INFERENCE_BACKEND, load_backend
+from utils.model_loader import class_labels
+from utils.preprocessing import decode_image, InvalidImageError
+from scripts.common import iter_image_files
+
+COLUMNS = ['path', 'prediction', 'confidence'] + [f'prob_{label}' for label in class_labels] + ['error']
+
+
+# Read and decode one image file; returns (array, error message)
+def load_image(path):
+    try:
+        with open(path, 'rb') as f:
+            return decode_image(f.read()), None
+    except InvalidImageError as e:
+        return None, str(e) or 'Not a valid image'
+
+
+# Decode batches on a thread pool ahead of the model, keeping at most `prefetch` batches in memory
+def prefetch_batches(paths, batch_size, decode_workers, prefetch):
+    batches = queue.Queue(maxsize=max(1, prefetch))
+
+    def produce():
+        try:
+            with ThreadPoolExecutor(max_workers=decode_workers) as pool:
+                for start in range(0, len(paths), batch_size):
+                    chunk = paths[start:start + batch_size]
+                    batches.put((chunk, list(pool.map(load_image, chunk))))
+        except Exception as e:
+            # Hand the error to the main thread, which re-raises it
+            batches.put(e)
+        finally:
+            # Always end the stream so the consumer never waits forever
+            batches.put(None)
+
+    threading.Thread(target=produce, name='bulk-decode', daemon=True).start()
+    while True:
+        item = batches.get()
+        if item is None:
+            return
+        if isinstance(item, Exception):
+            raise item
+        yield item
+
+
+# Turn one decoded batch into output rows
+def classify_batch(backend, chunk, decoded):
+    arrays = [array for array, _ in decoded if array is not None]
+    preds = backend.predict(np.stack(arrays)) if arrays else []
+
+    rows = []
+    row_index = 0
+    for path, (array, error) in zip(chunk, decoded):
+        row = dict.fromkeys(COLUMNS)
+        row['path'] = path
+        row['error'] = error
+        if array is not None:
+            probs = preds[row_index]
+            row_index += 1
+            row['prediction'] = class_labels[int(np.argmax(probs))]
+            row['confidence'] = float(np.max(probs))
+            for label, prob in zip(class_labels, probs):
+                row[f'prob_{label}'] = float(prob)
+        rows.append(row)
+    return rows
+
+
+class CsvWriter:
+    def __init__(self, path):
+        self.path = path
+
+    # Paths already written by a previous run (drops a half-written last line)
+    def completed(self):
+        if not os.path.exists(self.path):
+            return set()
+        with open(self.path, 'rb+') as f:
+            data = f.read()
+            if data and not data.endswith(b'\n'):
+                f.truncate(data.rfind(b'\n') + 1)
+        with open(self.path, newline='', encoding='utf-8') as f:
+            return {row['path'] for row in csv.DictReader(f)}
+
+    def open(self):
+        new_file = not os.path.exists(self.path) or os.path.getsize(self.path) == 0
+        self._file = open(self.path, 'a', newline='', encoding='utf-8')
+        self._writer = csv.DictWriter(self._file, fieldnames=COLUMNS)
+        if new_file:
+            self._writer.writeheader()
+
+    def write(self, rows):
+        self._writer.writerows(rows)
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+    def close(self):
+        self._file.close()
+
+
+class ParquetWriter:
+    # Parquet output is a directory of part files so finished parts survive an interruption
+    def __init__(self, path, flush_every):
+        import pyarrow # noqa: F401 (fail early if Parquet support is missing)
+
+        self.path = path
+        self.flush_every = flush_every
+        self._pending = []
+        self._batches = 0
+
+    def completed(self):
+        import pyarrow.parquet as pq
+
+        done = set()
+        for part in sorted(glob.glob(os.path.join(self.path, 'part-*.parquet'))):
+            done.update(pq.read_table(part, columns=['path']).column('path').to_pylist())
+        return done
+
+    def open(self):
+        os.makedirs(self.path, exist_ok=True)
+        self._part = len(glob.glob(os.path.join(self.path, 'part-*.parquet')))
+
+    def write(self, rows):
+        self._pending.extend(rows)
+        self._batches += 1
+        if self._batches % self.flush_every == 0:
+            self._flush()
+
+    def _flush(self):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        if not self._pending:
+            return
+        schema = pa.schema([
+            (column, pa.float64() if column == 'confidence' or column.startswith('prob_') else pa.string())
+            for column in COLUMNS
+        ])
+        table = pa.Table.from_pylist(self._pending, schema=schema)
+        final_path = os.path.join(self.path, f'part-{self._part:05d}.parquet')
+        # Write then rename so a crash never leaves a truncated part behind
+        pq.write_table(table, final_path + '.tmp')
+        os.replace(final_path + '.tmp', final_path)
+        self._part += 1
+        self._pending = []
+
+    def close(self):
+        self._flush()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Classify a directory of betel leaf images in bulk.')
+    parser.add_argument('input_dir', help='Directory to scan recursively for images')
+    parser.add_argument('output', help='Output file: .csv, or .parquet (written as a directory of parts)')
+    parser.add_argument('--backend', default=INFERENCE_BACKEND, choices=sorted(BACKEND_PATHS))
+    parser.add_argument('--batch-size', type=int, default=128)
+    parser.add_argument('--decode-workers', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--prefetch', type=int, default=4, help='Decoded batches to keep ready ahead of the model')
+    parser.add_argument('--flush-every', type=int, default=8, help='Batches per Parquet part file')
+    args = parser.parse_args()
+
+    if args.output.lower().endswith('.parquet'):
+        writer = ParquetWriter(args.output, args.flush_every)
+    else:
+        writer = CsvWriter(args.output)
+
+    done = writer.completed()
+    paths = [path for path in iter_image_files(args.input_dir) if path not in done]
+    print(f"{len(paths)} images to classify ({len(done)} already done)")
+    if not paths:
+        return
+
+    backend = load_backend(args.backend)
+    writer.open()
+    started = time.perf_counter()
+    processed = 0
+    try:
+        for chunk, decoded in prefetch_batches(paths, args.batch_size, args.decode_workers, args.prefetch):
+            writer.write(classify_batch(backend, chunk, decoded))
+            processed += len(chunk)
+            elapsed = time.perf_counter() - started
+            print(f"\r{processed}/{len(paths)} images ({processed / elapsed:.1f} img/s)", end='', flush=True)
+    finally:
+        writer.close()
+        print()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,30 @@
+import os
+from utils.model_loader import class_labels
+from utils.preprocessing import IMAGE_EXTENSIONS
+
+# Labeled test images bundled with the repository
+TEST_IMAGES_DIR = os.path.join('static', 'images', 'betel leaf images', 'test images')
+
+# Folder names used by the bundled test set, mapped to model class labels
+TEST_FOLDER_LABELS = {
+    'bacterial leaf spot disease': class_labels[0],
+    'dried leaf': class_labels[1],
+    'fungal brown spot disease': class_labels[2],
+    'healthy': class_labels[3],
+}
+
+
+# Walk a directory tree and yield image paths in a stable order
+def iter_image_files(root):
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames.sort()
+        for filename in sorted(filenames):
+            if filename.lower().endswith(IMAGE_EXTENSIONS):
+                yield os.path.join(dirpath, filename)
+
+
+# Yield (path, label) pairs for the bundled labeled test set
+def iter_labeled_images(root=TEST_IMAGES_DIR):
+    for folder, label in TEST_FOLDER_LABELS.items():
+        for path in iter_image_files(os.path.join(root, folder)):
+            yield path, label
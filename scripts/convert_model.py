@@ -0,0 +1,68 @@
+# Convert the Keras model into quantized TFLite artifacts for the inference backends.
+#
+# Usage (from the repository root):
+#   python -m scripts.convert_model                 # both float16 and int8
+#   python -m scripts.convert_model --mode int8 --calibration-images 200
+import argparse
+import os
+import numpy as np
+from utils.inference_backends import BACKEND_PATHS
+from utils.preprocessing import decode_image
+from scripts.common import TEST_IMAGES_DIR, iter_image_files
+
+
+# Feed real leaf images to the converter so int8 ranges match production inputs
+def representative_dataset(image_dir, limit):
+    def generator():
+        for count, path in enumerate(iter_image_files(image_dir)):
+            if count >= limit:
+                break
+            with open(path, 'rb') as f:
+                img_array = decode_image(f.read())
+            yield [np.expand_dims(img_array, axis=0)]
+    return generator
+
+
+def convert(model, mode, image_dir, calibration_images):
+    import tensorflow as tf
+
+    converter = tf.lite.TFLiteConverter.from_keras_model(model)
+    converter.optimizations = [tf.lite.Optimize.DEFAULT]
+
+    if mode == 'fp16':
+        converter.target_spec.supported_types = [tf.float16]
+    else:
+        # Full integer quantization, including the input and output tensors
+        converter.representative_dataset = representative_dataset(image_dir, calibration_images)
+        converter.target_spec.supported_ops = [tf.lite.OpsSet.TFLITE_BUILTINS_INT8]
+        converter.inference_input_type = tf.int8
+        converter.inference_output_type = tf.int8
+
+    return converter.convert()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Convert the Keras model to float16 / int8 TFLite models.')
+    parser.add_argument('--model', default=BACKEND_PATHS['keras'], help='Path to the .keras model')
+    parser.add_argument('--mode', choices=['fp16', 'int8', 'all'], default='all')
+    parser.add_argument('--calibration-dir', default=TEST_IMAGES_DIR, help='Images used to calibrate int8 ranges')
+    parser.add_argument('--calibration-images', type=int, default=100)
+    args = parser.parse_args()
+
+    from tensorflow.keras.models import load_model # type: ignore
+    model = load_model(args.model)
+
+    modes = ['fp16', 'int8'] if args.mode == 'all' else [args.mode]
+    for mode in modes:
+        output_path = BACKEND_PATHS[f'tflite-{mode}']
+        tflite_model = convert(model, mode, args.calibration_dir, args.calibration_images)
+        with open(output_path, 'wb') as f:
+            f.write(tflite_model)
+
+        size_mb = os.path.getsize(output_path) / (1024 * 1024)
+        original_mb = os.path.getsize(args.model) / (1024 * 1024)
+        print(f"{mode}: wrote {output_path} ({size_mb:.2f} MB, original {original_mb:.2f} MB)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,118 @@
+# Export the Keras model to .npz for the TensorFlow-free NumPy backend, check that it matches Keras
+# on the bundled test images, and compare startup time and memory of the two backends.
+#
+# Usage (from the repository root):
+#   python -m scripts.export_numpy_model                # export, verify and benchmark
+#   python -m scripts.export_numpy_model --no-export    # re-check an existing export
+#   python -m scripts.export_numpy_model --no-benchmark
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+import numpy as np
+from utils.inference_backends import BACKEND_PATHS, load_backend
+from utils.preprocessing import IMAGE_SIZE, decode_image
+from scripts.common import TEST_IMAGES_DIR, iter_labeled_images
+
+
+# Run the exported model and Keras on the same images and compare their outputs
+def verify(keras_path, numpy_path, images, batch_size):
+    arrays = []
+    for path, _ in iter_labeled_images(images):
+        with open(path, 'rb') as f:
+            arrays.append(decode_image(f.read()))
+    if not arrays:
+        raise ValueError(f"No labeled images found under {images}")
+    arrays = np.stack(arrays)
+
+    keras_backend = load_backend('keras', keras_path)
+    numpy_backend = load_backend('numpy', numpy_path)
+    keras_preds = np.concatenate([keras_backend.predict(arrays[i:i + batch_size]) for i in range(0, len(arrays), batch_size)])
+    numpy_preds = np.concatenate([numpy_backend.predict(arrays[i:i + batch_size]) for i in range(0, len(arrays), batch_size)])
+
+    diff = np.abs(keras_preds - numpy_preds)
+    return {
+        'images': len(arrays),
+        'max_abs_diff': float(diff.max()),
+        'mean_abs_diff': float(diff.mean()),
+        'top1_agreement': float((np.argmax(keras_preds, axis=1) == np.argmax(numpy_preds, axis=1)).mean()),
+    }
+
+
+# Load a backend and run one batch in this (fresh) process, timing each step
+def measure_startup(backend, path, batch_size):
+    started = time.perf_counter()
+    model = load_backend(backend, path)
+    loaded = time.perf_counter()
+    model.predict(np.zeros((batch_size, IMAGE_SIZE[0], IMAGE_SIZE[1], 3), dtype=np.float32))
+    predicted = time.perf_counter()
+
+    # Imported here so the measurement above does not include the benchmark module
+    from scripts.benchmark import peak_rss_mb
+    return {
+        'load_s': loaded - started,
+        'first_predict_s': predicted - loaded,
+        'peak_rss_mb': peak_rss_mb(),
+    }
+
+
+# Measure each backend in its own interpreter so one does not inflate the other's memory
+def compare_startup(paths, batch_size):
+    results = {}
+    for backend, path in paths.items():
+        started = time.perf_counter()
+        output = subprocess.run(
+            [sys.executable, '-m', 'scripts.export_numpy_model', '--measure-startup', backend,
+             '--keras-model', paths['keras'], '--output', paths['numpy'], '--batch-size', str(batch_size)],
+            check=True, capture_output=True, text=True
+        ).stdout
+        results[backend] = json.loads(output.strip().splitlines()[-1])
+        results[backend]['process_s'] = time.perf_counter() - started
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Export the Keras model for the NumPy backend and verify it.')
+    parser.add_argument('--keras-model', default=BACKEND_PATHS['keras'])
+    parser.add_argument('--output', default=BACKEND_PATHS['numpy'])
+    parser.add_argument('--images', default=TEST_IMAGES_DIR, help='Labeled images used for verification')
+    parser.add_argument('--batch-size', type=int, default=32)
+    parser.add_argument('--tolerance', type=float, default=1e-4, help='Largest allowed probability difference')
+    parser.add_argument('--no-export', action='store_true', help='Verify an existing export')
+    parser.add_argument('--no-benchmark', action='store_true', help='Skip the startup and memory comparison')
+    parser.add_argument('--measure-startup', choices=['keras', 'numpy'], help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.measure_startup:
+        path = args.keras_model if args.measure_startup == 'keras' else args.output
+        print(json.dumps(measure_startup(args.measure_startup, path, args.batch_size)))
+        return
+
+    if not args.no_export:
+        from tensorflow.keras.models import load_model # type: ignore
+        from utils.numpy_runtime import export_model
+        layers = export_model(load_model(args.keras_model), args.output)
+        size_mb = os.path.getsize(args.output) / (1024 * 1024)
+        print(f"Wrote {args.output} ({len(layers)} layers, {size_mb:.2f} MB)")
+
+    report = verify(args.keras_model, args.output, args.images, args.batch_size)
+    print(f"Images: {report['images']}")
+    print(f"Probability difference: max {report['max_abs_diff']:.2e}, mean {report['mean_abs_diff']:.2e}")
+    print(f"Top-1 agreement: {report['top1_agreement']:.3f}")
+
+    if not args.no_benchmark:
+        startup = compare_startup({'keras': args.keras_model, 'numpy': args.output}, args.batch_size)
+        print(f"\n{'Backend':<8} {'process':>9} {'load':>8} {'1st batch':>10} {'peak RSS':>10}")
+        for backend, result in startup.items():
+            print(f"{backend:<8} {result['process_s']:8.2f}s {result['load_s']:7.2f}s "
+                  f"{result['first_predict_s']:9.2f}s {result['peak_rss_mb']:8.0f}MB")
+
+    if report['max_abs_diff'] > args.tolerance or report['top1_agreement'] < 1.0:
+        print(f"The NumPy model does not match Keras within {args.tolerance:g}; do not serve it")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
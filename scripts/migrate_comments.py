@@ -0,0 +1,74 @@
+# Move forum comments embedded in post documents into the comments collection.
+#
+# Usage (from the repository root):
+#   python -m scripts.migrate_comments              # move every embedded comment tree
+#   python -m scripts.migrate_comments --dry-run    # count what would move
+#   python -m scripts.migrate_comments --keep-embedded
+#
+# Posts are streamed with only their comment trees projected, and the flattened comments are written
+# with batched upserts that keep the original comment ids. A comment that already exists is left as
+# it is, so an interrupted run can simply be started again. Once a post's comments are all written,
+# its embedded array is removed and total_comments is set to the number of comments the post now has
+# in the comments collection (including any added through the forum since the new code went live).
+import argparse
+from pymongo import UpdateOne
+from utils.db import posts_collection, comments_collection
+from utils.forum_comments import ensure_comment_indexes, flatten_embedded
+
+
+def migrate(batch_size, dry_run, keep_embedded):
+    if not dry_run:
+        ensure_comment_indexes(comments_collection)
+
+    comment_writes, post_ids = [], []
+    posts = moved = 0
+
+    def flush():
+        if not dry_run and post_ids:
+            # Comments go first so a post never loses its embedded copy before the comments are stored
+            if comment_writes:
+                comments_collection.bulk_write(comment_writes, ordered=False)
+            # Count what is stored now rather than what was embedded, so comments added through the
+            # routes since the deploy (which already $inc'd the counter) are not lost on a re-run
+            counts = {row['_id']: row['count'] for row in comments_collection.aggregate([
+                {'$match': {'post_id': {'$in': post_ids}}},
+                {'$group': {'_id': '$post_id', 'count': {'$sum': 1}}},
+            ])}
+            post_writes = []
+            for post_id in post_ids:
+                update = {'$set': {'total_comments': counts.get(post_id, 0)}}
+                if not keep_embedded:
+                    update['$unset'] = {'comments': ''}
+                post_writes.append(UpdateOne({'_id': post_id}, update))
+            posts_collection.bulk_write(post_writes, ordered=False)
+        comment_writes.clear()
+        post_ids.clear()
+
+    cursor = posts_collection.find({'comments': {'$exists': True, '$ne': []}}, {'comments': 1}, batch_size=batch_size)
+    for post in cursor:
+        posts += 1
+        for doc in flatten_embedded(post['_id'], post['comments']):
+            comment_writes.append(UpdateOne({'_id': doc['_id']}, {'$setOnInsert': doc}, upsert=True))
+            moved += 1
+        post_ids.append(post['_id'])
+
+        if len(comment_writes) >= batch_size:
+            flush()
+
+    flush()
+    return posts, moved
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Move embedded forum comments into the comments collection.')
+    parser.add_argument('--batch-size', type=int, default=500, help='Comments per bulk write')
+    parser.add_argument('--dry-run', action='store_true', help='Count without writing')
+    parser.add_argument('--keep-embedded', action='store_true', help='Leave the embedded comments on each post')
+    args = parser.parse_args()
+
+    posts, moved = migrate(args.batch_size, args.dry_run, args.keep_embedded)
+    print(f"{'Would move' if args.dry_run else 'Moved'} {moved} comments from {posts} posts")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,68 @@
+# Check that the fast (DCT-downscaled) JPEG decode matches the full-decode path on the bundled test images.
+#
+# Usage (from the repository root):
+#   python -m scripts.validate_fast_decode               # pixels and predictions
+#   python -m scripts.validate_fast_decode --no-model    # pixels and timings only
+import argparse
+import sys
+import time
+import numpy as np
+from utils.inference_backends import BACKEND_PATHS, INFERENCE_BACKEND, load_backend
+from utils.preprocessing import decode_image
+from scripts.common import TEST_IMAGES_DIR, iter_labeled_images
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare fast and full image decoding on the bundled test images.')
+    parser.add_argument('--images', default=TEST_IMAGES_DIR)
+    parser.add_argument('--backend', default=INFERENCE_BACKEND, choices=sorted(BACKEND_PATHS))
+    parser.add_argument('--no-model', action='store_true', help='Skip the prediction comparison')
+    parser.add_argument('--min-agreement', type=float, default=0.98, help='Required top-1 agreement rate')
+    args = parser.parse_args()
+
+    full_arrays, fast_arrays = [], []
+    full_seconds, fast_seconds = 0.0, 0.0
+    for path, _ in iter_labeled_images(args.images):
+        with open(path, 'rb') as f:
+            data = f.read()
+
+        started = time.perf_counter()
+        full_arrays.append(decode_image(data, fast=False))
+        full_seconds += time.perf_counter() - started
+
+        started = time.perf_counter()
+        fast_arrays.append(decode_image(data, fast=True))
+        fast_seconds += time.perf_counter() - started
+
+    if not full_arrays:
+        parser.error(f"No labeled images found under {args.images}")
+
+    full_arrays = np.stack(full_arrays)
+    fast_arrays = np.stack(fast_arrays)
+    count = len(full_arrays)
+    pixel_diff = np.abs(full_arrays - fast_arrays)
+
+    print(f"Images: {count}")
+    print(f"Full decode: {full_seconds / count * 1000:.2f} ms/image")
+    print(f"Fast decode: {fast_seconds / count * 1000:.2f} ms/image ({full_seconds / fast_seconds:.1f}x faster)")
+    print(f"Pixel difference: mean {pixel_diff.mean():.4f}, max {pixel_diff.max():.4f} (0-1 scale)")
+
+    if args.no_model:
+        return
+
+    backend = load_backend(args.backend)
+    full_preds = np.concatenate([backend.predict(full_arrays[i:i + 32]) for i in range(0, count, 32)])
+    fast_preds = np.concatenate([backend.predict(fast_arrays[i:i + 32]) for i in range(0, count, 32)])
+    agreement = float((np.argmax(full_preds, axis=1) == np.argmax(fast_preds, axis=1)).mean())
+    prob_diff = np.abs(full_preds - fast_preds)
+
+    print(f"Top-1 agreement: {agreement:.3f}")
+    print(f"Probability difference: mean {prob_diff.mean():.4f}, max {prob_diff.max():.4f}")
+
+    if agreement < args.min_agreement:
+        print(f"Top-1 agreement is below {args.min_agreement:.3f}; set FAST_DECODE=0 to use the full decode path")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
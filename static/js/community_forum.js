@@ -148,11 +148,13 @@ document.addEventListener("DOMContentLoaded", () => {
           likeCount.remove();
         }
 
-        // Update like icon
-        if (data.liked_by.includes(currentUserId)) {
-          likeIcon.classList.replace("far", "fas");
-        } else {
-          likeIcon.classList.replace("fas", "far");
+        // Update like icon when the current user toggled the like (possibly in another tab)
+        if (data.user_id === currentUserId) {
+          if (data.liked) {
+            likeIcon.classList.replace("far", "fas");
+          } else {
+            likeIcon.classList.replace("fas", "far");
+          }
         }
       }
     });
@@ -294,12 +296,8 @@ document.addEventListener("DOMContentLoaded", () => {
 
         // Update like text color
         const commentLike = commentItem.querySelector(".comment-like");
-        if (commentLike) {
-          if (data.liked_by.includes(currentUserId)) {
-            commentLike.style.color = "#5b9120";
-          } else {
-            commentLike.style.color = "";
-          }
+        if (commentLike && data.user_id === currentUserId) {
+          commentLike.style.color = data.liked ? "#5b9120" : "";
         }
       }
     });
@@ -457,12 +455,8 @@ document.addEventListener("DOMContentLoaded", () => {
 
         // Update like text color
         const commentLike = replyItem.querySelector(".comment-like");
-        if (commentLike) {
-          if (data.liked_by.includes(currentUserId)) {
-            commentLike.style.color = "#5b9120";
-          } else {
-            commentLike.style.color = "";
-          }
+        if (commentLike && data.user_id === currentUserId) {
+          commentLike.style.color = data.liked ? "#5b9120" : "";
         }
       }
     });
@@ -787,114 +781,6 @@ document.addEventListener("DOMContentLoaded", () => {
     imageInput.value = "";
   };
 
-  // Function to load posts
-  function loadPosts(filter = "latest") {
-    // Show loading spinner
-    postsContainer.innerHTML = "";
-    postsContainer.appendChild(loadingSpinner.cloneNode(true));
-
-    fetch(`/community-forum/posts?filter=${filter}`, {
-      method: "GET",
-      headers: { "Content-Type": "application/json" },
-    })
-      .then((response) => response.json())
-      .then((posts) => {
-        // Clear the posts container before appending new posts
-        postsContainer.innerHTML = "";
-
-        if (posts.length === 0) {
-          const noPosts = document.createElement("div");
-          noPosts.className = "no-posts-message";
-          noPosts.textContent =
-            "No posts found. Be the first to create a post.";
-          postsContainer.appendChild(noPosts);
-          return;
-        }
-
-        // Append new posts
-        posts.forEach((post) => {
-          const postCard = document.createElement("div");
-          postCard.className = "post-card";
-          postCard.dataset.postId = post._id;
-          postCard.innerHTML = `
-            <div class="post-header" data-user-id="${post.user_id}">
-              <img src="${post.user.profile_pic}" alt="${
-            post.user.name
-          }" class="profile-pic" />
-              <h4>${post.user.name}</h4>
-              <span class="time-ago">${post.time_ago}</span>
-              <span class="post-options">
-                <i class="fa fa-ellipsis-v post-options-toggle" data-post-id="${
-                  post._id
-                }" data-user-id="${post.user_id}"></i>
-                <span class="post-edit-delete-icons" style="display:none;">
-                  <i class="fa fa-pencil-square post-edit-icon" data-post-id="${
-                    post._id
-                  }" data-user-id="${post.user_id}"></i>
-                  <i class="fa fa-minus-square post-delete-icon" data-post-id="${
-                    post._id
-                  }" data-user-id="${post.user_id}"></i>
-                  <i class="fa fa-window-close post-cancel-icon" data-post-id="${
-                    post._id
-                  }" data-user-id="${post.user_id}"></i>
-                </span>
-              </span>
-            </div>
-
-            <h3>${post.title}</h3>
-            ${
-              post.image
-                ? `<img src="${post.image}" alt="${post.title}" class="post-image" />`
-                : ""
-            }
-            <p>${post.description}</p>
-            <div class="post-actions">
-              <i class="${
-                post.liked ? "fas" : "far"
-              } fa-thumbs-up" data-post-id="${post._id}"></i>
-              ${
-                post.likes > 0
-                  ? `<span class="count like-count">Likes ${post.likes}</span>`
-                  : ""
-              }
-              <i class="${
-                post.total_comments > 0
-                  ? "fa fa-commenting"
-                  : "fa fa-commenting-o"
-              }" data-post-id="${post._id}"></i>
-              ${
-                post.total_comments > 0
-                  ? `<span class="count comment-count">Comments ${post.total_comments}</span>`
-                  : ""
-              }
-            </div>
-            <div class="comment-container">
-              <i class="fas fa-times close-comments"></i>
-              <div class="comment-list">
-                <!-- Comments will be dynamically added here -->
-              </div>
-            </div>
-            <div class="comment-input-container">
-              <input type="text" placeholder="Write a comment" />
-              <i class="fas fa-paper-plane"></i>
-            </div>
-          `;
-          postsContainer.appendChild(postCard);
-        });
-      })
-      .catch((error) => {
-        console.error("Error:", error);
-        showMessage("An error occurred while loading posts.", "error");
-
-        // Show error message in posts container
-        postsContainer.innerHTML = "";
-        const errorMessage = document.createElement("div");
-        errorMessage.className = "error-message";
-        errorMessage.textContent = "Failed to load posts. Please try again.";
-        postsContainer.appendChild(errorMessage);
-      });
-  }
-
   // Function to add a new post to the DOM
   function addPostToDOM(post) {
     const noPostsMessage = postsContainer.querySelector(".no-posts-message");
@@ -946,7 +832,7 @@ document.addEventListener("DOMContentLoaded", () => {
         }
         <i class="fa fa-commenting-o" data-post-id="${post._id}"></i>
         ${
-          post.comments && post.total_comments > 0
+          post.total_comments > 0
             ? `<span class="count">Comments ${post.total_comments}</span>`
             : ""
         }
@@ -1617,6 +1503,196 @@ document.addEventListener("DOMContentLoaded", () => {
   let currentSortFilter = "";
   let currentScopeFilter = "";
 
+  // Feed pagination state: the server returns an opaque cursor for the next page (null on the last page)
+  let nextCursor = null;
+  let loadingMore = false;
+  // Incremented whenever the feed is reset, so responses for an older filter are ignored
+  let feedGeneration = 0;
+
+  // Sentinel below the posts; the next page loads when it scrolls into view
+  const feedSentinel = document.createElement("div");
+  feedSentinel.className = "feed-sentinel";
+  postsContainer.after(feedSentinel);
+
+  // Function to build the card for a post returned by the feed endpoint
+  function renderPostCard(post) {
+    const postCard = document.createElement("div");
+    postCard.className = "post-card";
+    postCard.dataset.postId = post._id;
+    postCard.innerHTML = `
+      <div class="post-header" data-user-id="${post.user_id}">
+        <img src="${post.user.profile_pic}" alt="${
+      post.user.name
+    }" class="profile-pic" />
+        <h4>${post.user.name}</h4>
+        <span class="time-ago">${post.time_ago}</span>
+        <span class="post-options">
+          <i class="fa fa-ellipsis-v post-options-toggle" data-post-id="${
+            post._id
+          }" data-user-id="${post.user_id}"></i>
+          <span class="post-edit-delete-icons" style="display:none;">
+            <i class="fa fa-pencil-square post-edit-icon" data-post-id="${
+              post._id
+            }" data-user-id="${post.user_id}"></i>
+            <i class="fa fa-minus-square post-delete-icon" data-post-id="${
+              post._id
+            }" data-user-id="${post.user_id}"></i>
+            <i class="fa fa-window-close post-cancel-icon" data-post-id="${
+              post._id
+            }" data-user-id="${post.user_id}"></i>
+          </span>
+        </span>
+      </div>
+
+      <h3>${post.title}</h3>
+      ${
+        post.image
+          ? `<img src="${post.image}" alt="${post.title}" class="post-image" />`
+          : ""
+      }
+      <p>${post.description}</p>
+      <div class="post-actions">
+        <i class="${
+          post.liked ? "fas" : "far"
+        } fa-thumbs-up" data-post-id="${post._id}"></i>
+        ${
+          post.likes > 0
+            ? `<span class="count like-count">Likes ${post.likes}</span>`
+            : ""
+        }
+        <i class="${
+          post.total_comments > 0
+            ? "fa fa-commenting"
+            : "fa fa-commenting-o"
+        }" data-post-id="${post._id}"></i>
+        ${
+          post.total_comments > 0
+            ? `<span class="count comment-count">Comments ${post.total_comments}</span>`
+            : ""
+        }
+      </div>
+      <div class="comment-container">
+        <i class="fas fa-times close-comments"></i>
+        <div class="comment-list">
+          <!-- Comments will be dynamically added here -->
+        </div>
+      </div>
+      <div class="comment-input-container">
+        <input type="text" placeholder="Write a comment" />
+        <i class="fas fa-paper-plane"></i>
+      </div>
+    `;
+    return postCard;
+  }
+
+  // Function to fetch one page of posts for the current filters and append it
+  function fetchPostsPage(cursor) {
+    const generation = feedGeneration;
+    const params = new URLSearchParams({
+      sort: currentSortFilter || "latest",
+      scope: currentScopeFilter || "all",
+    });
+    if (cursor) {
+      params.set("cursor", cursor);
+    }
+
+    loadingMore = true;
+    return fetch(`/community-forum/posts?${params}`, {
+      method: "GET",
+      headers: { "Content-Type": "application/json" },
+    })
+      .then((response) => {
+        if (!response.ok) {
+          throw new Error(`Failed to load posts (${response.status})`);
+        }
+        return response.json();
+      })
+      .then((page) => {
+        // The filters changed while this page was loading
+        if (generation !== feedGeneration) {
+          return;
+        }
+        const spinner = postsContainer.querySelector(".loading-spinner");
+        if (spinner) {
+          spinner.remove();
+        }
+
+        if (!cursor && page.posts.length === 0) {
+          const noPosts = document.createElement("div");
+          noPosts.className = "no-posts-message";
+          noPosts.textContent =
+            "No posts found. Be the first to create a post!";
+          postsContainer.appendChild(noPosts);
+        }
+
+        page.posts.forEach((post) => {
+          // A post created over the socket while scrolling may already be on the page
+          if (!postsContainer.querySelector(`.post-card[data-post-id="${post._id}"]`)) {
+            postsContainer.appendChild(renderPostCard(post));
+          }
+        });
+        nextCursor = page.next_cursor;
+      })
+      .catch((error) => {
+        if (generation !== feedGeneration) {
+          return;
+        }
+        console.error("Error:", error);
+        showMessage("An error occurred while loading posts.", "error");
+
+        if (!cursor) {
+          // Show error message in posts container
+          postsContainer.innerHTML = "";
+          const errorMessage = document.createElement("div");
+          errorMessage.className = "error-message";
+          errorMessage.textContent = "Failed to load posts. Please try again.";
+          postsContainer.appendChild(errorMessage);
+        }
+      })
+      .finally(() => {
+        if (generation === feedGeneration) {
+          loadingMore = false;
+        }
+      });
+  }
+
+  // Function to reload the feed from the first page
+  function loadPosts() {
+    feedGeneration += 1;
+    nextCursor = null;
+
+    // Show loading spinner
+    postsContainer.innerHTML = "";
+    postsContainer.appendChild(loadingSpinner.cloneNode(true));
+    fetchPostsPage(null);
+  }
+
+  // Function to append the next page when the reader nears the end of the feed
+  function loadMorePosts() {
+    if (loadingMore || !nextCursor) {
+      return;
+    }
+    fetchPostsPage(nextCursor);
+  }
+
+  // Infinite scroll: load the next page shortly before the sentinel becomes visible
+  if ("IntersectionObserver" in window) {
+    new IntersectionObserver(
+      (entries) => {
+        if (entries.some((entry) => entry.isIntersecting)) {
+          loadMorePosts();
+        }
+      },
+      { rootMargin: "600px 0px" }
+    ).observe(feedSentinel);
+  } else {
+    window.addEventListener("scroll", () => {
+      if (feedSentinel.getBoundingClientRect().top < window.innerHeight + 600) {
+        loadMorePosts();
+      }
+    });
+  }
+
   // Handle clicks on the sort filters
   document.querySelectorAll("#sort-filters ul li a").forEach((link) => {
     link.addEventListener("click", function (e) {
@@ -1636,7 +1712,7 @@ document.addEventListener("DOMContentLoaded", () => {
         this.querySelector("i").className = "fa fa-check-circle";
         currentSortFilter = this.dataset.sort;
       }
-      loadPostsCombined();
+      loadPosts();
     });
   });
 
@@ -1659,123 +1735,10 @@ document.addEventListener("DOMContentLoaded", () => {
         this.querySelector("i").className = "fa fa-check-circle";
         currentScopeFilter = this.dataset.scope;
       }
-      loadPostsCombined();
+      loadPosts();
     });
   });
 
-  // Function to load posts with combined filters
-  function loadPostsCombined() {
-    // Show loading spinner
-    postsContainer.innerHTML = "";
-    postsContainer.appendChild(loadingSpinner.cloneNode(true));
-
-    // Build the query string. For example, the backend should expect ?sort=...&scope=...
-    // If a filter is not set, you can define a default.
-    const sortParam = currentSortFilter || "latest";
-    const scopeParam = currentScopeFilter || "all";
-
-    fetch(`/community-forum/posts?sort=${sortParam}&scope=${scopeParam}`, {
-      method: "GET",
-      headers: { "Content-Type": "application/json" },
-    })
-      .then((response) => response.json())
-      .then((posts) => {
-        // Clear the posts container before appending new posts
-        postsContainer.innerHTML = "";
-
-        if (posts.length === 0) {
-          const noPosts = document.createElement("div");
-          noPosts.className = "no-posts-message";
-          noPosts.textContent =
-            "No posts found. Be the first to create a post!";
-          postsContainer.appendChild(noPosts);
-          return;
-        }
-
-        // Render the posts as usual.
-        posts.forEach((post) => {
-          const postCard = document.createElement("div");
-          postCard.className = "post-card";
-          postCard.dataset.postId = post._id;
-          // Use your existing post rendering logic (the same as in loadPosts())
-          postCard.innerHTML = `
-          <div class="post-header" data-user-id="${post.user_id}">
-            <img src="${post.user.profile_pic}" alt="${
-            post.user.name
-          }" class="profile-pic" />
-            <h4>${post.user.name}</h4>
-            <span class="time-ago">${post.time_ago}</span>
-            <span class="post-options">
-              <i class="fa fa-ellipsis-v post-options-toggle" data-post-id="${
-                post._id
-              }" data-user-id="${post.user_id}"></i>
-              <span class="post-edit-delete-icons" style="display:none;">
-                <i class="fa fa-pencil-square post-edit-icon" data-post-id="${
-                  post._id
-                }" data-user-id="${post.user_id}"></i>
-                <i class="fa fa-minus-square post-delete-icon" data-post-id="${
-                  post._id
-                }" data-user-id="${post.user_id}"></i>
-                <i class="fa fa-window-close post-cancel-icon" data-post-id="${
-                  post._id
-                }" data-user-id="${post.user_id}"></i>
-              </span>
-            </span>
-          </div>
-          <h3>${post.title}</h3>
-          ${
-            post.image
-              ? `<img src="${post.image}" alt="${post.title}" class="post-image" />`
-              : ""
-          }
-          <p>${post.description}</p>
-          <div class="post-actions">
-            <i class="${
-              post.liked ? "fas" : "far"
-            } fa-thumbs-up" data-post-id="${post._id}"></i>
-            ${
-              post.likes > 0
-                ? `<span class="count">Likes ${post.likes}</span>`
-                : ""
-            }
-            <i class="${
-              post.total_comments > 0
-                ? "fa fa-commenting"
-                : "fa fa-commenting-o"
-            }" data-post-id="${post._id}"></i>
-            ${
-              post.total_comments > 0
-                ? `<span class="count comment-count">Comments ${post.total_comments}</span>`
-                : ""
-            }
-          </div>
-          <div class="comment-container">
-            <i class="fas fa-times close-comments"></i>
-            <div class="comment-list">
-              <!-- Comments will be dynamically added here -->
-            </div>
-          </div>
-          <div class="comment-input-container">
-            <input type="text" placeholder="Write a comment" />
-            <i class="fas fa-paper-plane"></i>
-          </div>
-        `;
-          postsContainer.appendChild(postCard);
-        });
-      })
-      .catch((error) => {
-        console.error("Error:", error);
-        showMessage("An error occurred while loading posts.", "error");
-
-        // Show error message in posts container
-        postsContainer.innerHTML = "";
-        const errorMessage = document.createElement("div");
-        errorMessage.className = "error-message";
-        errorMessage.textContent = "Failed to load posts. Please try again.";
-        postsContainer.appendChild(errorMessage);
-      });
-  }
-
   // Function to format time ago in short form
   function timeAgoShort(date) {
     const now = new Date();
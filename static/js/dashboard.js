@@ -695,4 +695,67 @@ document.addEventListener("DOMContentLoaded", function () {
   window.addEventListener("beforeunload", function () {
     clearInterval(slideInterval);
   });
+
+  // Disease prevalence table (officers only)
+  const prevalenceSection = document.getElementById("prevalenceSection");
+  if (prevalenceSection) {
+    const prevalenceTable = document.getElementById("prevalenceTable");
+    const periodButtons = prevalenceSection.querySelectorAll(".prevalence-period");
+
+    function renderPrevalence(data) {
+      const labels = Object.keys(data.totals).sort();
+      const head = prevalenceTable.querySelector("thead");
+      const body = prevalenceTable.querySelector("tbody");
+      head.innerHTML = "";
+      body.innerHTML = "";
+
+      if (labels.length === 0) {
+        body.innerHTML = '<tr><td class="no-data">No detections recorded yet</td></tr>';
+        return;
+      }
+
+      const headRow = document.createElement("tr");
+      [data.period === "week" ? "Week of" : "Day"].concat(labels, ["Total"]).forEach((text) => {
+        const th = document.createElement("th");
+        th.textContent = text;
+        headRow.appendChild(th);
+      });
+      head.appendChild(headRow);
+
+      // Most recent bucket first
+      data.series
+        .slice()
+        .reverse()
+        .forEach((bucket) => {
+          const row = document.createElement("tr");
+          [bucket.start]
+            .concat(labels.map((label) => bucket.counts[label] || 0), [bucket.total])
+            .forEach((value) => {
+              const td = document.createElement("td");
+              td.textContent = value;
+              row.appendChild(td);
+            });
+          body.appendChild(row);
+        });
+    }
+
+    function loadPrevalence(period) {
+      fetch(prevalenceSection.dataset.url + "?period=" + period)
+        .then((response) => response.json())
+        .then(renderPrevalence)
+        .catch((error) => {
+          console.error("Error fetching disease prevalence:", error);
+        });
+    }
+
+    periodButtons.forEach((button) => {
+      button.addEventListener("click", function () {
+        periodButtons.forEach((b) => b.classList.remove("active"));
+        this.classList.add("active");
+        loadPrevalence(this.dataset.period);
+      });
+    });
+
+    loadPrevalence("day");
+  }
 });
@@ -129,17 +129,288 @@ document.addEventListener("DOMContentLoaded", function () {
     });
   }
 
+  // Poll the model status while it is warming up and hide the notice once ready
+  const modelStatusNotice = document.getElementById("modelStatusNotice");
+  if (modelStatusNotice && modelStatusNotice.dataset.status === "warming_up") {
+    const statusTimer = setInterval(function () {
+      fetch(modelStatusNotice.dataset.statusUrl)
+        .then((response) => response.json())
+        .then((data) => {
+          if (data.status === "ready") {
+            modelStatusNotice.hidden = true;
+            clearInterval(statusTimer);
+          } else if (data.status === "failed") {
+            modelStatusNotice.textContent =
+              "The detection model is currently unavailable.";
+            clearInterval(statusTimer);
+          }
+        })
+        .catch((error) => {
+          console.error("Error fetching model status:", error);
+        });
+    }, 2000);
+  }
+
   // Handle form submission and show loading animation (for both admin and regular users)
   const form = document.querySelector("form[enctype='multipart/form-data']");
   const uploadBtn = document.getElementById("uploadPredictBtn");
   const loadingAnim = document.getElementById("loadingAnimation");
 
   if (form && uploadBtn && loadingAnim) {
-    form.addEventListener("submit", function () {
+    form.addEventListener("submit", function (e) {
       // Hide the upload button
       uploadBtn.style.display = "none";
       // Show the loading animation
       loadingAnim.style.display = "block";
+
+      // Submit as an asynchronous job when the browser supports it,
+      // otherwise fall back to the regular form post
+      if (form.dataset.jobsUrl && window.fetch && window.FormData) {
+        e.preventDefault();
+        const tiledMode = document.getElementById("tiledMode");
+        if (tiledMode && tiledMode.checked) {
+          submitTiledDetection();
+        } else {
+          submitDetectionJob();
+        }
+      }
+    });
+  }
+
+  let detectionSocket = null;
+  let activeJobId = null;
+  let pollTimer = null;
+
+  // Restore the upload button once a job has finished
+  function resetUploadButton() {
+    uploadBtn.style.display = "";
+    loadingAnim.style.display = "none";
+  }
+
+  // Show the result of a finished job
+  function showJobResult(job) {
+    if (!job || job.job_id !== activeJobId || job.status === "queued" || job.status === "running") {
+      return;
+    }
+    activeJobId = null;
+    clearInterval(pollTimer);
+    resetUploadButton();
+
+    if (job.status === "failed") {
+      showMessage(job.error || "Detection failed. Please try again.", "error");
+      return;
+    }
+
+    showResult(job);
+  }
+
+  // Fill in the result section (the heatmap is only present for tiled detection)
+  function showResult(result) {
+    const asyncResult = document.getElementById("asyncResult");
+    const heatmap = document.getElementById("asyncHeatmap");
+    document.getElementById("asyncPrediction").textContent = "Predicted: " + result.prediction;
+    if (result.heatmap) {
+      heatmap.src = result.heatmap;
+      heatmap.hidden = false;
+    } else {
+      heatmap.hidden = true;
+    }
+    showSimilarCases(result.similar_cases || []);
+    // Solutions are rich text written by admins (rendered with |safe on the server as well)
+    document.getElementById("asyncSolution").innerHTML = result.solution;
+    asyncResult.hidden = false;
+  }
+
+  // List the most similar earlier cases next to the prediction
+  function showSimilarCases(cases) {
+    const container = document.getElementById("asyncSimilar");
+    const list = container.querySelector("ul");
+    list.innerHTML = "";
+    cases.forEach((item) => {
+      const li = document.createElement("li");
+      li.textContent =
+        item.prediction +
+        " \u00b7 " +
+        Math.round(item.similarity * 100) +
+        "% similar \u00b7 " +
+        item.date;
+      list.appendChild(li);
+    });
+    container.hidden = cases.length === 0;
+  }
+
+  // Tiled detection runs synchronously and returns the verdict with a heatmap overlay
+  function submitTiledDetection() {
+    const asyncResult = document.getElementById("asyncResult");
+    if (asyncResult) asyncResult.hidden = true;
+
+    fetch(form.dataset.tiledUrl, { method: "POST", body: new FormData(form) })
+      .then((response) =>
+        response.json().then((data) => ({ response: response, data: data }))
+      )
+      .then(({ response, data }) => {
+        resetUploadButton();
+        if (!response.ok) {
+          showMessage(data.error || "Detection failed. Please try again.", "error");
+          return;
+        }
+        showResult(data);
+      })
+      .catch((error) => {
+        console.error("Error running tiled detection:", error);
+        resetUploadButton();
+        showMessage("Could not reach the server. Please try again.", "error");
+      });
+  }
+
+  // Listen for results pushed to this user's Socket.IO room
+  function ensureDetectionSocket() {
+    if (detectionSocket || typeof io === "undefined") return;
+    detectionSocket = io();
+    detectionSocket.on("connect", function () {
+      detectionSocket.emit("join", { user_id: currentUserId });
+    });
+    detectionSocket.on("detection_result", showJobResult);
+  }
+
+  // Polling fallback in case the socket is unavailable or misses the event
+  function pollJob(statusUrl) {
+    clearInterval(pollTimer);
+    pollTimer = setInterval(function () {
+      fetch(statusUrl)
+        .then((response) => response.json())
+        .then(showJobResult)
+        .catch((error) => {
+          console.error("Error fetching detection job:", error);
+        });
+    }, 3000);
+  }
+
+  function submitDetectionJob() {
+    const asyncResult = document.getElementById("asyncResult");
+    if (asyncResult) asyncResult.hidden = true;
+    ensureDetectionSocket();
+
+    fetch(form.dataset.jobsUrl, { method: "POST", body: new FormData(form) })
+      .then((response) =>
+        response.json().then((data) => ({ response: response, data: data }))
+      )
+      .then(({ response, data }) => {
+        if (response.status === 202) {
+          activeJobId = data.job_id;
+          pollJob(data.status_url);
+          return;
+        }
+        resetUploadButton();
+        let message = data.error || "Detection failed. Please try again.";
+        const retryAfter = response.headers.get("Retry-After");
+        if (retryAfter) {
+          message += " (retry in " + retryAfter + "s)";
+        }
+        showMessage(message, "error");
+      })
+      .catch((error) => {
+        console.error("Error submitting detection job:", error);
+        resetUploadButton();
+        showMessage("Could not reach the server. Please try again.", "error");
+      });
+  }
+
+  // Live camera detection: stream frames and show the smoothed prediction
+  const liveCameraBtn = document.getElementById("liveCameraBtn");
+  const liveVideo = document.getElementById("liveVideo");
+  const livePrediction = document.getElementById("livePrediction");
+  let liveSocket = null;
+  let liveStream = null;
+  let liveTimer = null;
+  let frameInFlight = false;
+  let frameSentAt = 0;
+
+  // Capture the current video frame as a small JPEG and send it as binary
+  function sendLiveFrame(canvas) {
+    // Only one frame in flight per client; the server also keeps just the latest one
+    if (frameInFlight && Date.now() - frameSentAt < 3000) return;
+    if (!liveVideo.videoWidth) return;
+
+    const scale = Math.min(1, 320 / liveVideo.videoWidth);
+    canvas.width = Math.round(liveVideo.videoWidth * scale);
+    canvas.height = Math.round(liveVideo.videoHeight * scale);
+    canvas.getContext("2d").drawImage(liveVideo, 0, 0, canvas.width, canvas.height);
+    canvas.toBlob(
+      function (blob) {
+        if (!blob || !liveSocket) return;
+        blob.arrayBuffer().then((buffer) => {
+          frameInFlight = true;
+          frameSentAt = Date.now();
+          liveSocket.emit("frame", buffer);
+        });
+      },
+      "image/jpeg",
+      0.7
+    );
+  }
+
+  function stopLiveCamera() {
+    clearInterval(liveTimer);
+    if (liveStream) liveStream.getTracks().forEach((track) => track.stop());
+    if (liveSocket) liveSocket.disconnect();
+    liveStream = null;
+    liveSocket = null;
+    frameInFlight = false;
+    liveVideo.hidden = true;
+    livePrediction.hidden = true;
+    liveCameraBtn.innerHTML = '<i class="fa fa-video"></i> Start live camera';
+  }
+
+  function startLiveCamera() {
+    if (typeof io === "undefined" || !navigator.mediaDevices) {
+      showMessage("Live camera detection is not available in this browser.", "error");
+      return;
+    }
+
+    navigator.mediaDevices
+      .getUserMedia({ video: { facingMode: "environment" }, audio: false })
+      .then(function (stream) {
+        liveStream = stream;
+        liveVideo.srcObject = stream;
+        liveVideo.hidden = false;
+        livePrediction.hidden = false;
+        livePrediction.textContent = "Point the camera at a betel leaf...";
+        liveCameraBtn.innerHTML = '<i class="fa fa-stop"></i> Stop live camera';
+
+        liveSocket = io(document.getElementById("liveDetection").dataset.namespace);
+        liveSocket.on("prediction", function (data) {
+          frameInFlight = false;
+          livePrediction.textContent =
+            data.prediction + " (" + Math.round(data.confidence * 100) + "%)";
+        });
+        liveSocket.on("frame_error", function (data) {
+          frameInFlight = false;
+          console.error("Live detection error:", data.error);
+        });
+        liveSocket.on("model_status", function () {
+          frameInFlight = false;
+          livePrediction.textContent = "The detection model is warming up...";
+        });
+
+        const canvas = document.createElement("canvas");
+        liveTimer = setInterval(function () {
+          sendLiveFrame(canvas);
+        }, 200);
+      })
+      .catch(function (error) {
+        console.error("Error starting camera:", error);
+        showMessage("Could not access the camera.", "error");
+      });
+  }
+
+  if (liveCameraBtn && liveVideo && livePrediction) {
+    liveCameraBtn.addEventListener("click", function () {
+      if (liveStream) {
+        stopLiveCamera();
+      } else {
+        startLiveCamera();
+      }
     });
   }
 });
@@ -0,0 +1,86 @@
+import os
+import threading
+import time
+from bson.objectid import ObjectId
+from bson.errors import InvalidId
+from utils.db import users_collection
+
+# Seconds a resolved author is reused before it is fetched again (override with an environment variable)
+AUTHOR_CACHE_SECONDS = float(os.getenv('AUTHOR_CACHE_SECONDS', '30'))
+
+# Largest number of authors kept in memory; the oldest entries are dropped first
+AUTHOR_CACHE_SIZE = 10000
+
+# Only the fields needed to display an author are read
+AUTHOR_PROJECTION = {'name': 1, 'profile_pic': 1}
+
+
+# Every user id in a list of documents, including nested lists (e.g. comment replies) under `children`
+def collect_user_ids(items, key='user_id', children=None):
+    ids = set()
+    for item in items:
+        if item.get(key):
+            ids.add(str(item[key]))
+        if children and item.get(children):
+            ids |= collect_user_ids(item[children], key, children)
+    return ids
+
+
+class AuthorCache:
+    """Short-lived in-process cache of user names and profile pictures, filled with batched $in queries."""
+
+    def __init__(self, collection, ttl=AUTHOR_CACHE_SECONDS, max_size=AUTHOR_CACHE_SIZE):
+        self.collection = collection
+        self.ttl = ttl
+        self.max_size = max_size
+        # user id -> (fetched_at, user document or None for unknown users)
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    # Map of user id -> {'name', 'profile_pic'} for every known id; unknown or invalid ids are left out
+    def resolve(self, user_ids):
+        now = time.monotonic()
+        found, missing = {}, []
+        with self._lock:
+            for user_id in {str(user_id) for user_id in user_ids if user_id}:
+                entry = self._entries.get(user_id)
+                if entry and now - entry[0] < self.ttl:
+                    if entry[1] is not None:
+                        found[user_id] = entry[1]
+                else:
+                    missing.append(user_id)
+
+        object_ids = []
+        for user_id in missing:
+            try:
+                object_ids.append(ObjectId(user_id))
+            except (InvalidId, TypeError):
+                continue
+        if not object_ids:
+            return found
+
+        # One round trip for every author not in the cache
+        fetched = {str(doc['_id']): doc for doc in self.collection.find({'_id': {'$in': object_ids}}, AUTHOR_PROJECTION)}
+        with self._lock:
+            for user_id in missing:
+                doc = fetched.get(user_id)
+                # Re-insert so the entry moves to the end of the eviction order
+                self._entries.pop(user_id, None)
+                self._entries[user_id] = (now, doc)
+                if doc is not None:
+                    found[user_id] = doc
+            # Dicts keep insertion order, so the first keys are the oldest entries
+            while len(self._entries) > self.max_size:
+                del self._entries[next(iter(self._entries))]
+        return found
+
+    def get(self, user_id):
+        return self.resolve([user_id]).get(str(user_id))
+
+    # Drop a user after their name or profile picture changes
+    def invalidate(self, user_id):
+        with self._lock:
+            self._entries.pop(str(user_id), None)
+
+
+author_cache = AuthorCache(users_collection)
@@ -0,0 +1,124 @@
+import os
+import time
+import zipfile
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+from utils import model_loader
+from utils.batching import wait_for_result
+from utils.preprocessing import decode_image, read_upload, InvalidImageError, ImageTooLargeError, IMAGE_EXTENSIONS
+
+# Batch endpoint limits (override with environment variables)
+BATCH_DETECTION_SIZE = int(os.getenv('BATCH_DETECTION_SIZE', '32'))
+BATCH_DETECTION_MAX_FILES = int(os.getenv('BATCH_DETECTION_MAX_FILES', '500'))
+BATCH_DETECTION_MAX_MEMBER_BYTES = int(os.getenv('BATCH_DETECTION_MAX_MEMBER_BYTES', str(25 * 1024 * 1024)))
+DECODE_WORKERS = int(os.getenv('DECODE_WORKERS', str(min(8, os.cpu_count() or 1))))
+
+# Shared pool for decoding (Pillow releases the GIL while decoding)
+_decode_pool = ThreadPoolExecutor(max_workers=DECODE_WORKERS, thread_name_prefix='decode')
+
+# Separate single worker for forward passes so decoding of the next batch overlaps inference
+_predict_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix='batch-predict')
+
+
+# Build a list of (filename, read_bytes) sources from uploaded files and zip archives
+def collect_sources(files):
+    sources = []
+    for file in files:
+        if not file or file.filename == '':
+            continue
+        if file.filename.lower().endswith('.zip'):
+            archive = zipfile.ZipFile(file.stream)
+            for info in archive.infolist():
+                if info.is_dir() or not info.filename.lower().endswith(IMAGE_EXTENSIONS):
+                    continue
+                if info.file_size > BATCH_DETECTION_MAX_MEMBER_BYTES:
+                    sources.append((info.filename, None))
+                    continue
+                sources.append((info.filename, lambda archive=archive, info=info: archive.read(info)))
+        else:
+            sources.append((file.filename, lambda file=file: read_upload(file)))
+
+        if len(sources) > BATCH_DETECTION_MAX_FILES:
+            raise ValueError(f"Too many images (limit is {BATCH_DETECTION_MAX_FILES})")
+    return sources
+
+
+# Start decoding encoded image bytes on the shared pool; returns a Future
+def submit_decode(data, decode=decode_image):
+    return _decode_pool.submit(decode, data)
+
+
+# Decode encoded image bytes on the shared pool (keeps green threads from blocking on Pillow)
+def decode_in_pool(data, decode=decode_image):
+    return wait_for_result(submit_decode(data, decode))
+
+
+# Run one batched forward pass on the shared predict worker.
+# With versioned=True, returns (predictions, model version) instead of just the predictions.
+def predict_in_pool(batch, versioned=False):
+    predict_fn = model_loader.predict_versioned if versioned else model_loader.predict
+    return wait_for_result(_predict_pool.submit(predict_fn, batch))
+
+
+# Read and decode one source; returns (array, error message)
+def _load_source(reader):
+    if reader is None:
+        return None, 'File is too large'
+    try:
+        return decode_image(reader()), None
+    except (zipfile.BadZipFile, zlib.error):
+        # A corrupt member of an otherwise readable archive (e.g. a CRC mismatch) only fails that image
+        return None, 'Not a valid image'
+    except ImageTooLargeError:
+        return None, 'Image is too large'
+    except InvalidImageError:
+        return None, 'Not a valid image'
+
+
+# Submit decoding for one chunk of sources
+def _submit_chunk(chunk):
+    return [_decode_pool.submit(_load_source, reader) for _, reader in chunk]
+
+
+# Decode sources in parallel, classify them in fixed-size batches and yield one result per image.
+# on_prediction(img_array, probs, inference_ms, model_version) is called for every classified image.
+def detect_in_batches(sources, solutions, batch_size=BATCH_DETECTION_SIZE, on_prediction=None):
+    chunks = [sources[i:i + batch_size] for i in range(0, len(sources), batch_size)]
+    index = 0
+    pending = _submit_chunk(chunks[0]) if chunks else []
+
+    for chunk_number, chunk in enumerate(chunks):
+        decoded = [wait_for_result(future) for future in pending]
+
+        # Start decoding the next chunk while this one runs through the model
+        if chunk_number + 1 < len(chunks):
+            pending = _submit_chunk(chunks[chunk_number + 1])
+
+        arrays = [array for array, _ in decoded if array is not None]
+        preds = []
+        inference_ms = 0.0
+        version = None
+        if arrays:
+            started = time.perf_counter()
+            preds, version = predict_in_pool(np.stack(arrays), versioned=True)
+            inference_ms = (time.perf_counter() - started) * 1000.0 / len(arrays)
+
+        row = 0
+        for (filename, _), (array, error) in zip(chunk, decoded):
+            result = {'index': index, 'filename': filename}
+            if error:
+                result['error'] = error
+            else:
+                probs = preds[row]
+                row += 1
+                if on_prediction:
+                    on_prediction(array, probs, inference_ms, version)
+                prediction = model_loader.class_labels[int(np.argmax(probs))]
+                result.update({
+                    'prediction': prediction,
+                    'confidence': float(np.max(probs)),
+                    'solution': solutions.get(prediction, 'No solution available.')
+                })
+            index += 1
+            yield result
@@ -0,0 +1,171 @@
+import os
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+import numpy as np
+
+try:
+    from eventlet import greenthread, tpool
+except ImportError:
+    greenthread = None
+    tpool = None
+
+# Batching limits (override with environment variables to tune throughput against latency)
+BATCH_MAX_SIZE = int(os.getenv('BATCH_MAX_SIZE', '16'))
+BATCH_MAX_WAIT_MS = float(os.getenv('BATCH_MAX_WAIT_MS', '5'))
+
+# Number of recent requests kept for latency percentiles
+LATENCY_WINDOW = 1000
+
+
+# Helper to wait on a future without freezing the eventlet hub
+def wait_for_result(future, timeout=None):
+    # Request handlers run as green threads in a single OS thread under eventlet,
+    # so a plain blocking wait would stop every other request (and socket event)
+    # from reaching the batcher. Park the wait in eventlet's native thread pool instead.
+    if tpool is not None and isinstance(greenthread.getcurrent(), greenthread.GreenThread):
+        return tpool.execute(future.result, timeout)
+    return future.result(timeout)
+
+
+class MicroBatcher:
+    """Collects concurrent single-image requests into one batched forward pass.
+
+    With tagged=True, predict_fn returns (predictions, tag) and each request receives (row, tag),
+    e.g. the version of the model that produced the batch.
+    """
+
+    def __init__(self, predict_fn, max_batch_size=BATCH_MAX_SIZE, max_wait_ms=BATCH_MAX_WAIT_MS, max_in_flight=1,
+                 tagged=False):
+        self.predict_fn = predict_fn
+        self.tagged = tagged
+        self.max_batch_size = max(1, int(max_batch_size))
+        self.max_wait = max(0.0, float(max_wait_ms)) / 1000.0
+        self.max_in_flight = max(1, int(max_in_flight))
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._worker = None
+
+        # Extra batches can run concurrently when the model sits behind a worker pool
+        self._in_flight = threading.BoundedSemaphore(self.max_in_flight)
+        self._executor = None
+        if self.max_in_flight > 1:
+            self._executor = ThreadPoolExecutor(max_workers=self.max_in_flight, thread_name_prefix='micro-batch')
+
+        # Counters exposed through stats()
+        self._batches = 0
+        self._requests = 0
+        self._errors = 0
+        self._max_queue_depth = 0
+        self._batch_sizes = {}
+        self._latencies = deque(maxlen=LATENCY_WINDOW)
+
+    # Start the background worker on first use
+    def _ensure_worker(self):
+        if self._worker is not None and self._worker.is_alive():
+            return
+        with self._lock:
+            if self._worker is None or not self._worker.is_alive():
+                self._worker = threading.Thread(target=self._run, name='micro-batcher', daemon=True)
+                self._worker.start()
+
+    # Queue a single (H, W, C) image and return a Future for its prediction row
+    def submit(self, img_array):
+        self._ensure_worker()
+        future = Future()
+        self._queue.put((img_array, future, time.perf_counter()))
+        depth = self._queue.qsize()
+        if depth > self._max_queue_depth:
+            self._max_queue_depth = depth
+        return future
+
+    # Convenience wrapper: submit and wait for the prediction row
+    def predict(self, img_array, timeout=None):
+        return wait_for_result(self.submit(img_array), timeout)
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.perf_counter() + self.max_wait
+
+            # Keep collecting until the batch is full or the wait window closes
+            while len(batch) < self.max_batch_size:
+                remaining = deadline - time.perf_counter()
+                try:
+                    if remaining > 0:
+                        batch.append(self._queue.get(timeout=remaining))
+                    else:
+                        batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            # Wait for a free in-flight slot; requests keep queueing meanwhile
+            self._in_flight.acquire()
+            if self._executor is not None:
+                self._executor.submit(self._process, batch)
+            else:
+                self._process(batch)
+
+    def _process(self, batch):
+        try:
+            self._run_batch(batch)
+        finally:
+            self._in_flight.release()
+
+    def _run_batch(self, batch):
+        try:
+            inputs = np.stack([item[0] for item in batch])
+            result = self.predict_fn(inputs)
+            tag = None
+            if self.tagged:
+                result, tag = result
+            preds = np.asarray(result)
+        except Exception as e:
+            with self._lock:
+                self._errors += 1
+            for _, future, _ in batch:
+                future.set_exception(e)
+            return
+
+        # Fan the rows back out to the waiting requests
+        finished = time.perf_counter()
+        for (_, future, queued_at), row in zip(batch, preds):
+            future.set_result((row, tag) if self.tagged else row)
+            self._latencies.append(finished - queued_at)
+
+        with self._lock:
+            self._batches += 1
+            self._requests += len(batch)
+            self._batch_sizes[len(batch)] = self._batch_sizes.get(len(batch), 0) + 1
+
+    # Snapshot of queue depth, batch sizes and queue-to-result latency
+    def stats(self):
+        with self._lock:
+            batches = self._batches
+            requests = self._requests
+            batch_sizes = dict(sorted(self._batch_sizes.items()))
+            errors = self._errors
+        latencies = np.array(self._latencies) * 1000.0
+
+        stats = {
+            'max_batch_size': self.max_batch_size,
+            'max_wait_ms': self.max_wait * 1000.0,
+            'max_in_flight': self.max_in_flight,
+            'queue_depth': self._queue.qsize(),
+            'max_queue_depth': self._max_queue_depth,
+            'batches': batches,
+            'requests': requests,
+            'errors': errors,
+            'avg_batch_size': (requests / batches) if batches else 0.0,
+            'batch_size_histogram': batch_sizes,
+        }
+        if latencies.size:
+            stats['latency_ms'] = {
+                'p50': float(np.percentile(latencies, 50)),
+                'p95': float(np.percentile(latencies, 95)),
+                'p99': float(np.percentile(latencies, 99)),
+                'max': float(latencies.max()),
+            }
+        return stats
@@ -0,0 +1,58 @@
+import os
+import threading
+import time
+import numpy as np
+
+# Cascade settings: leave CASCADE_FAST_BACKEND empty to send every image to the full model
+CASCADE_FAST_BACKEND = os.getenv('CASCADE_FAST_BACKEND', '')
+CASCADE_THRESHOLD = float(os.getenv('CASCADE_THRESHOLD', '0.9'))
+
+
+class CascadeModel:
+    """Answers with a cheap model first and escalates low-confidence images to the full model."""
+
+    def __init__(self, fast, heavy, threshold=CASCADE_THRESHOLD):
+        self.fast = fast
+        self.heavy = heavy
+        self.threshold = threshold
+        self._lock = threading.Lock()
+
+        self.images = 0
+        self.escalated = 0
+        self.fast_seconds = 0.0
+        self.heavy_seconds = 0.0
+
+    def predict(self, batch):
+        batch = np.asarray(batch)
+        started = time.perf_counter()
+        preds = np.array(self.fast.predict(batch), dtype=np.float32)
+        fast_done = time.perf_counter()
+
+        # Only the uncertain images pay for the full model
+        escalate = preds.max(axis=1) < self.threshold
+        if escalate.any():
+            preds[escalate] = self.heavy.predict(batch[escalate])
+        heavy_done = time.perf_counter()
+
+        with self._lock:
+            self.images += len(batch)
+            self.escalated += int(escalate.sum())
+            self.fast_seconds += fast_done - started
+            self.heavy_seconds += heavy_done - fast_done
+        return preds
+
+    # Escalation rate and time spent in each stage
+    def stats(self):
+        with self._lock:
+            images = self.images
+            escalated = self.escalated
+            fast_seconds = self.fast_seconds
+            heavy_seconds = self.heavy_seconds
+        return {
+            'threshold': self.threshold,
+            'images': images,
+            'escalated': escalated,
+            'escalation_rate': (escalated / images) if images else 0.0,
+            'fast_ms_per_image': (fast_seconds / images * 1000.0) if images else 0.0,
+            'heavy_ms_per_escalation': (heavy_seconds / escalated * 1000.0) if escalated else 0.0,
+        }
@@ -23,10 +23,13 @@ db = client['betel_leaf_db']
 users_collection = db['users']
 testimonials_collection = db['testimonials']
 posts_collection = db['posts']
+comments_collection = db['comments']
 solutions_collection = db['solutions']
 messages_collection = db['messages']
 cultivation_guides_collection = db['cultivation_guides']
 notifications_collection = db['notifications']
+predictions_collection = db['predictions']
+prediction_rollups_collection = db['prediction_rollups']
 
 # Test the connection
 try:
@@ -0,0 +1,138 @@
+import math
+import os
+import queue
+import threading
+import time
+import uuid
+
+# Job queue limits (override with environment variables)
+DETECTION_QUEUE_SIZE = int(os.getenv('DETECTION_QUEUE_SIZE', '64'))
+DETECTION_JOB_WORKERS = int(os.getenv('DETECTION_JOB_WORKERS', '4'))
+DETECTION_JOB_TTL = float(os.getenv('DETECTION_JOB_TTL', '600'))
+
+
+class DetectionJobQueue:
+    """Bounded in-process queue of detection jobs whose results are pushed over Socket.IO."""
+
+    def __init__(self, socketio, run_job, max_pending=DETECTION_QUEUE_SIZE,
+                 workers=DETECTION_JOB_WORKERS, result_ttl=DETECTION_JOB_TTL):
+        self.socketio = socketio
+        self.run_job = run_job
+        self.max_pending = max(1, int(max_pending))
+        self.workers = max(1, int(workers))
+        self.result_ttl = result_ttl
+
+        # The Socket.IO server hands out a queue that matches its async mode, so workers
+        # started with start_background_task wait as green threads under eventlet
+        self._queue = socketio.server.eio.create_queue(maxsize=self.max_pending)
+        self._jobs = {}
+        self._lock = threading.Lock()
+        self._started = False
+
+        # Counters exposed through stats()
+        self._completed = 0
+        self._failed = 0
+        self._rejected = 0
+        self._avg_seconds = None
+
+    # Start the workers on first use
+    def _ensure_workers(self):
+        if self._started:
+            return
+        with self._lock:
+            if not self._started:
+                for _ in range(self.workers):
+                    self.socketio.start_background_task(self._run)
+                self._started = True
+
+    # Queue encoded image bytes for a user; returns the job id or raises queue.Full
+    def submit(self, user_id, data):
+        self._ensure_workers()
+        self._expire()
+
+        job_id = uuid.uuid4().hex
+        job = {'job_id': job_id, 'user_id': user_id, 'status': 'queued', 'created_at': time.time()}
+        with self._lock:
+            self._jobs[job_id] = job
+        try:
+            self._queue.put_nowait((job_id, data))
+        except queue.Full:
+            with self._lock:
+                self._jobs.pop(job_id, None)
+                self._rejected += 1
+            raise
+        return job_id
+
+    # Public view of a job, or None if it is unknown, expired or belongs to another user
+    def get(self, job_id, user_id):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None or job['user_id'] != user_id:
+                return None
+            return self._public(job)
+
+    # Seconds a client should wait before retrying when the queue is full
+    def retry_after(self):
+        avg_seconds = self._avg_seconds or 1.0
+        return max(1, math.ceil(self._queue.qsize() * avg_seconds / self.workers))
+
+    def stats(self):
+        with self._lock:
+            return {
+                'queue_depth': self._queue.qsize(),
+                'max_pending': self.max_pending,
+                'workers': self.workers,
+                'tracked_jobs': len(self._jobs),
+                'completed': self._completed,
+                'failed': self._failed,
+                'rejected': self._rejected,
+                'avg_job_ms': (self._avg_seconds * 1000.0) if self._avg_seconds is not None else None,
+            }
+
+    @staticmethod
+    def _public(job):
+        return {key: value for key, value in job.items() if key not in ('user_id', 'created_at', 'finished_at')}
+
+    # Drop jobs that finished more than result_ttl ago (time spent queued does not count)
+    def _expire(self):
+        cutoff = time.time() - self.result_ttl
+        with self._lock:
+            expired = [
+                job_id for job_id, job in self._jobs.items()
+                if job['status'] in ('done', 'failed') and job['finished_at'] < cutoff
+            ]
+            for job_id in expired:
+                del self._jobs[job_id]
+
+    # Worker loop: run one job at a time and push the result to the user's room
+    def _run(self):
+        while True:
+            job_id, data = self._queue.get()
+            with self._lock:
+                job = self._jobs.get(job_id)
+                if job is None:
+                    continue
+                job['status'] = 'running'
+
+            started = time.perf_counter()
+            try:
+                result = self.run_job(job['user_id'], data)
+            except Exception as e:
+                print(f"Detection job {job_id} failed: {e}")
+                result = {'error': 'Detection failed. Please try again.'}
+            elapsed = time.perf_counter() - started
+
+            with self._lock:
+                job.update(result)
+                job['status'] = 'failed' if 'error' in result else 'done'
+                job['finished_at'] = time.time()
+                if job['status'] == 'done':
+                    self._completed += 1
+                else:
+                    self._failed += 1
+                # Exponential moving average keeps Retry-After in line with current load
+                self._avg_seconds = elapsed if self._avg_seconds is None else 0.8 * self._avg_seconds + 0.2 * elapsed
+                payload = self._public(job)
+                user_id = job['user_id']
+
+            self.socketio.emit('detection_result', payload, room=user_id)
@@ -0,0 +1,323 @@
+import json
+import os
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+import numpy as np
+from utils.batching import wait_for_result
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+# Similar-case index settings (override with environment variables)
+EMBEDDING_DIR = os.getenv('EMBEDDING_DIR', 'embeddings')
+EMBEDDING_MIN_CONFIDENCE = float(os.getenv('EMBEDDING_MIN_CONFIDENCE', '0.9'))
+EMBEDDING_TOP_K = int(os.getenv('EMBEDDING_TOP_K', '5'))
+EMBEDDING_IVF_NPROBE = int(os.getenv('EMBEDDING_IVF_NPROBE', '8'))
+EMBEDDING_SEARCH_WORKERS = int(os.getenv('EMBEDDING_SEARCH_WORKERS', '2'))
+
+# The IVF is built automatically once an index reaches this many cases, and rebuilt after it grows by half
+EMBEDDING_IVF_MIN_ROWS = int(os.getenv('EMBEDDING_IVF_MIN_ROWS', '50000'))
+IVF_REBUILD_GROWTH = 0.5
+
+# Rows converted to float32 at a time during brute-force search (bounds the temporary memory)
+SEARCH_CHUNK_ROWS = 65536
+
+# Per-case metadata stored next to each embedding row
+META_DTYPE = np.dtype([('case_id', 'S24'), ('label', 'i1'), ('confidence', 'f2'), ('created_at', 'i8')])
+
+
+# Scale rows to unit length so a dot product is the cosine similarity
+def _normalize(vectors):
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-12)
+
+
+class EmbeddingIndex:
+    """Append-only float16 matrix of normalized embeddings, memory-mapped for top-k cosine search."""
+
+    def __init__(self, directory):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        self._vectors_path = os.path.join(directory, 'vectors.f16')
+        self._meta_path = os.path.join(directory, 'meta.bin')
+        self._info_path = os.path.join(directory, 'index.json')
+        self._ivf_path = os.path.join(directory, 'ivf.npz')
+        self._lockfile_path = os.path.join(directory, 'index.lock')
+        self._ivf_lockfile_path = os.path.join(directory, 'ivf.lock')
+        self._lock = threading.Lock()
+
+        self.dim = None
+        self._read_info()
+
+        self._vectors = None
+        self._meta = None
+        self._mapped_count = 0
+        self._ivf_mtime = None
+        self._ivf = self._load_ivf()
+
+    def _read_info(self):
+        if self.dim is None and os.path.exists(self._info_path):
+            with open(self._info_path) as f:
+                self.dim = json.load(f)['dim']
+
+    # Lock shared by every process using this directory (several web workers append to the same files);
+    # without fcntl (Windows) only threads of this process are serialized
+    @contextmanager
+    def _file_lock(self, exclusive):
+        with self._lock:
+            if fcntl is None:
+                yield
+                return
+            with open(self._lockfile_path, 'a') as lockfile:
+                fcntl.flock(lockfile, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(lockfile, fcntl.LOCK_UN)
+
+    # Rows in the vector and metadata files; call with the file lock held
+    def _row_counts(self):
+        if self.dim is None or not os.path.exists(self._vectors_path) or not os.path.exists(self._meta_path):
+            return 0, 0
+        vectors = os.path.getsize(self._vectors_path) // (self.dim * 2)
+        metas = os.path.getsize(self._meta_path) // META_DTYPE.itemsize
+        return vectors, metas
+
+    # Number of complete cases on disk
+    def __len__(self):
+        with self._file_lock(exclusive=False):
+            self._read_info()
+            vectors, metas = self._row_counts()
+        if vectors != metas:
+            # Only a writer that died between the two appends can leave this; the next add repairs it
+            print(f"Embedding index {self.directory} has {vectors} vectors but {metas} metadata rows; using {min(vectors, metas)}")
+        return min(vectors, metas)
+
+    def _load_ivf(self):
+        if not os.path.exists(self._ivf_path):
+            return None
+        self._ivf_mtime = os.path.getmtime(self._ivf_path)
+        with np.load(self._ivf_path) as data:
+            return {key: data[key] for key in data.files}
+
+    # Pick up an IVF rebuilt by another process
+    def _current_ivf(self):
+        try:
+            mtime = os.path.getmtime(self._ivf_path)
+        except OSError:
+            return self._ivf
+        if mtime != self._ivf_mtime:
+            self._ivf = self._load_ivf()
+        return self._ivf
+
+    # Append cases to the end of the matrix: embeddings is (n, dim), the rest are length-n sequences
+    def add_many(self, embeddings, case_ids, labels, confidences, created_at=None):
+        vectors = _normalize(embeddings).astype(np.float16)
+        meta = np.zeros(len(vectors), dtype=META_DTYPE)
+        meta['case_id'] = [str(case_id).encode('ascii') for case_id in case_ids]
+        meta['label'] = labels
+        meta['confidence'] = confidences
+        meta['created_at'] = created_at if created_at is not None else int(time.time())
+
+        # Both appends happen under one lock so rows from different processes cannot interleave
+        with self._file_lock(exclusive=True):
+            self._read_info()
+            if self.dim is None:
+                self.dim = int(vectors.shape[1])
+                with open(self._info_path, 'w') as f:
+                    json.dump({'dim': self.dim}, f)
+            elif vectors.shape[1] != self.dim:
+                raise ValueError(f"Embedding has {vectors.shape[1]} dimensions, index expects {self.dim}")
+
+            # Cut back a torn append (a writer that died mid-write) so row i of both files stays the same case
+            count = min(self._row_counts())
+            for path, row_bytes in ((self._vectors_path, self.dim * 2), (self._meta_path, META_DTYPE.itemsize)):
+                if os.path.exists(path) and os.path.getsize(path) != count * row_bytes:
+                    os.truncate(path, count * row_bytes)
+
+            with open(self._vectors_path, 'ab') as f:
+                f.write(vectors.tobytes())
+            with open(self._meta_path, 'ab') as f:
+                f.write(meta.tobytes())
+
+    def add(self, embedding, case_id, label, confidence):
+        self.add_many(np.asarray(embedding)[None, :], [case_id], [label], [confidence])
+
+    # Memory-map the files again when other appends have grown them
+    def _mapped(self):
+        count = len(self)
+        with self._lock:
+            if count and count != self._mapped_count:
+                self._vectors = np.memmap(self._vectors_path, dtype=np.float16, mode='r', shape=(count, self.dim))
+                self._meta = np.memmap(self._meta_path, dtype=META_DTYPE, mode='r', shape=(count,))
+                self._mapped_count = count
+            return self._vectors, self._meta, self._mapped_count
+
+    # Rows to score: the probed IVF lists plus everything appended after the IVF was built
+    def _candidates(self, query, count, nprobe):
+        ivf = self._current_ivf()
+        if ivf is None or not nprobe:
+            return None
+        probe = np.argsort(ivf['centroids'] @ query)[::-1][:nprobe]
+        offsets = ivf['offsets']
+        rows = [ivf['order'][offsets[i]:offsets[i + 1]] for i in probe]
+        rows.append(np.arange(int(ivf['count']), count))
+        return np.sort(np.concatenate(rows))
+
+    # Top-k most similar cases as a list of dicts, best first
+    def search(self, embedding, k=EMBEDDING_TOP_K, nprobe=EMBEDDING_IVF_NPROBE):
+        vectors, meta, count = self._mapped()
+        if not count:
+            return []
+        query = _normalize(embedding)
+
+        candidates = self._candidates(query, count, nprobe)
+        if candidates is not None:
+            scores = vectors[candidates].astype(np.float32) @ query
+        else:
+            # Vectorized brute force over the whole matrix, a chunk at a time
+            scores = np.empty(count, dtype=np.float32)
+            for start in range(0, count, SEARCH_CHUNK_ROWS):
+                stop = min(start + SEARCH_CHUNK_ROWS, count)
+                scores[start:stop] = vectors[start:stop].astype(np.float32) @ query
+
+        k = min(k, len(scores))
+        if k <= 0:
+            return []
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        rows = candidates[top] if candidates is not None else top
+
+        return [
+            {
+                'case_id': meta['case_id'][row].decode('ascii'),
+                'label': int(meta['label'][row]),
+                'confidence': float(meta['confidence'][row]),
+                'created_at': int(meta['created_at'][row]),
+                'similarity': float(score),
+            }
+            for row, score in zip(rows, scores[top])
+        ]
+
+    # Partition the rows with k-means so searches only score the nearest lists (IVF)
+    def build_ivf(self, nlist=None, iterations=10, sample_size=100000, seed=0):
+        vectors, _, count = self._mapped()
+        if not count:
+            raise ValueError('The index is empty')
+        nlist = nlist or max(1, int(np.sqrt(count)))
+        rng = np.random.default_rng(seed)
+
+        sample_rows = np.sort(rng.choice(count, size=min(sample_size, count), replace=False))
+        sample = vectors[sample_rows].astype(np.float32)
+        centroids = sample[rng.choice(len(sample), size=min(nlist, len(sample)), replace=False)]
+        for _ in range(iterations):
+            assignment = np.argmax(sample @ centroids.T, axis=1)
+            for i in range(len(centroids)):
+                members = sample[assignment == i]
+                if len(members):
+                    centroids[i] = members.mean(axis=0)
+            centroids = _normalize(centroids)
+
+        # Assign every row to its nearest centroid, a chunk at a time
+        assignment = np.empty(count, dtype=np.int32)
+        for start in range(0, count, SEARCH_CHUNK_ROWS):
+            stop = min(start + SEARCH_CHUNK_ROWS, count)
+            assignment[start:stop] = np.argmax(vectors[start:stop].astype(np.float32) @ centroids.T, axis=1)
+
+        order = np.argsort(assignment, kind='stable').astype(np.int64)
+        offsets = np.concatenate([[0], np.cumsum(np.bincount(assignment, minlength=len(centroids)))])
+        # Write to a temporary file and rename it so searches in other processes never read a partial file
+        temp_path = self._ivf_path + f".{os.getpid()}.tmp.npz"
+        np.savez(temp_path, centroids=centroids, order=order, offsets=offsets, count=np.int64(count))
+        os.replace(temp_path, self._ivf_path)
+        self._ivf = self._load_ivf()
+        return len(centroids)
+
+    # Whether the index is large enough for an IVF and has none yet, or has grown well past it
+    def needs_ivf(self, min_rows=EMBEDDING_IVF_MIN_ROWS):
+        count = len(self)
+        if count < min_rows:
+            return False
+        ivf = self._current_ivf()
+        return ivf is None or count - int(ivf['count']) >= int(ivf['count']) * IVF_REBUILD_GROWTH
+
+    # Build the IVF unless another process is already building it; returns the number of lists, or None
+    def refresh_ivf(self):
+        if fcntl is None:
+            return self.build_ivf()
+        with open(self._ivf_lockfile_path, 'a') as lockfile:
+            try:
+                fcntl.flock(lockfile, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                return None
+            try:
+                # Another process may have finished a build while this one waited
+                return self.build_ivf() if self.needs_ivf() else None
+            finally:
+                fcntl.flock(lockfile, fcntl.LOCK_UN)
+
+
+_indexes = {}
+_indexes_lock = threading.Lock()
+
+
+# Index for one model version (embeddings from different versions are not comparable)
+def get_index(model_version, root=EMBEDDING_DIR):
+    name = re.sub(r'[^A-Za-z0-9_.@-]', '_', model_version or 'unversioned')
+    with _indexes_lock:
+        index = _indexes.get((root, name))
+        if index is None:
+            index = _indexes[(root, name)] = EmbeddingIndex(os.path.join(root, name))
+        return index
+
+
+# Searches and appends run on their own threads (NumPy releases the GIL), never on the eventlet hub;
+# IVF builds get a separate single thread so a long build does not hold up searches
+_search_pool = ThreadPoolExecutor(max_workers=EMBEDDING_SEARCH_WORKERS, thread_name_prefix='embedding-search')
+_ivf_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix='embedding-ivf')
+_ivf_pending = set()
+_ivf_pending_lock = threading.Lock()
+
+
+# Top-k similar cases for a model version, searched off the calling green thread
+def search_similar(model_version, embedding, k=EMBEDDING_TOP_K):
+    return wait_for_result(_search_pool.submit(get_index(model_version).search, embedding, k))
+
+
+def _refresh_ivf(index):
+    try:
+        nlist = index.refresh_ivf()
+        if nlist:
+            print(f"Built {nlist} IVF lists for {index.directory}")
+    except Exception as e:
+        print(f"IVF build failed for {index.directory}: {e}")
+    finally:
+        with _ivf_pending_lock:
+            _ivf_pending.discard(index.directory)
+
+
+def _add_case(model_version, embedding, case_id, label, confidence):
+    index = get_index(model_version)
+    try:
+        index.add(embedding, case_id, label, confidence)
+        if not index.needs_ivf():
+            return
+    except Exception as e:
+        print(f"Could not add case {case_id} to {index.directory}: {e}")
+        return
+    with _ivf_pending_lock:
+        if index.directory in _ivf_pending:
+            return
+        _ivf_pending.add(index.directory)
+    _ivf_pool.submit(_refresh_ivf, index)
+
+
+# Add a reference case in the background (the caller does not wait); builds or refreshes the IVF when due
+def add_case_async(model_version, embedding, case_id, label, confidence):
+    return _search_pool.submit(_add_case, model_version, embedding, case_id, label, confidence)
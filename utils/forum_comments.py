@@ -0,0 +1,63 @@
+import re
+from datetime import datetime
+from bson.objectid import ObjectId
+from pymongo import ASCENDING
+
+# Comments are stored one document per comment or reply, with a materialized path:
+#   {'_id', 'post_id', 'parent_id', 'path', 'depth', 'user_id', 'text', 'date', 'likes', 'liked_by'}
+# path is the ancestors' ids followed by the comment's own id, each ending in ',' (e.g. "a1,b2,c3,"),
+# so sorting a post's comments by path gives the thread in display order and a subtree is a path prefix.
+
+
+def ensure_comment_indexes(collection):
+    collection.create_index([('post_id', ASCENDING), ('path', ASCENDING)])
+
+
+# Build a comment document; parent is the parent comment document (None for a top-level comment)
+def new_comment(post_id, user_id, text, parent=None, comment_id=None, date=None, likes=0, liked_by=None):
+    comment_id = comment_id or ObjectId()
+    return {
+        '_id': comment_id,
+        'post_id': ObjectId(post_id),
+        'parent_id': parent['_id'] if parent else None,
+        'path': (parent['path'] if parent else '') + f"{comment_id},",
+        'depth': parent['depth'] + 1 if parent else 0,
+        'user_id': user_id,
+        'text': text,
+        'date': date or datetime.utcnow(),
+        'likes': likes,
+        'liked_by': liked_by if liked_by is not None else [],
+    }
+
+
+# Query for a comment and every reply beneath it (a prefix match on the (post_id, path) index)
+def subtree_query(comment):
+    return {'post_id': comment['post_id'], 'path': {'$regex': '^' + re.escape(comment['path'])}}
+
+
+# Nest path-ordered comment documents into trees: each gets a 'replies' list of its children
+def build_tree(comments):
+    roots, by_id = [], {}
+    for comment in comments:
+        comment['replies'] = []
+        by_id[comment['_id']] = comment
+        parent = by_id.get(comment.get('parent_id'))
+        (parent['replies'] if parent else roots).append(comment)
+    return roots
+
+
+# Flatten an embedded comment tree (the old posts.comments layout) into comment documents, parents first
+def flatten_embedded(post_id, comments, parent=None):
+    for comment in comments:
+        doc = new_comment(
+            post_id,
+            comment['user_id'],
+            comment.get('text', ''),
+            parent=parent,
+            comment_id=comment['_id'],
+            date=comment.get('date'),
+            likes=comment.get('likes', 0),
+            liked_by=comment.get('liked_by', []),
+        )
+        yield doc
+        yield from flatten_embedded(post_id, comment.get('replies', []), doc)
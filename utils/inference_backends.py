@@ -0,0 +1,128 @@
+import os
+import threading
+import numpy as np
+
+# Model artifacts for each backend (the TFLite files are produced by scripts/convert_model.py)
+BACKEND_PATHS = {
+    'keras': os.path.join('model', 'betel_leaf_model.keras'),
+    'tflite-fp16': os.path.join('model', 'betel_leaf_model_fp16.tflite'),
+    'tflite-int8': os.path.join('model', 'betel_leaf_model_int8.tflite'),
+    'numpy': os.path.join('model', 'betel_leaf_model.npz'),
+}
+
+# Selected backend and TFLite thread count (override with environment variables)
+INFERENCE_BACKEND = os.getenv('INFERENCE_BACKEND', 'keras')
+TFLITE_NUM_THREADS = int(os.getenv('TFLITE_NUM_THREADS', str(os.cpu_count() or 1)))
+
+
+class KerasBackend:
+    """Full-precision Keras model."""
+
+    def __init__(self, path, num_threads=None):
+        # Imported here so the web app can boot without waiting for TensorFlow
+        import tensorflow as tf
+        from tensorflow.keras.models import load_model # type: ignore
+
+        # Limit TensorFlow's thread pools (used by pinned worker processes)
+        if num_threads:
+            tf.config.threading.set_intra_op_parallelism_threads(num_threads)
+            tf.config.threading.set_inter_op_parallelism_threads(1)
+
+        self.path = path
+        self.model = load_model(path)
+        # Second model sharing the same layers that also returns the penultimate-layer activations;
+        # built here so the first request does not pay for it (it is traced by the warm-up)
+        penultimate = self.model.layers[-2].output
+        self._embedding_model = tf.keras.Model(self.model.inputs, [self.model.output, penultimate])
+
+    def predict(self, batch):
+        return self.model.predict(batch, verbose=0)
+
+    # Class probabilities plus the penultimate-layer activations (used for similar-case search)
+    def predict_with_embeddings(self, batch):
+        probs, embeddings = self._embedding_model.predict(batch, verbose=0)
+        return probs, embeddings.reshape(len(embeddings), -1)
+
+
+class TFLiteBackend:
+    """Converted TFLite model (float16 or int8 quantized)."""
+
+    def __init__(self, path, num_threads=None):
+        # Prefer the small tflite-runtime package, fall back to the interpreter bundled with TensorFlow
+        try:
+            from tflite_runtime.interpreter import Interpreter # type: ignore
+        except ImportError:
+            from tensorflow.lite import Interpreter # type: ignore
+
+        self.path = path
+        self.interpreter = Interpreter(model_path=path, num_threads=num_threads or TFLITE_NUM_THREADS)
+        self.interpreter.allocate_tensors()
+        self._input = self.interpreter.get_input_details()[0]
+        self._output = self.interpreter.get_output_details()[0]
+        self._batch_size = int(self._input['shape'][0])
+        # The interpreter holds mutable tensor buffers, so only one call may run at a time
+        self._lock = threading.Lock()
+
+    # Convert float inputs to the model's input type (int8 models need quantized inputs)
+    def _quantize(self, batch):
+        dtype = self._input['dtype']
+        if dtype == np.float32:
+            return batch.astype(np.float32, copy=False)
+        scale, zero_point = self._input['quantization']
+        info = np.iinfo(dtype)
+        return np.clip(np.round(batch / scale + zero_point), info.min, info.max).astype(dtype)
+
+    # Convert raw outputs back to float probabilities
+    def _dequantize(self, output):
+        if self._output['dtype'] == np.float32:
+            return output
+        scale, zero_point = self._output['quantization']
+        return (output.astype(np.float32) - zero_point) * scale
+
+    def predict(self, batch):
+        batch = np.asarray(batch)
+        with self._lock:
+            # Resize the input tensor when the batch size changes
+            if batch.shape[0] != self._batch_size:
+                self.interpreter.resize_tensor_input(self._input['index'], batch.shape)
+                self.interpreter.allocate_tensors()
+                self._batch_size = batch.shape[0]
+            self.interpreter.set_tensor(self._input['index'], self._quantize(batch))
+            self.interpreter.invoke()
+            output = self.interpreter.get_tensor(self._output['index']).copy()
+        return self._dequantize(output)
+
+
+class NumpyBackend:
+    """Keras weights exported to .npz (scripts/export_numpy_model.py), run without TensorFlow."""
+
+    def __init__(self, path, num_threads=None):
+        # BLAS threads are set with OMP_NUM_THREADS / OPENBLAS_NUM_THREADS before NumPy is imported
+        from utils.numpy_runtime import NumpyModel
+
+        self.path = path
+        self.model = NumpyModel(path)
+
+    def predict(self, batch):
+        return self.model.predict(batch)
+
+    def predict_with_embeddings(self, batch):
+        return self.model.predict_with_embeddings(batch)
+
+
+# Path of the artifact used by a backend
+def backend_path(name=INFERENCE_BACKEND):
+    if name not in BACKEND_PATHS:
+        raise ValueError(f"Unknown inference backend '{name}' (choose from {', '.join(BACKEND_PATHS)})")
+    return BACKEND_PATHS[name]
+
+
+# Create the configured inference backend
+def load_backend(name=INFERENCE_BACKEND, path=None, num_threads=None):
+    default_path = backend_path(name)
+    path = path or default_path
+    if name == 'keras':
+        return KerasBackend(path, num_threads)
+    if name == 'numpy':
+        return NumpyBackend(path, num_threads)
+    return TFLiteBackend(path, num_threads)
@@ -0,0 +1,303 @@
+import atexit
+import itertools
+import multiprocessing
+import os
+import queue
+import threading
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+from multiprocessing import resource_tracker, shared_memory
+from multiprocessing.connection import wait
+import numpy as np
+from utils.batching import wait_for_result
+from utils.inference_backends import load_backend
+from utils.preprocessing import IMAGE_SIZE
+
+# Worker pool settings (INFERENCE_WORKERS=0 keeps inference in the web process)
+INFERENCE_WORKERS = int(os.getenv('INFERENCE_WORKERS', '0'))
+INFERENCE_THREADS_PER_WORKER = int(os.getenv('INFERENCE_THREADS_PER_WORKER', '1'))
+INFERENCE_SLOT_BATCH = int(os.getenv('INFERENCE_SLOT_BATCH', '32'))
+INFERENCE_TIMEOUT = float(os.getenv('INFERENCE_TIMEOUT', '60'))
+
+# How often the pool checks for (and replaces) worker processes that have died
+WORKER_CHECK_SECONDS = 1.0
+
+INPUT_SHAPE = (IMAGE_SIZE[0], IMAGE_SIZE[1], 3)
+
+
+# Byte sizes of one slot's input and output regions
+def _slot_sizes(slot_batch, num_classes):
+    input_bytes = slot_batch * int(np.prod(INPUT_SHAPE)) * 4
+    output_bytes = slot_batch * num_classes * 4
+    return input_bytes, output_bytes
+
+
+# NumPy views on one slot of the shared memory block (no copies)
+def _slot_views(buf, slot, slot_batch, num_classes):
+    input_bytes, output_bytes = _slot_sizes(slot_batch, num_classes)
+    offset = slot * (input_bytes + output_bytes)
+    inputs = np.ndarray((slot_batch,) + INPUT_SHAPE, dtype=np.float32, buffer=buf, offset=offset)
+    outputs = np.ndarray((slot_batch, num_classes), dtype=np.float32, buffer=buf, offset=offset + input_bytes)
+    return inputs, outputs
+
+
+# Entry point of each worker process; tasks and results are this worker's own pipe ends
+def _worker_main(worker_id, backend_name, path, shm_name, slot_batch, num_classes, num_threads, tasks, results):
+    # Pin the worker to one core so workers don't fight over the same caches
+    if hasattr(os, 'sched_setaffinity'):
+        cores = sorted(os.sched_getaffinity(0))
+        os.sched_setaffinity(0, {cores[worker_id % len(cores)]})
+
+    shm = shared_memory.SharedMemory(name=shm_name)
+    # The parent owns the block; stop this process's tracker from unlinking it on exit
+    resource_tracker.unregister(shm._name, 'shared_memory')
+
+    try:
+        backend = load_backend(backend_name, path, num_threads=num_threads)
+        backend.predict(np.zeros((1,) + INPUT_SHAPE, dtype=np.float32))
+    except Exception as e:
+        results.send(('ready', worker_id, str(e)))
+        shm.close()
+        return
+    results.send(('ready', worker_id, None))
+
+    while True:
+        try:
+            task = tasks.recv()
+        except EOFError:
+            break
+        if task is None:
+            break
+        task_id, slot, size = task
+        inputs, outputs = _slot_views(shm.buf, slot, slot_batch, num_classes)
+        try:
+            outputs[:size] = backend.predict(inputs[:size])
+            results.send(('done', task_id, None))
+        except Exception as e:
+            results.send(('done', task_id, str(e)))
+        del inputs, outputs
+
+    shm.close()
+
+
+class InferencePool:
+    """Runs forward passes in separate worker processes, exchanging tensors through shared memory."""
+
+    def __init__(self, backend_name, num_classes, num_workers=INFERENCE_WORKERS,
+                 slot_batch=INFERENCE_SLOT_BATCH, num_threads=INFERENCE_THREADS_PER_WORKER, path=None):
+        self.backend_name = backend_name
+        self.path = path
+        self.num_classes = num_classes
+        self.num_workers = max(1, int(num_workers))
+        self.slot_batch = max(1, int(slot_batch))
+        self.num_threads = num_threads
+        # Two slots per worker: one being processed, one queued behind it
+        self.num_slots = self.num_workers * 2
+
+        self._shm = None
+        # Per worker: process, pipe ends, ids of the tasks sent to it, and whether it has loaded its model.
+        # Each worker has its own pipes (no shared queue locks), so a worker that dies cannot wedge the others.
+        self._processes = []
+        self._task_conns = []
+        self._result_conns = []
+        self._assigned = []
+        self._ready = []
+        # task id -> (Future, worker id, slot) for tasks a caller is waiting on
+        self._pending = {}
+        # task id -> (worker id, slot) for tasks whose caller timed out; the slot is reused once the task ends
+        self._abandoned = {}
+        self._closing = False
+        self._lock = threading.Lock()
+        self._ids = itertools.count()
+        self._free_slots = queue.Queue()
+        self._listener = None
+
+    # Start one worker process with fresh pipes
+    def _spawn(self, worker_id):
+        task_recv, task_send = self._ctx.Pipe(duplex=False)
+        result_recv, result_send = self._ctx.Pipe(duplex=False)
+        process = self._ctx.Process(
+            target=_worker_main,
+            args=(worker_id, self.backend_name, self.path, self._shm.name, self.slot_batch,
+                  self.num_classes, self.num_threads, task_recv, result_send),
+            name=f'inference-worker-{worker_id}',
+            daemon=True
+        )
+        process.start()
+        # The child has its own copies of these ends; closing ours lets recv() see EOF when it dies
+        task_recv.close()
+        result_send.close()
+        return process, task_send, result_recv
+
+    # Spawn the workers and wait until every one has loaded and warmed up its model
+    def start(self):
+        # 'spawn' because TensorFlow is not fork-safe
+        self._ctx = multiprocessing.get_context('spawn')
+        input_bytes, output_bytes = _slot_sizes(self.slot_batch, self.num_classes)
+        self._shm = shared_memory.SharedMemory(create=True, size=self.num_slots * (input_bytes + output_bytes))
+        for slot in range(self.num_slots):
+            self._free_slots.put(slot)
+
+        for worker_id in range(self.num_workers):
+            process, task_conn, result_conn = self._spawn(worker_id)
+            self._processes.append(process)
+            self._task_conns.append(task_conn)
+            self._result_conns.append(result_conn)
+            self._assigned.append(set())
+            self._ready.append(False)
+        atexit.register(self.shutdown)
+
+        errors = []
+        for worker_id, conn in enumerate(self._result_conns):
+            try:
+                _, _, error = conn.recv()
+            except EOFError:
+                error = f"exited with code {self._processes[worker_id].exitcode}"
+            if error:
+                errors.append(f"worker {worker_id}: {error}")
+            self._ready[worker_id] = not error
+        if errors:
+            self.shutdown()
+            raise RuntimeError('Inference workers failed to start: ' + '; '.join(errors))
+
+        self._listener = threading.Thread(target=self._listen, name='inference-results', daemon=True)
+        self._listener.start()
+        return self
+
+    # Resolve futures as workers report finished tasks, and replace workers that die
+    def _listen(self):
+        while not self._closing:
+            with self._lock:
+                conns = {conn: worker_id for worker_id, conn in enumerate(self._result_conns)}
+            for conn in wait(list(conns), timeout=WORKER_CHECK_SECONDS):
+                worker_id = conns[conn]
+                try:
+                    kind, task_id, error = conn.recv()
+                except (EOFError, OSError):
+                    # The worker is gone; _replace_dead_workers below deals with it
+                    continue
+                if kind == 'ready':
+                    with self._lock:
+                        self._ready[worker_id] = not error
+                    if error:
+                        print(f"Inference worker {worker_id} failed to restart: {error}")
+                    continue
+                self._finish(task_id, error)
+            if not self._closing:
+                self._replace_dead_workers()
+
+    # Settle one task: wake its caller, or return the slot of a task whose caller already gave up
+    def _finish(self, task_id, error):
+        with self._lock:
+            pending = self._pending.pop(task_id, None)
+            abandoned = self._abandoned.pop(task_id, None)
+            worker_id = pending[1] if pending else abandoned[0] if abandoned else None
+            if worker_id is not None:
+                self._assigned[worker_id].discard(task_id)
+        if abandoned:
+            self._free_slots.put(abandoned[1])
+        if pending:
+            future = pending[0]
+            if error:
+                future.set_exception(RuntimeError(error))
+            else:
+                future.set_result(None)
+
+    # Fail the tasks of workers that have died (freeing their slots) and start replacements
+    def _replace_dead_workers(self):
+        for worker_id, process in enumerate(self._processes):
+            if process.is_alive() or self._closing:
+                continue
+            print(f"Inference worker {worker_id} exited with code {process.exitcode}; restarting it")
+            with self._lock:
+                lost = list(self._assigned[worker_id])
+                self._ready[worker_id] = False
+            # The caller of a pending task releases its slot when it sees the error
+            for task_id in lost:
+                self._finish(task_id, f"Inference worker {worker_id} exited while running the batch")
+
+            new_process, task_conn, result_conn = self._spawn(worker_id)
+            with self._lock:
+                self._task_conns[worker_id].close()
+                self._result_conns[worker_id].close()
+                self._processes[worker_id] = new_process
+                self._task_conns[worker_id] = task_conn
+                self._result_conns[worker_id] = result_conn
+
+    # Send a task to the least busy worker that has loaded its model; returns the task id and its Future
+    def _dispatch(self, slot, size):
+        future = Future()
+        with self._lock:
+            ready = [worker_id for worker_id in range(self.num_workers) if self._ready[worker_id]]
+            if not ready:
+                raise RuntimeError('No inference worker is running')
+            worker_id = min(ready, key=lambda i: len(self._assigned[i]))
+            task_id = next(self._ids)
+            self._pending[task_id] = (future, worker_id, slot)
+            self._assigned[worker_id].add(task_id)
+            try:
+                self._task_conns[worker_id].send((task_id, slot, size))
+            except OSError:
+                # The worker died just now; the caller retries on the next call once it is replaced
+                del self._pending[task_id]
+                self._assigned[worker_id].discard(task_id)
+                raise RuntimeError(f"Inference worker {worker_id} is not running") from None
+        return task_id, future
+
+    # Copy one chunk into a free slot, hand it to a worker and wait cooperatively for the result
+    def _run_chunk(self, chunk):
+        try:
+            slot = self._free_slots.get(timeout=INFERENCE_TIMEOUT)
+        except queue.Empty:
+            raise RuntimeError(f"No inference slot became free within {INFERENCE_TIMEOUT:g}s") from None
+        release_slot = True
+        try:
+            inputs, outputs = _slot_views(self._shm.buf, slot, self.slot_batch, self.num_classes)
+            size = len(chunk)
+            inputs[:size] = chunk
+
+            task_id, future = self._dispatch(slot, size)
+            try:
+                wait_for_result(future, INFERENCE_TIMEOUT)
+            except FutureTimeoutError:
+                with self._lock:
+                    pending = self._pending.pop(task_id, None)
+                    if pending:
+                        # A worker may still write into this slot, so keep it out of circulation
+                        # until the late result arrives or the worker is found dead
+                        self._abandoned[task_id] = (pending[1], slot)
+                        release_slot = False
+                if pending:
+                    raise
+                # The result arrived just as the wait timed out
+                wait_for_result(future)
+            return outputs[:size].copy()
+        finally:
+            if release_slot:
+                self._free_slots.put(slot)
+
+    # Run a batched forward pass, splitting batches larger than a slot
+    def predict(self, batch):
+        batch = np.asarray(batch, dtype=np.float32)
+        chunks = [batch[i:i + self.slot_batch] for i in range(0, len(batch), self.slot_batch)]
+        return np.concatenate([self._run_chunk(chunk) for chunk in chunks])
+
+    def shutdown(self):
+        if self._shm is None:
+            return
+        self._closing = True
+        for conn in self._task_conns:
+            try:
+                conn.send(None)
+            except OSError:
+                pass
+        for process in self._processes:
+            process.join(timeout=5)
+            if process.is_alive():
+                process.terminate()
+        if self._listener is not None:
+            self._listener.join(timeout=WORKER_CHECK_SECONDS * 2)
+        for conn in self._task_conns + self._result_conns:
+            conn.close()
+        self._shm.close()
+        self._shm.unlink()
+        self._shm = None
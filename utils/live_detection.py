@@ -0,0 +1,145 @@
+import os
+import queue
+import threading
+import numpy as np
+from utils.batching import wait_for_result
+
+# Live detection settings (override with environment variables)
+LIVE_MAX_BATCH = int(os.getenv('LIVE_MAX_BATCH', '8'))
+LIVE_MAX_FRAME_BYTES = int(os.getenv('LIVE_MAX_FRAME_BYTES', str(2 * 1024 * 1024)))
+LIVE_SMOOTHING = float(os.getenv('LIVE_SMOOTHING', '0.5'))
+
+# Socket.IO namespace for camera streams (kept apart from the chat and forum events on '/')
+LIVE_NAMESPACE = '/live-detection'
+
+
+class LiveDetector:
+    """Keeps the latest camera frame per client and classifies frames from all clients in shared batches."""
+
+    def __init__(self, socketio, submit_decode, predict_fn, class_labels, namespace=LIVE_NAMESPACE,
+                 max_batch=LIVE_MAX_BATCH, smoothing=LIVE_SMOOTHING):
+        self.socketio = socketio
+        self.submit_decode = submit_decode
+        self.predict_fn = predict_fn
+        self.class_labels = class_labels
+        self.namespace = namespace
+        self.max_batch = max(1, int(max_batch))
+        self.smoothing = min(max(float(smoothing), 0.0), 1.0)
+
+        # sid -> latest undelivered frame; a newer frame replaces an older one (stale frames are dropped)
+        self._latest = {}
+        # sid -> {'probs': smoothed probabilities, 'frames': n, 'dropped': n}
+        self._clients = {}
+        self._lock = threading.Lock()
+        # Clients with a frame waiting; each sid is queued at most once, so the queue never outgrows the clients
+        self._ready = socketio.server.eio.create_queue()
+        self._started = False
+
+        # Counters exposed through stats()
+        self._batches = 0
+        self._frames = 0
+        self._dropped = 0
+
+    # Start the batching loop on first use
+    def _ensure_worker(self):
+        if self._started:
+            return
+        with self._lock:
+            if not self._started:
+                self.socketio.start_background_task(self._run)
+                self._started = True
+
+    def add_client(self, sid):
+        with self._lock:
+            self._clients[sid] = {'probs': None, 'frames': 0, 'dropped': 0}
+
+    def remove_client(self, sid):
+        with self._lock:
+            self._clients.pop(sid, None)
+            self._latest.pop(sid, None)
+
+    # Accept a frame from a client, replacing any frame that has not been classified yet
+    def push(self, sid, frame):
+        self._ensure_worker()
+        with self._lock:
+            client = self._clients.get(sid)
+            if client is None:
+                return
+            waiting = sid in self._latest
+            if waiting:
+                client['dropped'] += 1
+                self._dropped += 1
+            self._latest[sid] = frame
+        if not waiting:
+            self._ready.put(sid)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'clients': len(self._clients),
+                'batches': self._batches,
+                'frames': self._frames,
+                'dropped': self._dropped,
+                'avg_batch_size': (self._frames / self._batches) if self._batches else 0.0,
+            }
+
+    # Take up to max_batch clients with waiting frames (blocks until at least one arrives)
+    def _next_batch(self):
+        sids = [self._ready.get()]
+        while len(sids) < self.max_batch:
+            try:
+                sids.append(self._ready.get_nowait())
+            except queue.Empty:
+                break
+        with self._lock:
+            return [(sid, self._latest.pop(sid)) for sid in sids if sid in self._latest]
+
+    # Batching loop: decode the latest frames in parallel, run one forward pass, emit per client
+    def _run(self):
+        while True:
+            frames = self._next_batch()
+            if not frames:
+                continue
+
+            futures = [(sid, self.submit_decode(frame)) for sid, frame in frames]
+            decoded = []
+            for sid, future in futures:
+                try:
+                    decoded.append((sid, wait_for_result(future)))
+                except Exception:
+                    self.socketio.emit('frame_error', {'error': 'Not a valid image'}, room=sid, namespace=self.namespace)
+            if not decoded:
+                continue
+
+            try:
+                preds = np.asarray(self.predict_fn(np.stack([array for _, array in decoded])), dtype=np.float32)
+            except Exception as e:
+                print(f"Live detection batch failed: {e}")
+                for sid, _ in decoded:
+                    self.socketio.emit('frame_error', {'error': 'Detection failed'}, room=sid, namespace=self.namespace)
+                continue
+
+            results = []
+            with self._lock:
+                self._batches += 1
+                self._frames += len(decoded)
+                for (sid, _), probs in zip(decoded, preds):
+                    client = self._clients.get(sid)
+                    if client is None:
+                        continue
+                    # Exponential moving average so the label does not flicker between frames
+                    if client['probs'] is not None:
+                        probs = self.smoothing * client['probs'] + (1.0 - self.smoothing) * probs
+                    client['probs'] = probs
+                    client['frames'] += 1
+                    results.append((sid, probs, client['frames'], client['dropped']))
+
+            for sid, probs, frames_seen, dropped in results:
+                index = int(np.argmax(probs))
+                self.socketio.emit('prediction', {
+                    'prediction': self.class_labels[index],
+                    'confidence': float(probs[index]),
+                    'probabilities': {label: float(p) for label, p in zip(self.class_labels, probs)},
+                    'frames': frames_seen,
+                    'dropped': dropped,
+                }, room=sid, namespace=self.namespace)
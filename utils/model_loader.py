@@ -0,0 +1,309 @@
+import hashlib
+import multiprocessing
+import os
+import threading
+import time
+from collections import deque
+from datetime import datetime
+import numpy as np
+from utils.preprocessing import IMAGE_SIZE
+from utils.inference_backends import BACKEND_PATHS, INFERENCE_BACKEND, backend_path, load_backend
+from utils.inference_pool import INFERENCE_WORKERS, InferencePool
+from utils.cascade import CASCADE_FAST_BACKEND, CascadeModel
+
+# Path to the trained disease detection model
+MODEL_PATH = BACKEND_PATHS['keras']
+
+# Artifact actually served (depends on INFERENCE_BACKEND)
+ACTIVE_MODEL_PATH = backend_path(INFERENCE_BACKEND)
+
+# Directory that hot-swapped models must be loaded from
+MODEL_DIR = os.path.dirname(ACTIVE_MODEL_PATH) or '.'
+
+# Seconds between checks of the served model file for changes (0 disables the watcher)
+MODEL_WATCH_SECONDS = float(os.getenv('MODEL_WATCH_SECONDS', '0'))
+
+# Number of load attempts kept in the version history
+MODEL_HISTORY_SIZE = 20
+
+# Define the disease categories (class labels)
+class_labels = ['Bacterial Leaf Spot Disease', 'Dried Leaf', 'Fungal Brown Spot Disease', 'Healthy Leaf']
+
+
+class ModelVersion:
+    """A loaded model together with the requests currently running on it."""
+
+    def __init__(self, model, version, path, warmup_ms):
+        self.model = model
+        self.version = version
+        self.path = path
+        self.warmup_ms = warmup_ms
+        self.loaded_at = datetime.utcnow()
+        self._in_flight = 0
+        self._idle = threading.Condition()
+
+    def acquire(self):
+        with self._idle:
+            self._in_flight += 1
+
+    def release(self):
+        with self._idle:
+            self._in_flight -= 1
+            if self._in_flight == 0:
+                self._idle.notify_all()
+
+    # Wait for requests still running on this version, then free its worker processes (if any)
+    def retire(self):
+        with self._idle:
+            while self._in_flight:
+                self._idle.wait()
+        for model in (self.model, getattr(self.model, 'heavy', None)):
+            if hasattr(model, 'shutdown'):
+                model.shutdown()
+
+    def info(self):
+        return {
+            'version': self.version,
+            'path': self.path,
+            'backend': INFERENCE_BACKEND,
+            'loaded_at': self.loaded_at.isoformat(),
+            'warmup_ms': self.warmup_ms,
+        }
+
+
+_current = None
+_load_error = None
+_ready = threading.Event()
+_lock = threading.Lock()
+_swap_lock = threading.Lock()
+_warmup_thread = None
+_reload_thread = None
+_watch_thread = None
+_history = deque(maxlen=MODEL_HISTORY_SIZE)
+_swap_listeners = []
+
+
+# Dummy input used to warm up a model
+def _warmup_batch():
+    return np.zeros((1, IMAGE_SIZE[0], IMAGE_SIZE[1], 3), dtype=np.float32)
+
+
+# Version id of a model artifact: file name plus a short content hash
+def version_id(path):
+    digest = hashlib.sha256()
+    if os.path.isdir(path):
+        # SavedModel directories: hash the file names, sizes and modification times
+        for root, _, files in sorted(os.walk(path)):
+            for name in sorted(files):
+                stat = os.stat(os.path.join(root, name))
+                digest.update(f"{name}:{stat.st_size}:{stat.st_mtime_ns}".encode())
+    else:
+        with open(path, 'rb') as f:
+            for block in iter(lambda: f.read(1024 * 1024), b''):
+                digest.update(block)
+    return f"{os.path.basename(os.path.normpath(path))}@{digest.hexdigest()[:12]}"
+
+
+# Modification time and size of a model artifact, used by the file watcher
+def _signature(path):
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+
+# Load a model artifact and run a dummy forward pass so the first real request skips graph tracing
+def _build_model(path):
+    if INFERENCE_WORKERS > 0:
+        # Worker processes load and warm up their own copy of the model
+        model = InferencePool(INFERENCE_BACKEND, len(class_labels), path=path).start()
+    else:
+        model = load_backend(INFERENCE_BACKEND, path)
+        model.predict(_warmup_batch())
+        # The detection batcher asks for embeddings too, which runs a separately traced model
+        if hasattr(model, 'predict_with_embeddings'):
+            model.predict_with_embeddings(_warmup_batch())
+
+    # Put the cheap model in front of the full one when a cascade is configured
+    if CASCADE_FAST_BACKEND:
+        fast = load_backend(CASCADE_FAST_BACKEND)
+        fast.predict(_warmup_batch())
+        model = CascadeModel(fast, model)
+    return model
+
+
+# Load and warm up a version in the background, then swap it in; requests keep using the old one meanwhile
+def _load_version(path):
+    global _current, _load_error
+    started = time.perf_counter()
+    entry = {'path': path, 'started_at': datetime.utcnow().isoformat()}
+    try:
+        version = version_id(path)
+        entry['version'] = version
+        model = _build_model(path)
+    except Exception as e:
+        entry['error'] = str(e)
+        _history.appendleft(entry)
+        if _current is None:
+            _load_error = e
+        print(f"Failed to load {INFERENCE_BACKEND} model from {path}: {e}")
+        return False
+
+    loaded = ModelVersion(model, version, path, (time.perf_counter() - started) * 1000.0)
+    with _swap_lock:
+        previous, _current = _current, loaded
+    _load_error = None
+    entry['loaded_at'] = loaded.loaded_at.isoformat()
+    entry['warmup_ms'] = loaded.warmup_ms
+    _history.appendleft(entry)
+    print(f"Serving model version {version}")
+
+    for listener in list(_swap_listeners):
+        listener(loaded.version)
+    if previous is not None:
+        # Requests that started on the old version finish on it before it is released
+        threading.Thread(target=previous.retire, name='model-retire', daemon=True).start()
+    return True
+
+
+def _load_and_warm_up():
+    try:
+        _load_version(ACTIVE_MODEL_PATH)
+    finally:
+        _ready.set()
+
+
+# Poll the served model file and hot-swap once a changed file has stopped changing
+def _watch():
+    loaded_signature = _signature(ACTIVE_MODEL_PATH)
+    previous = loaded_signature
+    while True:
+        time.sleep(MODEL_WATCH_SECONDS)
+        signature = _signature(ACTIVE_MODEL_PATH)
+        # Only reload when two consecutive checks agree, so a file that is still being copied is skipped
+        if signature is not None and signature != loaded_signature and signature == previous:
+            if reload_model():
+                loaded_signature = signature
+        previous = signature
+
+
+# Start loading the model in the background (safe to call more than once)
+def start_warmup():
+    global _warmup_thread, _watch_thread
+    # Spawned inference workers re-import the app; they load their own model instead
+    if multiprocessing.parent_process() is not None:
+        return
+    with _lock:
+        if _warmup_thread is None:
+            _warmup_thread = threading.Thread(target=_load_and_warm_up, name='model-warmup', daemon=True)
+            _warmup_thread.start()
+        if MODEL_WATCH_SECONDS > 0 and _watch_thread is None:
+            _watch_thread = threading.Thread(target=_watch, name='model-watcher', daemon=True)
+            _watch_thread.start()
+
+
+# Resolve a model path for hot-swapping; only artifacts inside MODEL_DIR are accepted
+def resolve_model_path(path=None):
+    if not path:
+        return ACTIVE_MODEL_PATH
+    model_dir = os.path.realpath(MODEL_DIR)
+    resolved = os.path.realpath(os.path.join(model_dir, path))
+    if os.path.commonpath([model_dir, resolved]) != model_dir:
+        raise ValueError('Model path must be inside the model directory')
+    if not os.path.exists(resolved):
+        raise ValueError(f"Model file not found: {path}")
+    return resolved
+
+
+# Load a new version in the background and swap it in once warm; returns False if a reload is already running
+def reload_model(path=None):
+    global _reload_thread
+    path = resolve_model_path(path)
+    with _lock:
+        if _reload_thread is not None and _reload_thread.is_alive():
+            return False
+        _reload_thread = threading.Thread(target=_load_version, args=(path,), name='model-reload', daemon=True)
+        _reload_thread.start()
+    return True
+
+
+# Register a callback run with the new version id after every swap (e.g. to clear result caches)
+def add_swap_listener(listener):
+    _swap_listeners.append(listener)
+
+
+# True once a model has loaded and finished its warm-up pass
+def is_model_ready():
+    return _current is not None
+
+
+# Loading state for status displays: 'warming_up', 'ready' or 'failed'
+def model_status():
+    if _current is not None:
+        return 'ready'
+    return 'failed' if _ready.is_set() else 'warming_up'
+
+
+# Version id of the model currently serving requests
+def model_version():
+    current = _current
+    return current.version if current else None
+
+
+# Current version, whether a reload is running and the recent load history
+def model_info():
+    current = _current
+    return {
+        'status': model_status(),
+        'current': current.info() if current else None,
+        'reloading': _reload_thread is not None and _reload_thread.is_alive(),
+        'watch_seconds': MODEL_WATCH_SECONDS,
+        'history': list(_history),
+    }
+
+
+# Return the loaded inference backend, waiting for the warm-up to finish if needed
+def get_model(timeout=None):
+    start_warmup()
+    if not _ready.wait(timeout):
+        raise RuntimeError('Model is still warming up')
+    if _current is None:
+        raise RuntimeError(f"Model could not be loaded: {_load_error}")
+    return _current.model
+
+
+# Number of batches that can usefully run at the same time
+def max_in_flight():
+    return max(1, INFERENCE_WORKERS)
+
+
+# Runtime stats of the loaded model (cascade escalation metrics), if it keeps any
+def model_stats():
+    current = _current
+    if current is None or not hasattr(current.model, 'stats'):
+        return None
+    return current.model.stats()
+
+
+# Run a batched forward pass; returns (class probabilities, version id of the model that produced them).
+# With with_embeddings=True and a model that exposes them, each row is the class probabilities
+# followed by the penultimate-layer embedding.
+def predict_versioned(batch, with_embeddings=False):
+    get_model()
+    with _swap_lock:
+        current = _current
+        current.acquire()
+    try:
+        model = current.model
+        if with_embeddings and hasattr(model, 'predict_with_embeddings'):
+            probs, embeddings = model.predict_with_embeddings(batch)
+            return np.hstack([np.asarray(probs, dtype=np.float32), np.asarray(embeddings, dtype=np.float32)]), current.version
+        return model.predict(batch), current.version
+    finally:
+        current.release()
+
+
+# Run a batched forward pass and return class probabilities
+def predict(batch):
+    return predict_versioned(batch)[0]
@@ -0,0 +1,291 @@
+import json
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+# Largest im2col buffer built at once; bigger batches are convolved a few images at a time
+IM2COL_MAX_BYTES = 64 * 1024 * 1024
+
+# Keras layer types the NumPy runtime can execute (InputLayer is skipped on export)
+SUPPORTED_LAYERS = (
+    'Conv2D', 'Dense', 'MaxPooling2D', 'AveragePooling2D', 'GlobalAveragePooling2D', 'GlobalMaxPooling2D',
+    'Flatten', 'Dropout', 'BatchNormalization', 'Activation', 'ReLU', 'Softmax', 'Rescaling',
+)
+
+# Names of each layer's weights, in the order Keras returns them from get_weights()
+WEIGHT_NAMES = {
+    'Conv2D': ('kernel', 'bias'),
+    'Dense': ('kernel', 'bias'),
+}
+
+# Config keys kept for each layer type
+CONFIG_KEYS = {
+    'Conv2D': ('strides', 'padding', 'dilation_rate', 'activation', 'data_format'),
+    'Dense': ('activation',),
+    'MaxPooling2D': ('pool_size', 'strides', 'padding', 'data_format'),
+    'AveragePooling2D': ('pool_size', 'strides', 'padding', 'data_format'),
+    'GlobalAveragePooling2D': ('data_format',),
+    'GlobalMaxPooling2D': ('data_format',),
+    'BatchNormalization': ('axis', 'epsilon', 'center', 'scale'),
+    'Activation': ('activation',),
+    'ReLU': ('max_value', 'negative_slope', 'threshold'),
+    'Softmax': ('axis',),
+    'Rescaling': ('scale', 'offset'),
+}
+
+
+def _softmax(x, axis=-1):
+    shifted = np.exp(x - x.max(axis=axis, keepdims=True))
+    return shifted / shifted.sum(axis=axis, keepdims=True)
+
+
+# Activation functions by their Keras names
+ACTIVATIONS = {
+    'linear': lambda x: x,
+    'relu': lambda x: np.maximum(x, 0),
+    'sigmoid': lambda x: 1.0 / (1.0 + np.exp(-x)),
+    'tanh': np.tanh,
+    'softmax': _softmax,
+    'swish': lambda x: x / (1.0 + np.exp(-x)),
+    'silu': lambda x: x / (1.0 + np.exp(-x)),
+}
+
+
+# Keras 3 stores some activations as serialized objects instead of plain names
+def _activation_name(activation):
+    if isinstance(activation, dict):
+        config = activation.get('config')
+        activation = config.get('name') if isinstance(config, dict) else config
+    return activation or 'linear'
+
+
+# Write a Keras model's layer configs and weights to an .npz file the NumPy runtime can load
+def export_model(keras_model, path):
+    layers, arrays = [], {}
+    for layer in keras_model.layers:
+        kind = type(layer).__name__
+        if kind == 'InputLayer':
+            continue
+        if kind not in SUPPORTED_LAYERS:
+            raise ValueError(f"Layer {layer.name} ({kind}) is not supported by the NumPy runtime")
+        config = layer.get_config()
+        spec = {'type': kind, 'name': layer.name}
+        for key in CONFIG_KEYS.get(kind, ()):
+            if key in config:
+                spec[key] = _activation_name(config[key]) if key == 'activation' else config[key]
+        if spec.get('data_format', 'channels_last') != 'channels_last':
+            raise ValueError(f"Layer {layer.name} uses {spec['data_format']}; only channels_last is supported")
+        if spec.get('activation', 'linear') not in ACTIVATIONS:
+            raise ValueError(f"Layer {layer.name} uses the unsupported activation '{spec['activation']}'")
+
+        weights = layer.get_weights()
+        if kind == 'BatchNormalization':
+            # gamma and beta are only present when scale / center are enabled
+            names = (['gamma'] if config.get('scale', True) else []) + (['beta'] if config.get('center', True) else [])
+            names += ['moving_mean', 'moving_variance']
+        else:
+            names = WEIGHT_NAMES.get(kind, ())[:len(weights)]
+        for name, value in zip(names, weights):
+            arrays[f"{len(layers)}/{name}"] = np.asarray(value, dtype=np.float32)
+        layers.append(spec)
+
+    with open(path, 'wb') as f:
+        np.savez(f, config=np.array(json.dumps({'layers': layers})), **arrays)
+    return layers
+
+
+# Output size and (before, after) padding along one axis, following TensorFlow's 'same'/'valid' rules
+def _padding(size, window, stride, padding):
+    if padding == 'same':
+        out = -(-size // stride)
+        total = max((out - 1) * stride + window - size, 0)
+        return out, (total // 2, total - total // 2)
+    return (size - window) // stride + 1, (0, 0)
+
+
+# Pad the spatial axes of an (N, H, W, C) batch for a window/stride pair
+def _pad_spatial(x, window, strides, padding, value=0.0):
+    (out_h, pad_h), (out_w, pad_w) = (
+        _padding(x.shape[1], window[0], strides[0], padding),
+        _padding(x.shape[2], window[1], strides[1], padding),
+    )
+    if pad_h != (0, 0) or pad_w != (0, 0):
+        x = np.pad(x, ((0, 0), pad_h, pad_w, (0, 0)), constant_values=value)
+    return x, out_h, out_w
+
+
+# Strided (N, out_h, out_w, C, kh, kw) view of every window (no pixels are copied)
+def _windows(x, window, strides, dilation=(1, 1)):
+    span = ((window[0] - 1) * dilation[0] + 1, (window[1] - 1) * dilation[1] + 1)
+    view = sliding_window_view(x, span, axis=(1, 2))
+    return view[:, ::strides[0], ::strides[1], :, ::dilation[0], ::dilation[1]]
+
+
+class Conv2D:
+    """Convolution as one matrix multiply over im2col patches."""
+
+    def __init__(self, spec, kernel, bias=None):
+        kh, kw, channels, filters = kernel.shape
+        self.window = (kh, kw)
+        self.strides = tuple(spec.get('strides', (1, 1)))
+        self.dilation = tuple(spec.get('dilation_rate', (1, 1)))
+        self.padding = spec.get('padding', 'valid')
+        self.activation = ACTIVATIONS[spec.get('activation', 'linear')]
+        # Patches are laid out (C, kh, kw), so reorder the (kh, kw, C, F) kernel to match
+        self.kernel = np.ascontiguousarray(kernel.transpose(2, 0, 1, 3).reshape(channels * kh * kw, filters))
+        self.bias = bias
+        self.filters = filters
+
+    def __call__(self, x):
+        effective = ((self.window[0] - 1) * self.dilation[0] + 1, (self.window[1] - 1) * self.dilation[1] + 1)
+        x, out_h, out_w = _pad_spatial(x, effective, self.strides, self.padding)
+        windows = _windows(x, self.window, self.strides, self.dilation)[:, :out_h, :out_w]
+
+        # Bound the im2col buffer by convolving a slice of the batch at a time
+        patch_bytes = out_h * out_w * self.kernel.shape[0] * 4
+        step = max(1, IM2COL_MAX_BYTES // max(patch_bytes, 1))
+        out = np.empty((len(x), out_h, out_w, self.filters), dtype=np.float32)
+        for start in range(0, len(x), step):
+            cols = windows[start:start + step].reshape(-1, self.kernel.shape[0])
+            result = cols @ self.kernel
+            if self.bias is not None:
+                result += self.bias
+            out[start:start + step] = result.reshape(-1, out_h, out_w, self.filters)
+        return self.activation(out)
+
+
+class Dense:
+    """Fully connected layer."""
+
+    def __init__(self, spec, kernel, bias=None):
+        self.kernel = kernel
+        self.bias = bias
+        self.activation = ACTIVATIONS[spec.get('activation', 'linear')]
+
+    def __call__(self, x):
+        out = x @ self.kernel
+        if self.bias is not None:
+            out += self.bias
+        return self.activation(out)
+
+
+class Pooling2D:
+    """Max or average pooling over strided windows."""
+
+    def __init__(self, spec, mode):
+        self.window = tuple(spec.get('pool_size', (2, 2)))
+        self.strides = tuple(spec.get('strides') or self.window)
+        self.padding = spec.get('padding', 'valid')
+        self.mode = mode
+
+    def __call__(self, x):
+        if self.mode == 'max':
+            padded, out_h, out_w = _pad_spatial(x, self.window, self.strides, self.padding, value=-np.inf)
+            return _windows(padded, self.window, self.strides)[:, :out_h, :out_w].max(axis=(-2, -1))
+
+        padded, out_h, out_w = _pad_spatial(x, self.window, self.strides, self.padding)
+        total = _windows(padded, self.window, self.strides)[:, :out_h, :out_w].sum(axis=(-2, -1))
+        if self.padding != 'same':
+            return total / np.float32(self.window[0] * self.window[1])
+        # 'same' average pooling divides by the number of real (unpadded) pixels in each window
+        ones, _, _ = _pad_spatial(np.ones((1,) + x.shape[1:3] + (1,), dtype=np.float32), self.window, self.strides, self.padding)
+        counts = _windows(ones, self.window, self.strides)[:, :out_h, :out_w].sum(axis=(-2, -1))
+        return total / counts
+
+
+class BatchNormalization:
+    """Inference-mode batch normalization, folded into one scale and shift."""
+
+    def __init__(self, spec, moving_mean, moving_variance, gamma=None, beta=None):
+        scale = 1.0 / np.sqrt(moving_variance + spec.get('epsilon', 1e-3))
+        if gamma is not None:
+            scale = scale * gamma
+        shift = -moving_mean * scale
+        if beta is not None:
+            shift = shift + beta
+        self.scale = scale.astype(np.float32)
+        self.shift = shift.astype(np.float32)
+
+    def __call__(self, x):
+        return x * self.scale + self.shift
+
+
+class ReLU:
+    """Keras ReLU layer with its optional cap, slope and threshold."""
+
+    def __init__(self, spec):
+        self.max_value = spec.get('max_value')
+        self.negative_slope = spec.get('negative_slope') or 0.0
+        self.threshold = spec.get('threshold') or 0.0
+
+    def __call__(self, x):
+        out = np.where(x >= self.threshold, x, self.negative_slope * (x - self.threshold))
+        if self.max_value is not None:
+            out = np.minimum(out, self.max_value)
+        return out
+
+
+# Build the callable for one exported layer
+def _build_layer(spec, weights):
+    kind = spec['type']
+    if kind in ('Conv2D', 'Dense'):
+        layer_class = Conv2D if kind == 'Conv2D' else Dense
+        return layer_class(spec, weights['kernel'], weights.get('bias'))
+    if kind in ('MaxPooling2D', 'AveragePooling2D'):
+        return Pooling2D(spec, 'max' if kind == 'MaxPooling2D' else 'avg')
+    if kind == 'GlobalAveragePooling2D':
+        return lambda x: x.mean(axis=(1, 2))
+    if kind == 'GlobalMaxPooling2D':
+        return lambda x: x.max(axis=(1, 2))
+    if kind == 'Flatten':
+        return lambda x: x.reshape(len(x), -1)
+    if kind == 'Dropout':
+        return lambda x: x
+    if kind == 'BatchNormalization':
+        return BatchNormalization(spec, **weights)
+    if kind == 'Activation':
+        return ACTIVATIONS[spec['activation']]
+    if kind == 'ReLU':
+        return ReLU(spec)
+    if kind == 'Softmax':
+        return lambda x: _softmax(x, spec.get('axis', -1))
+    if kind == 'Rescaling':
+        scale, offset = np.float32(spec.get('scale', 1.0)), np.float32(spec.get('offset', 0.0))
+        return lambda x: x * scale + offset
+    raise ValueError(f"Unsupported layer type '{kind}'")
+
+
+class NumpyModel:
+    """Sequential forward pass over weights exported by export_model, using only NumPy."""
+
+    def __init__(self, path):
+        with np.load(path, allow_pickle=False) as data:
+            config = json.loads(str(data['config']))
+            arrays = {key: data[key] for key in data.files if key != 'config'}
+
+        self.layers = []
+        self.names = []
+        for index, spec in enumerate(config['layers']):
+            prefix = f"{index}/"
+            weights = {key[len(prefix):]: value for key, value in arrays.items() if key.startswith(prefix)}
+            self.layers.append(_build_layer(spec, weights))
+            self.names.append(spec['name'])
+
+    # Run every layer; returns the model output and the activations of the layers listed in keep
+    def forward(self, batch, keep=()):
+        x = np.asarray(batch, dtype=np.float32)
+        kept = {}
+        for index, layer in enumerate(self.layers):
+            x = layer(x)
+            if index in keep:
+                kept[index] = x
+        return x, kept
+
+    def predict(self, batch):
+        return self.forward(batch)[0]
+
+    # Class probabilities plus the penultimate-layer activations, like KerasBackend.predict_with_embeddings
+    def predict_with_embeddings(self, batch):
+        penultimate = len(self.layers) - 2
+        probs, kept = self.forward(batch, keep=(penultimate,))
+        embeddings = kept[penultimate]
+        return probs, embeddings.reshape(len(embeddings), -1)
@@ -0,0 +1,79 @@
+import base64
+import binascii
+import json
+import os
+from datetime import datetime
+from bson.objectid import ObjectId
+from bson.errors import InvalidId
+
+# Posts per feed page (override with an environment variable); clients may ask for fewer, never more than the maximum
+FORUM_PAGE_SIZE = int(os.getenv('FORUM_PAGE_SIZE', '20'))
+FORUM_MAX_PAGE_SIZE = 100
+
+
+class InvalidCursor(ValueError):
+    """Raised for cursors that cannot be decoded or were issued for a different sort order."""
+
+
+# Tag datetimes and ObjectIds so they survive the round trip through JSON
+def _encode_value(value):
+    if isinstance(value, datetime):
+        return {'d': value.isoformat()}
+    if isinstance(value, ObjectId):
+        return {'o': str(value)}
+    return value
+
+
+def _decode_value(value):
+    if isinstance(value, dict):
+        if 'd' in value:
+            return datetime.fromisoformat(value['d'])
+        if 'o' in value:
+            return ObjectId(value['o'])
+        raise InvalidCursor('Unknown cursor value')
+    return value
+
+
+# Opaque, URL-safe token holding the sort name and the sort-key values of the last document on a page
+def encode_cursor(sort_name, values):
+    payload = json.dumps({'s': sort_name, 'v': [_encode_value(value) for value in values]}, separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode()).decode('ascii').rstrip('=')
+
+
+def decode_cursor(token, sort_name):
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+        values = [_decode_value(value) for value in payload['v']]
+    except (binascii.Error, UnicodeError, ValueError, KeyError, TypeError, InvalidId) as e:
+        raise InvalidCursor('Malformed cursor') from e
+    if payload.get('s') != sort_name:
+        raise InvalidCursor('Cursor was issued for a different sort order')
+    return values
+
+
+# Sort-key values of a document, in the order of a sort spec like [('date', -1), ('_id', -1)]
+def cursor_values(doc, sort_spec):
+    return [doc.get(field) for field, _ in sort_spec]
+
+
+# Query matching only documents after the cursor position for a compound sort (keyset pagination):
+# (a < x) or (a == x and b < y) ..., with < or > chosen per field direction
+def keyset_filter(sort_spec, values):
+    if len(values) != len(sort_spec):
+        raise InvalidCursor('Cursor does not match the sort order')
+    clauses = []
+    for i, (field, direction) in enumerate(sort_spec):
+        clause = {prev_field: values[j] for j, (prev_field, _) in enumerate(sort_spec[:i])}
+        clause[field] = {'$lt' if direction < 0 else '$gt': values[i]}
+        clauses.append(clause)
+    return {'$or': clauses}
+
+
+# Page size from a request argument, clamped to 1..FORUM_MAX_PAGE_SIZE
+def page_size(raw, default=FORUM_PAGE_SIZE):
+    try:
+        size = int(raw) if raw else default
+    except ValueError:
+        size = default
+    return max(1, min(size, FORUM_MAX_PAGE_SIZE))
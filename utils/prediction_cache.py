@@ -0,0 +1,93 @@
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+import numpy as np
+
+# Cache limits (override with environment variables)
+PREDICTION_CACHE_SIZE = int(os.getenv('PREDICTION_CACHE_SIZE', '1024'))
+PREDICTION_CACHE_TTL = float(os.getenv('PREDICTION_CACHE_TTL', '3600'))
+
+
+# Hash the decoded pixels so the same photo hits regardless of file name or metadata
+def image_key(img_array):
+    return hashlib.blake2b(np.ascontiguousarray(img_array).tobytes(), digest_size=16).hexdigest()
+
+
+class PredictionCache:
+    """Bounded LRU + TTL cache of detection results keyed by image hash."""
+
+    def __init__(self, model_path, max_entries=PREDICTION_CACHE_SIZE, ttl_seconds=PREDICTION_CACHE_TTL):
+        self.model_path = model_path
+        self.max_entries = max(1, int(max_entries))
+        self.ttl = float(ttl_seconds)
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._model_signature = self._read_model_signature()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    # Modification time and size of the model file (None if it is missing)
+    def _read_model_signature(self):
+        try:
+            st = os.stat(self.model_path)
+        except OSError:
+            return None
+        return (st.st_mtime_ns, st.st_size)
+
+    # Drop everything when the model file on disk has been replaced
+    def _check_model(self):
+        signature = self._read_model_signature()
+        if signature != self._model_signature:
+            self._model_signature = signature
+            self._entries.clear()
+            self.invalidations += 1
+
+    def get(self, key):
+        with self._lock:
+            self._check_model()
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.invalidations += 1
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'ttl_seconds': self.ttl,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': (self.hits / lookups) if lookups else 0.0,
+                'evictions': self.evictions,
+                'invalidations': self.invalidations,
+            }
@@ -0,0 +1,156 @@
+import atexit
+import os
+import threading
+import time
+from datetime import datetime
+from bson.objectid import ObjectId
+from pymongo.errors import BulkWriteError
+from utils.db import predictions_collection, prediction_rollups_collection
+from utils.prediction_rollups import apply_rollups, ensure_rollup_indexes
+
+# Write-behind limits (override with environment variables)
+HISTORY_FLUSH_SIZE = int(os.getenv('HISTORY_FLUSH_SIZE', '100'))
+HISTORY_FLUSH_SECONDS = float(os.getenv('HISTORY_FLUSH_SECONDS', '2'))
+HISTORY_MAX_BUFFER = int(os.getenv('HISTORY_MAX_BUFFER', '10000'))
+
+# MongoDB error code for a duplicate _id
+DUPLICATE_KEY = 11000
+
+
+class PredictionHistory:
+    """Buffers detection records in memory and writes them (and their rollup counters) to MongoDB in batches."""
+
+    def __init__(self, collection, rollups_collection=None, flush_size=HISTORY_FLUSH_SIZE,
+                 flush_seconds=HISTORY_FLUSH_SECONDS, max_buffer=HISTORY_MAX_BUFFER):
+        self.collection = collection
+        self.rollups_collection = rollups_collection
+        self.flush_size = max(1, int(flush_size))
+        self.flush_seconds = float(flush_seconds)
+        self.max_buffer = max(self.flush_size, int(max_buffer))
+        self._buffer = []
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._worker = None
+
+        # Counters exposed through stats()
+        self._written = 0
+        self._dropped = 0
+        self._flushes = 0
+        self._errors = 0
+        self._rollup_errors = 0
+
+    # Start the background writer on first use
+    def _ensure_worker(self):
+        if self._worker is not None and self._worker.is_alive():
+            return
+        with self._lock:
+            if self._worker is None or not self._worker.is_alive():
+                self._worker = threading.Thread(target=self._run, name='prediction-history', daemon=True)
+                self._worker.start()
+                atexit.register(self.flush)
+
+    # Queue one detection for storage and return its id; never waits on the database
+    def record(self, user_id, prediction, confidence, probabilities, image_hash, timings, source, model_version=None):
+        self._ensure_worker()
+        doc = {
+            '_id': ObjectId(),
+            'user_id': user_id,
+            'prediction': prediction,
+            'confidence': confidence,
+            'probabilities': probabilities,
+            'image_hash': image_hash,
+            'timings': timings,
+            'source': source,
+            'model_version': model_version,
+            'created_at': datetime.utcnow()
+        }
+        with self._lock:
+            if len(self._buffer) >= self.max_buffer:
+                # Mongo is down or too slow; drop the oldest record rather than grow without bound
+                self._buffer.pop(0)
+                self._dropped += 1
+            self._buffer.append(doc)
+            full = len(self._buffer) >= self.flush_size
+        if full:
+            self._wake.set()
+        return str(doc['_id'])
+
+    # Write everything buffered so far
+    def flush(self):
+        with self._flush_lock:
+            with self._lock:
+                docs, self._buffer = self._buffer, []
+            if not docs:
+                return 0
+            try:
+                self.collection.insert_many(docs, ordered=False)
+                inserted, failed = docs, []
+            except BulkWriteError as e:
+                # With ordered=False every doc is attempted; a duplicate key means an earlier attempt
+                # (e.g. one that timed out after the server committed) already stored it
+                errors = e.details.get('writeErrors', [])
+                failed_at = {error['index'] for error in errors if error.get('code') != DUPLICATE_KEY}
+                duplicate_at = {error['index'] for error in errors if error.get('code') == DUPLICATE_KEY}
+                inserted = [doc for i, doc in enumerate(docs) if i not in failed_at and i not in duplicate_at]
+                failed = [docs[i] for i in sorted(failed_at)]
+                print(f"Prediction history flush: {len(inserted)} inserted, {len(duplicate_at)} already stored, {len(failed)} failed")
+            except Exception as e:
+                print(f"Prediction history flush failed: {e}")
+                inserted, failed = [], docs
+
+            written = len(docs) - len(failed)
+            with self._lock:
+                self._written += written
+                if failed:
+                    self._errors += 1
+                    # Put the failed docs back in front so they are retried on the next flush
+                    self._buffer = failed + self._buffer
+                    overflow = len(self._buffer) - self.max_buffer
+                    if overflow > 0:
+                        del self._buffer[:overflow]
+                        self._dropped += overflow
+                if written:
+                    self._flushes += 1
+
+            # The history is already stored, so a failed rollup is logged and left to the backfill job.
+            # Only docs inserted by this flush are counted; already-stored duplicates are also left to the backfill.
+            if self.rollups_collection is not None and inserted:
+                try:
+                    apply_rollups(self.rollups_collection, inserted)
+                except Exception as e:
+                    print(f"Prediction rollup update failed: {e}")
+                    with self._lock:
+                        self._rollup_errors += 1
+            return written
+
+    def stats(self):
+        with self._lock:
+            return {
+                'buffered': len(self._buffer),
+                'written': self._written,
+                'dropped': self._dropped,
+                'flushes': self._flushes,
+                'errors': self._errors,
+                'rollup_errors': self._rollup_errors,
+            }
+
+    # Worker loop: flush when the buffer fills up or flush_seconds pass
+    def _run(self):
+        if self.rollups_collection is not None:
+            try:
+                ensure_rollup_indexes(self.rollups_collection)
+            except Exception as e:
+                print(f"Could not create rollup indexes: {e}")
+
+        while True:
+            self._wake.wait(self.flush_seconds)
+            self._wake.clear()
+            errors = self._errors
+            self.flush()
+            if self._errors > errors:
+                # Back off instead of retrying on every new record while Mongo is unavailable
+                time.sleep(self.flush_seconds)
+
+
+prediction_history = PredictionHistory(predictions_collection, prediction_rollups_collection)
@@ -0,0 +1,79 @@
+from collections import Counter
+from datetime import datetime, timedelta
+from pymongo import ASCENDING, UpdateOne
+
+# Rollup periods: each detection increments one counter per period
+PERIODS = ('day', 'week')
+
+
+# Start of the day or (Monday-based) week containing a timestamp
+def period_start(period, timestamp):
+    day = datetime(timestamp.year, timestamp.month, timestamp.day)
+    if period == 'week':
+        return day - timedelta(days=day.weekday())
+    return day
+
+
+# One $inc upsert per (period, bucket, class) for a batch of prediction history records
+def rollup_updates(docs):
+    counts = Counter()
+    confidence_sums = Counter()
+    for doc in docs:
+        for period in PERIODS:
+            key = (period, period_start(period, doc['created_at']), doc['prediction'])
+            counts[key] += 1
+            confidence_sums[key] += doc['confidence']
+
+    return [
+        UpdateOne(
+            {'period': period, 'start': start, 'prediction': prediction},
+            {'$inc': {'count': count, 'confidence_sum': confidence_sums[(period, start, prediction)]}},
+            upsert=True
+        )
+        for (period, start, prediction), count in counts.items()
+    ]
+
+
+# Apply a batch of history records to the rollups collection
+def apply_rollups(collection, docs):
+    updates = rollup_updates(docs)
+    if updates:
+        collection.bulk_write(updates, ordered=False)
+    return len(updates)
+
+
+def ensure_rollup_indexes(collection):
+    collection.create_index(
+        [('period', ASCENDING), ('start', ASCENDING), ('prediction', ASCENDING)],
+        unique=True
+    )
+
+
+# Per-class counts for the most recent buckets: [{'start', 'counts': {class: n}, 'total'}] oldest first
+def rollup_series(collection, period, buckets, now=None):
+    now = now or datetime.utcnow()
+    step = timedelta(weeks=1) if period == 'week' else timedelta(days=1)
+    first = period_start(period, now) - step * (buckets - 1)
+
+    series = {first + step * i: {} for i in range(buckets)}
+    confidence_sums = {}
+    for doc in collection.find({'period': period, 'start': {'$gte': first}}):
+        counts = series.setdefault(doc['start'], {})
+        counts[doc['prediction']] = doc['count']
+        confidence_sums[doc['prediction']] = confidence_sums.get(doc['prediction'], 0.0) + doc.get('confidence_sum', 0.0)
+
+    totals = Counter()
+    for counts in series.values():
+        totals.update(counts)
+
+    return {
+        'period': period,
+        'series': [
+            {'start': start.strftime('%Y-%m-%d'), 'counts': counts, 'total': sum(counts.values())}
+            for start, counts in sorted(series.items())
+        ],
+        'totals': dict(totals),
+        'avg_confidence': {
+            label: confidence_sums[label] / count for label, count in totals.items() if count
+        }
+    }
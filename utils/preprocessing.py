@@ -0,0 +1,77 @@
+import io
+import os
+import numpy as np
+from PIL import Image, UnidentifiedImageError
+
+# Input size expected by the disease detection model (height, width)
+IMAGE_SIZE = (150, 150)
+
+# File extensions treated as images when scanning folders and archives
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.bmp', '.gif', '.webp', '.tif', '.tiff')
+
+# Decoding limits (override with environment variables)
+MAX_IMAGE_PIXELS = int(os.getenv('MAX_IMAGE_PIXELS', str(64 * 1000 * 1000)))
+FAST_DECODE = os.getenv('FAST_DECODE', '1') != '0'
+
+# Pillow's own decompression bomb check uses the same limit
+Image.MAX_IMAGE_PIXELS = MAX_IMAGE_PIXELS
+
+
+class ImageTooLargeError(ValueError):
+    """Raised when an image exceeds MAX_IMAGE_PIXELS."""
+
+
+# Errors raised for uploads that are not readable images
+InvalidImageError = (UnidentifiedImageError, OSError, ValueError)
+
+
+# Read the raw bytes of an uploaded file (werkzeug FileStorage) without touching the disk
+def read_upload(file_storage):
+    stream = file_storage.stream
+    if stream.seekable():
+        stream.seek(0)
+    return stream.read()
+
+
+# Stage 1: decode encoded image bytes into an RGB Pillow image
+def open_rgb(data, target_size=IMAGE_SIZE, fast=FAST_DECODE):
+    try:
+        img = Image.open(io.BytesIO(memoryview(data)))
+    except Image.DecompressionBombError as e:
+        raise ImageTooLargeError(str(e))
+
+    # The header is parsed but no pixels are decoded yet, so reject huge images here
+    width, height = img.size
+    if width * height > MAX_IMAGE_PIXELS:
+        raise ImageTooLargeError(f"Image has {width * height} pixels (limit is {MAX_IMAGE_PIXELS})")
+
+    # Let the JPEG decoder downscale by 1/2, 1/4 or 1/8 in the DCT domain,
+    # never going below the target size, instead of decoding every pixel of a phone photo
+    if fast and img.format == 'JPEG':
+        img.draft('RGB', (target_size[1], target_size[0]))
+
+    img.load()
+    if img.mode != 'RGB':
+        img = img.convert('RGB')
+    return img
+
+
+# Stage 2: resize to the model input size
+def resize_image(img, target_size=IMAGE_SIZE):
+    # Nearest-neighbour resize matches keras load_img
+    return img.resize((target_size[1], target_size[0]), Image.NEAREST)
+
+
+# Stage 3: scale pixels to float32 in [0, 1]
+def normalize_image(img):
+    return np.asarray(img, dtype=np.float32) / np.float32(255.0)
+
+
+# Decode encoded image bytes into a normalized float32 array of shape (height, width, 3)
+def decode_image(data, target_size=IMAGE_SIZE, fast=FAST_DECODE):
+    return normalize_image(resize_image(open_rgb(data, target_size, fast), target_size))
+
+
+# Shared preprocessing for every detection entry point
+def preprocess_upload(file_storage, target_size=IMAGE_SIZE):
+    return decode_image(read_upload(file_storage), target_size)
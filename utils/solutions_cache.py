@@ -0,0 +1,45 @@
+import os
+import threading
+import time
+from utils.db import solutions_collection
+
+# Seconds between background re-syncs, so every worker picks up edits made through another one
+SOLUTIONS_RESYNC_SECONDS = float(os.getenv('SOLUTIONS_RESYNC_SECONDS', '60'))
+
+
+class SolutionsCache:
+    """In-process copy of the solutions collection (one small document per disease)."""
+
+    def __init__(self, collection, resync_seconds=SOLUTIONS_RESYNC_SECONDS):
+        self.collection = collection
+        self.resync_seconds = resync_seconds
+        self._solutions = None
+        self._loaded_at = 0.0
+        self._lock = threading.Lock()
+
+    # Reload every solution from the database
+    def refresh(self):
+        solutions = {
+            doc['disease']: doc['solution']
+            for doc in self.collection.find({}, {'disease': 1, 'solution': 1})
+            if 'disease' in doc and 'solution' in doc
+        }
+        with self._lock:
+            self._solutions = solutions
+            self._loaded_at = time.monotonic()
+        return solutions
+
+    # Current mapping of disease -> solution, re-synced when it is older than resync_seconds
+    def all(self):
+        with self._lock:
+            solutions = self._solutions
+            stale = solutions is None or time.monotonic() - self._loaded_at > self.resync_seconds
+        if stale:
+            solutions = self.refresh()
+        return solutions
+
+    def get(self, disease):
+        return self.all().get(disease)
+
+
+solutions_cache = SolutionsCache(solutions_collection)
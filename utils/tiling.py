@@ -0,0 +1,123 @@
+import base64
+import io
+import os
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+from PIL import Image
+from utils.preprocessing import IMAGE_SIZE, open_rgb
+
+# Tiled detection settings (override with environment variables)
+TILE_STRIDE = int(os.getenv('TILE_STRIDE', str(IMAGE_SIZE[0] // 2)))
+TILE_BATCH_SIZE = int(os.getenv('TILE_BATCH_SIZE', '32'))
+TILE_MAX_SIDE = int(os.getenv('TILE_MAX_SIDE', '1200'))
+
+# Longest side of the returned heatmap overlay
+HEATMAP_MAX_SIDE = 512
+
+
+# Decode an image at up to max_side pixels on its longest side as a uint8 (H, W, 3) array
+def load_full_image(data, max_side=TILE_MAX_SIDE):
+    img = open_rgb(data, (max_side, max_side))
+    if max(img.size) > max_side:
+        img.thumbnail((max_side, max_side), Image.BILINEAR)
+
+    # Small photos are scaled up so at least one full tile fits
+    tile_h, tile_w = IMAGE_SIZE
+    if img.width < tile_w or img.height < tile_h:
+        scale = max(tile_w / img.width, tile_h / img.height)
+        img = img.resize((max(tile_w, round(img.width * scale)), max(tile_h, round(img.height * scale))), Image.BILINEAR)
+    return np.asarray(img)
+
+
+# Offsets of the tiles along one axis: every stride, plus a last tile flush with the far edge when
+# the stride grid stops short of it (otherwise the border strip would never be classified)
+def tile_starts(length, tile, stride):
+    starts = np.arange(0, length - tile + 1, stride)
+    if starts[-1] != length - tile:
+        starts = np.append(starts, length - tile)
+    return starts
+
+
+# Overlapping tiles: an (H', W', tile_h, tile_w, 3) view of every window of the image (no pixels are copied)
+# plus the row and column offsets of the tiles to classify
+def tile_view(image, tile_size=IMAGE_SIZE, stride=TILE_STRIDE):
+    windows = sliding_window_view(image, (tile_size[0], tile_size[1], 3))
+    # sliding_window_view adds a length-1 axis for the channel window
+    windows = windows[:, :, 0]
+    return windows, tile_starts(image.shape[0], tile_size[0], stride), tile_starts(image.shape[1], tile_size[1], stride)
+
+
+# Classify every tile in batches of at most batch_size; returns a (rows, cols, classes) probability grid
+def classify_tiles(tiles, predict_fn, batch_size=TILE_BATCH_SIZE):
+    windows, row_starts, col_starts = tiles
+    rows, cols = len(row_starts), len(col_starts)
+    positions = np.indices((rows, cols)).reshape(2, -1)
+    grid = None
+
+    for start in range(0, positions.shape[1], batch_size):
+        r, c = positions[:, start:start + batch_size]
+        # Only this batch is gathered and converted to float32, so memory is bounded by batch_size
+        batch = windows[row_starts[r], col_starts[c]].astype(np.float32) / np.float32(255.0)
+        preds = np.asarray(predict_fn(batch), dtype=np.float32)
+        if grid is None:
+            grid = np.zeros((rows, cols, preds.shape[1]), dtype=np.float32)
+        grid[r, c] = preds
+    return grid
+
+
+# Overlay the per-tile score on the image and return it as a JPEG data URL
+def heatmap_overlay(image, score_grid, row_starts, col_starts, tile_size=IMAGE_SIZE):
+    height, width = image.shape[:2]
+    scale = min(1.0, HEATMAP_MAX_SIDE / max(width, height))
+    size = (max(1, round(width * scale)), max(1, round(height * scale)))
+
+    # Average the scores of every tile covering each pixel of the (downscaled) overlay
+    total = np.zeros((size[1], size[0]), dtype=np.float32)
+    covered = np.zeros((size[1], size[0]), dtype=np.float32)
+    for (row, col), score in np.ndenumerate(score_grid):
+        top, left = round(row_starts[row] * scale), round(col_starts[col] * scale)
+        bottom, right = round((row_starts[row] + tile_size[0]) * scale), round((col_starts[col] + tile_size[1]) * scale)
+        total[top:bottom, left:right] += score
+        covered[top:bottom, left:right] += 1
+    cells = np.divide(total, covered, out=np.zeros_like(total), where=covered > 0)
+
+    base = Image.fromarray(image).resize(size, Image.BILINEAR)
+    mask = Image.fromarray((cells * 160).astype(np.uint8))
+    overlay = Image.new('RGB', size, (220, 30, 30))
+    blended = Image.composite(overlay, base, mask)
+
+    buffer = io.BytesIO()
+    blended.save(buffer, format='JPEG', quality=80)
+    return 'data:image/jpeg;base64,' + base64.b64encode(buffer.getvalue()).decode('ascii')
+
+
+# Full tiled detection: per-tile grid, aggregate verdict and heatmap of the given disease score.
+# healthy_index is the class treated as "no disease" when building the heatmap.
+def detect_tiled(image, predict_fn, class_labels, healthy_index, stride=TILE_STRIDE, batch_size=TILE_BATCH_SIZE):
+    tiles = tile_view(image, IMAGE_SIZE, stride)
+    _, row_starts, col_starts = tiles
+    grid = classify_tiles(tiles, predict_fn, batch_size)
+
+    flat = grid.reshape(-1, grid.shape[-1])
+    probabilities = flat.mean(axis=0)
+    votes = np.bincount(flat.argmax(axis=1), minlength=len(class_labels))
+    disease_score = 1.0 - grid[..., healthy_index]
+
+    return {
+        'prediction': class_labels[int(np.argmax(probabilities))],
+        'confidence': float(np.max(probabilities)),
+        'probabilities': {label: float(p) for label, p in zip(class_labels, probabilities)},
+        'tile_votes': {label: int(v) for label, v in zip(class_labels, votes)},
+        'grid': {
+            'rows': int(grid.shape[0]),
+            'cols': int(grid.shape[1]),
+            'tile_size': IMAGE_SIZE[0],
+            'stride': stride,
+            # Pixel offsets of each row and column of tiles (the last ones may sit closer than stride)
+            'row_starts': row_starts.tolist(),
+            'col_starts': col_starts.tolist(),
+            'labels': class_labels,
+            'probabilities': np.round(grid, 4).tolist(),
+        },
+        'heatmap': heatmap_overlay(image, disease_score, row_starts, col_starts, IMAGE_SIZE),
+    }